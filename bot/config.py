@@ -17,6 +17,13 @@ class Settings(BaseSettings):
     admin_topic_id: int = 1
     payment_receipts_topic_id: int = 1
 
+    # Outbound send queue (Telegram allows ~30 msg/s per bot, 1 msg/s per chat)
+    telegram_send_rate: float = 25.0
+    telegram_send_burst: float = 25.0
+    telegram_chat_spacing: float = 1.0
+    telegram_send_workers: int = 8
+    telegram_send_max_retries: int = 5
+
     @field_validator("admin_ids", mode="before")
     @classmethod
     def parse_admin_ids(cls, v: str | list[int]) -> list[int]:
@@ -27,6 +34,31 @@ class Settings(BaseSettings):
     # Remnawave
     remnawave_api_url: str
     remnawave_api_token: str
+    remnawave_pool_size: int = 100
+    remnawave_pool_size_per_host: int = 50
+    remnawave_dns_cache_ttl: int = 300
+    remnawave_keepalive_timeout: float = 60.0
+    remnawave_cache_ttl: int = 30
+    remnawave_connect_timeout: float = 5.0
+    remnawave_read_timeout: float = 10.0
+    remnawave_bulk_read_timeout: float = 30.0  # paged /api/users listing
+    remnawave_get_retries: int = 2  # extra attempts for idempotent GETs
+    remnawave_retry_backoff: float = 0.5  # base seconds, doubled per attempt, jittered
+    remnawave_breaker_threshold: int = 5  # consecutive failures that open the circuit
+    remnawave_breaker_reset: float = 30.0  # seconds before a half-open probe
+
+    # Stats sync
+    stats_sync_mode: str = "bulk"  # "bulk" (paged /api/users listing) or "per_user"
+    stats_sync_page_size: int = 500
+    stats_sync_page_concurrency: int = 4
+    stats_sync_batch_size: int = 1000
+    stats_sync_concurrency: int = 10
+    stats_sync_request_timeout: float = 15.0
+    traffic_history_months: int = 3  # monthly partitions of daily traffic kept
+    stats_sync_sharding: bool = False  # split the per-user sync across all replicas
+
+    # Background job coordination across replicas
+    leader_lease_ttl: float = 15.0
 
     # DB
     database_url: str
@@ -35,10 +67,28 @@ class Settings(BaseSettings):
     # Redis
     redis_url: str = "redis://redis:6379/0"
 
+    # Webhook mode (python -m bot.webhook)
+    webhook_base_url: str = ""  # public https URL Telegram delivers to
+    webhook_path: str = "/webhook"
+    webhook_secret: str = ""
+    webhook_host: str = "0.0.0.0"
+    webhook_port: int = 8080
+    webhook_workers: int = 1
+    webhook_metrics_path: str = "/metrics"  # per-worker runtime stats (Prometheus text)
+
+    # Off-loop rendering (QR codes)
+    render_executor: str = "thread"  # "thread" or "process"
+    render_workers: int = 4
+
     # Misc
     log_level: str = "INFO"
     payment_card_number: str = "شماره حساب"
     payment_card_holder: str = "نام"
+    wallet_charge_request_ttl: int = 7 * 24 * 3600  # seconds a receipt awaits review
+    wallet_summary_interval: int = 600  # seconds between wallet balance snapshots
+    purchase_max_attempts: int = 6  # panel attempts before a purchase is refunded
+    purchase_poll_interval: float = 5.0  # seconds between purchase outbox polls
+    purchase_claim_timeout: float = 300.0  # seconds a claimed order is held before retry
 
     # Tutorial Links
     tutorial_android_happ: str = ""
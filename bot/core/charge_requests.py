@@ -0,0 +1,143 @@
+from __future__ import annotations
+
+import logging
+import time
+from dataclasses import dataclass, field
+
+from bot.config import settings
+from bot.core.redis_client import redis_client
+
+logger = logging.getLogger(__name__)
+
+# Sorted set of outstanding request ids scored by submission time.
+_INDEX_KEY = "wallet:charges:pending"
+
+_SET_IF_EXISTS_SCRIPT = """
+if redis.call('exists', KEYS[1]) == 1 then
+    return redis.call('hset', KEYS[1], ARGV[1], ARGV[2])
+end
+return 0
+"""
+
+
+def _request_key(request_id: str) -> str:
+    return f"wallet:charge:{request_id}"
+
+
+@dataclass(frozen=True)
+class ChargeRequest:
+    """A wallet top-up receipt awaiting admin review."""
+
+    request_id: str
+    user_id: int
+    username: str | None
+    full_name: str
+    amount: int
+    lang: str
+    message_id: int | None = None  # the user's wallet message, replaced on review
+    receipt_message_id: int | None = None  # the receipt posted in the admin group
+    created_at: float = field(default_factory=time.time)
+
+    def to_mapping(self) -> dict[str, str]:
+        return {
+            "user_id": str(self.user_id),
+            "username": self.username or "",
+            "full_name": self.full_name,
+            "amount": str(self.amount),
+            "lang": self.lang,
+            "message_id": str(self.message_id or ""),
+            "receipt_message_id": str(self.receipt_message_id or ""),
+            "created_at": str(self.created_at),
+        }
+
+    @classmethod
+    def from_mapping(cls, request_id: str, raw: dict[bytes, bytes]) -> ChargeRequest:
+        fields = {key.decode(): value.decode() for key, value in raw.items()}
+        return cls(
+            request_id=request_id,
+            user_id=int(fields["user_id"]),
+            username=fields.get("username") or None,
+            full_name=fields.get("full_name", ""),
+            amount=int(fields["amount"]),
+            lang=fields.get("lang", "fa"),
+            message_id=int(fields["message_id"]) if fields.get("message_id") else None,
+            receipt_message_id=(
+                int(fields["receipt_message_id"]) if fields.get("receipt_message_id") else None
+            ),
+            created_at=float(fields.get("created_at") or 0),
+        )
+
+
+class ChargeRequestStore:
+    """Pending charge requests in Redis, shared by every process and replica.
+
+    Each request is a hash keyed by its id (expiring after
+    ``wallet_charge_request_ttl``) plus an entry in a sorted set ordered by
+    submission time for the admin listing. :meth:`claim` reads and deletes the
+    hash in one ``MULTI``, so of two concurrent approve/reject clicks exactly one
+    gets the request back.
+    """
+
+    def __init__(self) -> None:
+        self._ttl = settings.wallet_charge_request_ttl
+
+    async def add(self, request: ChargeRequest) -> None:
+        key = _request_key(request.request_id)
+        async with redis_client.pipeline(transaction=True) as pipe:
+            pipe.hset(key, mapping=request.to_mapping())
+            pipe.expire(key, self._ttl)
+            pipe.zadd(_INDEX_KEY, {request.request_id: request.created_at})
+            await pipe.execute()
+
+    async def set_receipt_message(self, request_id: str, message_id: int) -> None:
+        """Record the admin-group message, unless the request was already reviewed."""
+        await redis_client.eval(
+            _SET_IF_EXISTS_SCRIPT,
+            1,
+            _request_key(request_id),
+            "receipt_message_id",
+            str(message_id),
+        )
+
+    async def claim(self, request_id: str) -> ChargeRequest | None:
+        """Atomically remove and return a pending request, or ``None`` if it is gone."""
+        key = _request_key(request_id)
+        async with redis_client.pipeline(transaction=True) as pipe:
+            pipe.hgetall(key)
+            pipe.delete(key)
+            pipe.zrem(_INDEX_KEY, request_id)
+            raw, deleted, _ = await pipe.execute()
+        if not deleted:
+            return None
+        return ChargeRequest.from_mapping(request_id, raw)
+
+    async def list_pending(self, offset: int, limit: int) -> tuple[int, list[ChargeRequest]]:
+        """One page of outstanding requests, oldest first, and the total count."""
+        async with redis_client.pipeline(transaction=False) as pipe:
+            # Index entries outlive their hashes when a request expires unreviewed.
+            pipe.zremrangebyscore(_INDEX_KEY, "-inf", time.time() - self._ttl)
+            pipe.zcard(_INDEX_KEY)
+            pipe.zrange(_INDEX_KEY, offset, offset + limit - 1)
+            _, total, ids = await pipe.execute()
+
+        if not ids:
+            return total, []
+
+        async with redis_client.pipeline(transaction=False) as pipe:
+            for request_id in ids:
+                pipe.hgetall(_request_key(request_id.decode()))
+            rows = await pipe.execute()
+
+        requests: list[ChargeRequest] = []
+        for request_id, raw in zip(ids, rows):
+            if not raw:
+                continue
+            try:
+                requests.append(ChargeRequest.from_mapping(request_id.decode(), raw))
+            except (KeyError, ValueError) as e:
+                logger.warning(f"Skipping malformed charge request {request_id!r}: {e}")
+        return total, requests
+
+
+# Singleton instance
+charge_requests = ChargeRequestStore()
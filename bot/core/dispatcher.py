@@ -2,21 +2,27 @@ from __future__ import annotations
 
 from aiogram import Bot, Dispatcher
 from aiogram.fsm.storage.redis import RedisStorage
-from redis.asyncio import Redis
 
 from bot.config import settings
 from bot.core.middlewares.db import DbSessionMiddleware
+from bot.core.middlewares.user import UserMiddleware
+from bot.core.redis_client import redis_client
 from bot.handlers import start, auth, menu, wallet
 
 
 def create_dispatcher() -> tuple[Bot, Dispatcher]:
     bot = Bot(token=settings.bot_token)
-    storage = RedisStorage(Redis.from_url(settings.redis_url))
+    storage = RedisStorage(redis_client)
     dp = Dispatcher(storage=storage)
 
     # Register middleware on ALL update types
     dp.update.middleware(DbSessionMiddleware())
 
+    # Resolve the sender's User once per update (needs the handler, so per event type)
+    user_middleware = UserMiddleware()
+    dp.message.middleware(user_middleware)
+    dp.callback_query.middleware(user_middleware)
+
     # Register routers in order (most specific first)
     dp.include_router(start.router)
     dp.include_router(auth.router)
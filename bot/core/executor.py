@@ -0,0 +1,96 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, TypeVar
+
+from bot.config import settings
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+def _timed_call(fn: Callable[..., T], *args: Any) -> tuple[float, float, T]:
+    # Runs inside the pool; time.monotonic() is system-wide, so the start time
+    # is comparable with the submit time even from a worker process.
+    started = time.monotonic()
+    result = fn(*args)
+    return started, time.monotonic(), result
+
+
+class RenderExecutor:
+    """Shared pool for CPU-bound rendering kept off the event loop.
+
+    ``render_executor = "thread"`` suits work that releases the GIL (Pillow
+    encoding); ``"process"`` isolates pure-Python work completely, at the cost
+    of pickling arguments and results, so callables must be module-level.
+    Tracks queue depth plus queue-wait and execution times.
+    """
+
+    def __init__(self) -> None:
+        self._pool: Executor | None = None
+        self.queued = 0
+        self.completed = 0
+        self.failed = 0
+        self._wait_total = 0.0
+        self._exec_total = 0.0
+        self.wait_max = 0.0
+        self.exec_max = 0.0
+
+    def _get_pool(self) -> Executor:
+        if self._pool is None:
+            workers = settings.render_workers
+            if settings.render_executor == "process":
+                self._pool = ProcessPoolExecutor(max_workers=workers)
+            else:
+                self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="render")
+            logger.info(f"Render executor started ({settings.render_executor}, {workers} workers)")
+        return self._pool
+
+    async def run(self, fn: Callable[..., T], *args: Any) -> T:
+        loop = asyncio.get_running_loop()
+        submitted = time.monotonic()
+        self.queued += 1
+        try:
+            started, finished, result = await loop.run_in_executor(
+                self._get_pool(), _timed_call, fn, *args
+            )
+        except Exception:
+            self.failed += 1
+            raise
+        finally:
+            self.queued -= 1
+
+        wait = started - submitted
+        elapsed = finished - started
+        self.completed += 1
+        self._wait_total += wait
+        self._exec_total += elapsed
+        self.wait_max = max(self.wait_max, wait)
+        self.exec_max = max(self.exec_max, elapsed)
+        return result
+
+    def stats(self) -> dict[str, float]:
+        done = self.completed or 1
+        return {
+            "in_flight": self.queued,
+            "completed": self.completed,
+            "failed": self.failed,
+            "wait_avg": round(self._wait_total / done, 4),
+            "wait_max": round(self.wait_max, 4),
+            "exec_avg": round(self._exec_total / done, 4),
+            "exec_max": round(self.exec_max, 4),
+        }
+
+    def shutdown(self) -> None:
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+            logger.info(f"Render executor stopped: {self.stats()}")
+
+
+# Singleton instance
+render_executor = RenderExecutor()
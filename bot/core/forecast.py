@@ -0,0 +1,142 @@
+from __future__ import annotations
+
+import asyncio
+import heapq
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import Awaitable, Callable
+
+from bot.core.notification_events import EXPIRY_WARNING_DAYS, VOLUME_WARNING_TIERS
+
+logger = logging.getLogger(__name__)
+
+# Weight of the newest observation in the exponentially smoothed burn rate.
+BURN_RATE_SMOOTHING = 0.5
+# Snapshots closer together than this are too noisy to update the rate from.
+MIN_RATE_SAMPLE = timedelta(minutes=1)
+# Never re-check one account more often than this, however close its forecast.
+MIN_RECHECK_INTERVAL = timedelta(minutes=5)
+
+
+def estimate_burn_rate(previous: dict | None, used: int, now: datetime) -> float | None:
+    """Smoothed traffic burn rate in bytes/second after a new snapshot.
+
+    *previous* carries the cached ``used_traffic_bytes``, ``updated_at`` and
+    ``burn_rate`` for the account, or is ``None`` on first sight. A counter that
+    went down (reset/renewal) starts the estimate over.
+    """
+    if previous is None:
+        return None
+    previous_rate = previous.get("burn_rate")
+    previous_used = previous["used_traffic_bytes"] or 0
+    if used < previous_used:
+        return None
+
+    elapsed = now - previous["updated_at"]
+    if elapsed < MIN_RATE_SAMPLE:
+        return previous_rate
+
+    sample = (used - previous_used) / elapsed.total_seconds()
+    if previous_rate is None:
+        return sample
+    return BURN_RATE_SMOOTHING * sample + (1 - BURN_RATE_SMOOTHING) * previous_rate
+
+
+def depletion_time(used: int, total: int, rate: float | None, now: datetime) -> datetime | None:
+    """When the account runs out of traffic at the current rate, if it ever does."""
+    if total <= 0 or not rate or rate <= 0:
+        return None
+    return now + timedelta(seconds=max(0, total - used) / rate)
+
+
+def next_check_time(
+    used: int,
+    total: int,
+    expire_at: datetime | None,
+    rate: float | None,
+    now: datetime,
+) -> datetime | None:
+    """Earliest moment a warning threshold is predicted to be crossed.
+
+    Considers the next volume tier at the current burn rate and the next
+    expiry-window day boundary. ``None`` means nothing is expected to change.
+    """
+    candidates: list[datetime] = []
+
+    if total > 0 and rate and rate > 0:
+        for tier in VOLUME_WARNING_TIERS:
+            remaining = total * tier / 100 - used
+            if remaining > 0:
+                candidates.append(now + timedelta(seconds=remaining / rate))
+                break
+
+    if expire_at is not None:
+        for days in range(EXPIRY_WARNING_DAYS, 0, -1):
+            boundary = expire_at - timedelta(days=days)
+            if boundary > now:
+                candidates.append(boundary)
+                break
+
+    if not candidates:
+        return None
+    return max(min(candidates), now + MIN_RECHECK_INTERVAL)
+
+
+class ForecastScheduler:
+    """Min-heap of accounts keyed by their predicted next threshold crossing.
+
+    Only accounts whose crossing is expected before the next regular stats sync
+    are scheduled, so a wake-up costs work proportional to the accounts that are
+    actually about to cross rather than the whole population.
+    """
+
+    def __init__(self) -> None:
+        self._heap: list[tuple[datetime, str]] = []
+        self._due_at: dict[str, datetime] = {}
+        self._wakeup = asyncio.Event()
+
+    def __len__(self) -> int:
+        return len(self._due_at)
+
+    def schedule(self, uuid: str, when: datetime) -> None:
+        current = self._due_at.get(uuid)
+        if current is not None and current <= when:
+            return
+        self._due_at[uuid] = when
+        heapq.heappush(self._heap, (when, uuid))
+        if self._heap[0] == (when, uuid):
+            self._wakeup.set()
+
+    def _pop_due(self, now: datetime) -> list[str]:
+        due: list[str] = []
+        while self._heap and self._heap[0][0] <= now:
+            when, uuid = heapq.heappop(self._heap)
+            # Skip entries superseded by an earlier schedule() for the same uuid.
+            if self._due_at.get(uuid) == when:
+                del self._due_at[uuid]
+                due.append(uuid)
+        return due
+
+    async def run(self, refresh: Callable[[list[str]], Awaitable[None]]) -> None:
+        """Sleep until the earliest forecast, then hand every due uuid to *refresh*."""
+        while True:
+            now = datetime.now(timezone.utc)
+            due = self._pop_due(now)
+            if due:
+                logger.info(f"Forecast: re-checking {len(due)} accounts ({len(self)} pending)")
+                try:
+                    await refresh(due)
+                except Exception as e:
+                    logger.error(f"Forecast refresh error: {e}")
+                continue
+
+            timeout = (self._heap[0][0] - now).total_seconds() if self._heap else None
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+
+
+# Singleton instance
+forecast_scheduler = ForecastScheduler()
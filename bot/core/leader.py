@@ -0,0 +1,155 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import socket
+import time
+import uuid
+import zlib
+from typing import Callable
+
+from bot.config import settings
+from bot.core.redis_client import redis_client
+
+logger = logging.getLogger(__name__)
+
+# Identifies this process among replicas in lease values and shard membership.
+REPLICA_ID = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+_RENEW_SCRIPT = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('pexpire', KEYS[1], ARGV[2])
+end
+return 0
+"""
+
+_RELEASE_SCRIPT = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('del', KEYS[1])
+end
+return 0
+"""
+
+
+class LeaderLease:
+    """Redis lease that lets exactly one replica run a set of background jobs.
+
+    The holder renews the lease every third of its TTL with a compare-and-expire
+    script. If a renewal fails (lost to expiry or Redis unreachable) the jobs are
+    cancelled at once, before another replica can possibly acquire the key. A
+    released or expired lease is picked up by a follower within a third of the
+    TTL.
+    """
+
+    def __init__(self, name: str) -> None:
+        self._key = f"leader:{name}"
+        self._token = REPLICA_ID
+        self._ttl_ms = int(settings.leader_lease_ttl * 1000)
+        self._interval = settings.leader_lease_ttl / 3
+        self.is_leader = False
+
+    async def _acquire(self) -> bool:
+        try:
+            return bool(await redis_client.set(self._key, self._token, nx=True, px=self._ttl_ms))
+        except Exception as e:
+            logger.warning(f"Leader lease {self._key}: acquire failed: {e}")
+            return False
+
+    async def _renew(self) -> bool:
+        try:
+            renewed = await redis_client.eval(
+                _RENEW_SCRIPT, 1, self._key, self._token, self._ttl_ms
+            )
+        except Exception as e:
+            logger.warning(f"Leader lease {self._key}: renew failed: {e}")
+            return False
+        return bool(renewed)
+
+    async def release(self) -> None:
+        if not self.is_leader:
+            return
+        self.is_leader = False
+        try:
+            await redis_client.eval(_RELEASE_SCRIPT, 1, self._key, self._token)
+        except Exception as e:
+            logger.warning(f"Leader lease {self._key}: release failed: {e}")
+
+    async def run(self, start_jobs: Callable[[], list[asyncio.Task]]) -> None:
+        """Campaign for the lease forever, running *start_jobs* while holding it."""
+        while True:
+            if not await self._acquire():
+                await asyncio.sleep(self._interval)
+                continue
+
+            self.is_leader = True
+            logger.info(f"Leader lease {self._key}: acquired by {REPLICA_ID}")
+            jobs = start_jobs()
+            try:
+                while True:
+                    await asyncio.sleep(self._interval)
+                    if not await self._renew():
+                        logger.warning(f"Leader lease {self._key}: lost, stopping jobs")
+                        break
+            finally:
+                self.is_leader = False
+                for job in jobs:
+                    job.cancel()
+                await asyncio.gather(*jobs, return_exceptions=True)
+
+
+class ShardMembership:
+    """Live replica set used to split the per-user stats sync by uuid hash.
+
+    Every replica refreshes its entry in a Redis sorted set (score = expiry
+    time). A replica's shard is its position among the live members, so the
+    split rebalances on its own as replicas come and go.
+    """
+
+    def __init__(self, name: str) -> None:
+        self._key = f"shards:{name}"
+        self._ttl = settings.leader_lease_ttl
+
+    async def _heartbeat(self) -> None:
+        now = time.time()
+        async with redis_client.pipeline(transaction=True) as pipe:
+            pipe.zadd(self._key, {REPLICA_ID: now + self._ttl})
+            pipe.zremrangebyscore(self._key, "-inf", now)
+            await pipe.execute()
+
+    async def run(self) -> None:
+        while True:
+            try:
+                await self._heartbeat()
+            except Exception as e:
+                logger.warning(f"Shard membership {self._key}: heartbeat failed: {e}")
+            await asyncio.sleep(self._ttl / 3)
+
+    async def current_shard(self) -> tuple[int, int]:
+        """Return ``(index, count)`` for this replica; ``(0, 1)`` if Redis is unavailable."""
+        try:
+            await self._heartbeat()
+            members = await redis_client.zrangebyscore(self._key, time.time(), "+inf")
+        except Exception as e:
+            logger.warning(f"Shard membership {self._key}: lookup failed: {e}")
+            return 0, 1
+        replicas = sorted(member.decode() for member in members)
+        if REPLICA_ID not in replicas:
+            return 0, 1
+        return replicas.index(REPLICA_ID), len(replicas)
+
+    async def leave(self) -> None:
+        try:
+            await redis_client.zrem(self._key, REPLICA_ID)
+        except Exception as e:
+            logger.warning(f"Shard membership {self._key}: leave failed: {e}")
+
+
+def owns(uuid_value: str, shard: tuple[int, int]) -> bool:
+    index, count = shard
+    return zlib.crc32(uuid_value.encode()) % count == index
+
+
+# Singleton instances
+background_lease = LeaderLease("background")
+stats_sync_shards = ShardMembership("stats_sync")
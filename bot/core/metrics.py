@@ -0,0 +1,26 @@
+from __future__ import annotations
+
+import os
+
+from bot.core.executor import render_executor
+from bot.core.send_queue import send_queue
+from bot.remnawave.client import remnawave
+
+
+def render_metrics() -> str:
+    """This process's runtime stats in the Prometheus text exposition format.
+
+    ``remnawave_breaker_state`` is 0 (closed), 1 (half-open) or 2 (open).
+    """
+    sources = {
+        "remnawave_breaker": remnawave.breaker.stats(),
+        "send_queue": send_queue.stats(),
+        "render_executor": render_executor.stats(),
+    }
+    labels = f'{{pid="{os.getpid()}"}}'
+    lines = [
+        f"{prefix}_{name}{labels} {value}"
+        for prefix, stats in sources.items()
+        for name, value in stats.items()
+    ]
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,90 @@
+from __future__ import annotations
+
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable
+
+from aiogram import BaseMiddleware
+from aiogram.types import TelegramObject
+from sqlalchemy import select
+
+from bot.config import settings
+from bot.db.models.user import User
+
+PROFILE_TTL_SECONDS = 60
+# Most recently seen senders kept in the cache; older entries are evicted first.
+PROFILE_CACHE_SIZE = 10_000
+
+# telegram_id -> (expires_at, lang), least recently used first
+_profiles: OrderedDict[int, tuple[float, str]] = OrderedDict()
+
+
+def _remember_profile(telegram_id: int, expires_at: float, lang: str) -> None:
+    _profiles[telegram_id] = (expires_at, lang)
+    _profiles.move_to_end(telegram_id)
+    while len(_profiles) > PROFILE_CACHE_SIZE:
+        _profiles.popitem(last=False)
+
+
+def forget_user_profile(telegram_id: int) -> None:
+    """Drop the cached profile after the user's language changes.
+
+    The cache is per process. Other webhook workers keep serving the old
+    language until their entry expires, at most ``PROFILE_TTL_SECONDS`` later.
+    """
+    _profiles.pop(telegram_id, None)
+
+
+class UserMiddleware(BaseMiddleware):
+    """Resolve the sender's ``User`` once per update and inject it into handler data.
+
+    Handlers that declare a ``user`` argument get the freshly loaded row. Handlers
+    that only need ``lang`` / ``is_admin`` are served from a short TTL cache of those
+    rarely-changing fields, so they skip the database entirely on a hit.
+
+    Must run after ``DbSessionMiddleware``.
+    """
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: dict[str, Any],
+    ) -> Any:
+        from_user = data.get("event_from_user")
+        if from_user is None:
+            return await handler(event, data)
+
+        telegram_id = from_user.id
+        data["is_admin"] = telegram_id in settings.admin_ids
+
+        handler_object = data.get("handler")
+        wants_user = handler_object is None or "user" in handler_object.params
+        now = time.monotonic()
+
+        if wants_user:
+            result = await data["session"].execute(
+                select(User).where(User.telegram_id == telegram_id)
+            )
+            user = result.scalar_one_or_none()
+            data["user"] = user
+            lang = user.lang if user else None
+            loaded = True
+        else:
+            cached = _profiles.get(telegram_id)
+            loaded = not (cached and cached[0] > now)
+            if not loaded:
+                _profiles.move_to_end(telegram_id)
+                lang = cached[1]
+            else:
+                result = await data["session"].execute(
+                    select(User.lang).where(User.telegram_id == telegram_id)
+                )
+                lang = result.scalar_one_or_none()
+
+        # Only a database read restarts the TTL, so a hit never extends a stale entry.
+        if loaded and lang is not None:
+            _remember_profile(telegram_id, now + PROFILE_TTL_SECONDS, lang)
+        data["lang"] = lang or "en"
+
+        return await handler(event, data)
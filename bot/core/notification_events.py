@@ -0,0 +1,158 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+from dataclasses import dataclass
+from datetime import datetime, timezone
+
+from bot.core.redis_client import redis_client
+
+logger = logging.getLogger(__name__)
+
+VOLUME_WARNING_TIERS = (90, 100)
+EXPIRY_WARNING_DAYS = 2
+
+
+@dataclass(frozen=True)
+class ThresholdEvent:
+    """A warning threshold newly crossed by one panel account during stats sync."""
+
+    uuid: str
+    kind: str  # "volume" or "expiry"
+
+
+# Events waiting for the notifier, as "kind:uuid" members. Kept in Redis so they
+# survive restarts and reach the notifier from whichever replica ran the sync.
+PENDING_EVENTS_KEY = "notifications:pending"
+# Events the notifier has taken and not yet acknowledged. Kept apart from the
+# pending set so an identical event published mid-batch is not acknowledged too.
+PROCESSING_EVENTS_KEY = "notifications:processing"
+
+# Move up to ARGV[1] members from the pending set to the processing set.
+_CLAIM_SCRIPT = """
+local members = redis.call('spop', KEYS[1], ARGV[1])
+if #members > 0 then
+    redis.call('sadd', KEYS[2], unpack(members))
+end
+return members
+"""
+
+# Set when this process publishes events so the notifier does not wait out its poll.
+_wakeup = asyncio.Event()
+
+
+def volume_tier(used: int | None, total: int | None) -> int | None:
+    """Highest volume warning tier reached, or ``None`` below the first tier."""
+    used = used or 0
+    total = total or 0
+    if total <= 0:
+        return None
+    usage_percent = (used / total) * 100
+    crossed = [tier for tier in VOLUME_WARNING_TIERS if usage_percent >= tier]
+    return crossed[-1] if crossed else None
+
+
+def expiry_days_left(expire_at: datetime | None, now: datetime) -> int | None:
+    """Whole days left until *expire_at* if inside the warning window, else ``None``."""
+    if expire_at is None:
+        return None
+    days_left = (expire_at - now).days
+    return days_left if 0 <= days_left < EXPIRY_WARNING_DAYS else None
+
+
+def period_marker(expire_at: datetime | None) -> str:
+    """Identify a subscription period by its expiry, in the panel's ISO format."""
+    if expire_at is None:
+        return "None"
+    return expire_at.astimezone(timezone.utc).strftime("%Y-%m-%dT%H:%M:%S.%f")[:-3] + "Z"
+
+
+def detect_crossings(old: dict | None, new: dict, now: datetime | None = None) -> list[str]:
+    """Return the warning kinds whose threshold *new* has crossed since *old*.
+
+    Both dicts carry ``UserStatsCache`` column values; *old* is ``None`` for an
+    account seen for the first time. The old expiry window is evaluated at the
+    time the old row was written, so a day boundary passing between two syncs
+    counts as a crossing.
+    """
+    now = now or datetime.now(timezone.utc)
+    kinds: list[str] = []
+
+    new_tier = volume_tier(new["used_traffic_bytes"], new["total_traffic_bytes"])
+    if new_tier is not None:
+        old_tier = (
+            volume_tier(old["used_traffic_bytes"], old["total_traffic_bytes"]) if old else None
+        )
+        if old_tier != new_tier or old["expire_at"] != new["expire_at"]:
+            kinds.append("volume")
+
+    new_days = expiry_days_left(new["expire_at"], now)
+    if new_days is not None:
+        old_days = expiry_days_left(old["expire_at"], old["updated_at"]) if old else None
+        if old_days != new_days or old["expire_at"] != new["expire_at"]:
+            kinds.append("expiry")
+
+    return kinds
+
+
+def _member(event: ThresholdEvent) -> str:
+    return f"{event.kind}:{event.uuid}"
+
+
+async def publish(events: list[ThresholdEvent]) -> None:
+    """Queue *events* for the notifier; an event that is already pending is kept once.
+
+    A failure is only logged: the notifier's periodic catch-up pass still finds
+    the account.
+    """
+    if not events:
+        return
+    try:
+        await redis_client.sadd(PENDING_EVENTS_KEY, *(_member(event) for event in events))
+    except Exception as e:
+        logger.warning(f"Failed to queue {len(events)} threshold events: {e}")
+        return
+    _wakeup.set()
+
+
+async def pending_events(limit: int) -> list[ThresholdEvent]:
+    """Claim up to *limit* queued events; they stay in Redis until acknowledged.
+
+    Claimed events move to a processing set, so publishing the same event
+    again while the batch runs queues it anew instead of being acknowledged
+    along with the batch.
+    """
+    members = await redis_client.eval(
+        _CLAIM_SCRIPT, 2, PENDING_EVENTS_KEY, PROCESSING_EVENTS_KEY, limit
+    )
+    events = []
+    for member in members:
+        kind, _, uuid = member.decode().partition(":")
+        events.append(ThresholdEvent(uuid=uuid, kind=kind))
+    return events
+
+
+async def acknowledge_events(events: list[ThresholdEvent]) -> None:
+    if events:
+        await redis_client.srem(PROCESSING_EVENTS_KEY, *(_member(event) for event in events))
+
+
+async def requeue_unacknowledged() -> None:
+    """Return claimed but unacknowledged events to the pending set.
+
+    Called when the notifier starts and after a failed batch, so events taken
+    by a notifier that crashed or lost its lease are delivered.
+    """
+    async with redis_client.pipeline(transaction=True) as pipe:
+        pipe.sunionstore(PENDING_EVENTS_KEY, [PENDING_EVENTS_KEY, PROCESSING_EVENTS_KEY])
+        pipe.delete(PROCESSING_EVENTS_KEY)
+        await pipe.execute()
+
+
+async def wait_for_events(timeout: float) -> None:
+    """Return once this process publishes events or *timeout* seconds have passed."""
+    try:
+        await asyncio.wait_for(_wakeup.wait(), timeout)
+    except asyncio.TimeoutError:
+        pass
+    _wakeup.clear()
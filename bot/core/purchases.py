@@ -0,0 +1,336 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import random
+import uuid as uuid_lib
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from bot.config import settings
+from bot.core.send_queue import send_queue
+from bot.core.wallet import adjust_balance
+from bot.db.engine import AsyncSessionFactory
+from bot.db.models import Package, PurchaseOutbox, User
+from bot.db.models.purchase_outbox import DONE, FAILED, PENDING, REFUNDED
+from bot.db.models.wallet_transaction import PURCHASE, REFUND
+from bot.keyboards.inline import main_menu_kb
+from bot.remnawave.cache import invalidate_accounts
+from bot.remnawave.client import remnawave, reset_and_set_user_package
+from bot.utils.date import parse_iso_datetime
+
+logger = logging.getLogger(__name__)
+
+# Set when this process places an order so the worker does not wait out its poll.
+_wakeup = asyncio.Event()
+
+
+async def place_order(
+    session: AsyncSession, telegram_id: int, uuid: str, pkg: Package, lang: str
+) -> int | None:
+    """Debit the wallet and queue the package for the purchase worker.
+
+    Returns the remaining balance, or ``None`` when the balance is too low. The
+    debit, its ledger row and the outbox row commit together, so a purchase is
+    either paid and queued or not made at all.
+    """
+    key = uuid_lib.uuid4().hex
+    balance = await adjust_balance(session, telegram_id, -pkg.price, PURCHASE, key)
+    if balance is None:
+        return None
+
+    session.add(
+        PurchaseOutbox(
+            idempotency_key=key,
+            telegram_id=telegram_id,
+            uuid=uuid,
+            package_id=pkg.id,
+            package_name=pkg.name,
+            price=pkg.price,
+            volume_gb=pkg.volume_gb,
+            days=pkg.days,
+            expire_at=datetime.now(timezone.utc) + timedelta(days=pkg.days),
+            lang=lang,
+            status=PENDING,
+            attempts=0,
+        )
+    )
+    await session.commit()
+    _wakeup.set()
+    return balance
+
+
+def _retry_delay(attempts: int) -> float:
+    """Exponential backoff with full jitter, capped at ten minutes."""
+    return random.uniform(0, min(5 * 2**attempts, 600))
+
+
+def _account_summary(account_data: dict | None) -> tuple[float, int]:
+    """Remaining GB and days of a panel account, for the admin purchase report."""
+    account = (account_data or {}).get("response", account_data or {})
+    used = account.get("userTraffic", {}).get("usedTrafficBytes", 0) or 0
+    total = account.get("trafficLimitBytes", 0) or 0
+    gb = round((total - used) / (1024**3), 2) if total > 0 else 0
+
+    days = 0
+    if account.get("expireAt"):
+        try:
+            expire = datetime.fromisoformat(account["expireAt"].replace("Z", "+00:00"))
+            days = max(0, (expire - datetime.now(timezone.utc)).days)
+        except ValueError:
+            days = 0
+    return gb, days
+
+
+def _already_applied(order: PurchaseOutbox, account_data: dict) -> bool:
+    """Whether the panel account already carries this order's volume and expiry."""
+    account = account_data.get("response", account_data)
+    expire = parse_iso_datetime(account.get("expireAt"))
+    return (
+        account.get("trafficLimitBytes") == order.volume_gb * (1024**3)
+        and expire is not None
+        and expire.replace(microsecond=0) == order.expire_at.replace(microsecond=0)
+    )
+
+
+async def _apply(order: PurchaseOutbox) -> tuple[float, int]:
+    """Apply the order on the panel; returns the account's state before the reset.
+
+    An earlier attempt may have reached the panel even though it looked like a
+    failure here. The account is read first and the reset is skipped when it
+    already matches the order, so a retry never zeroes traffic used since.
+    """
+    account_data = await remnawave.get_user_stats(order.uuid)
+    if account_data is None:
+        raise RuntimeError("could not read the panel account")
+    before = _account_summary(account_data)
+    if _already_applied(order, account_data):
+        logger.info(f"Purchase {order.idempotency_key}: already applied on the panel")
+        return before
+
+    result = await reset_and_set_user_package(
+        order.uuid,
+        order.volume_gb * (1024**3),
+        order.expire_at.astimezone(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ"),
+    )
+    if result is None:
+        raise RuntimeError("panel rejected the package update")
+    return before
+
+
+def _notify_done(order: PurchaseOutbox, user: User | None, before: tuple[float, int]) -> None:
+    fa = order.lang == "fa"
+    balance = user.balance if user else 0
+    send_queue.submit(
+        order.telegram_id,
+        f"✅ <b>{'خرید با موفقیت انجام شد!' if fa else 'Purchase successful!'}</b>\n\n"
+        f"<b>{'بسته:' if fa else 'Package:'} {order.package_name}</b>\n"
+        f"<b>{'حجم جدید:' if fa else 'New Volume:'} {order.volume_gb} GB</b>\n"
+        f"<b>{'مدت جدید:' if fa else 'New Duration:'} {order.days} {'روز' if fa else 'days'}</b>\n\n"
+        f"{'از حالا می‌توانید از اکانت خود استفاده کنید.' if fa else 'You can now use your account.'}\n"
+        f"{'موجودی باقیمانده:' if fa else 'Remaining Balance:'} {balance:,} {'تومان' if fa else 'Toman'}",
+        reply_markup=main_menu_kb(order.lang),
+        parse_mode="HTML",
+    )
+
+    if not settings.admin_group_id:
+        return
+    username = f"@{user.username}" if user and user.username else "—"
+    full_name = (user.full_name if user else None) or "—"
+    old_gb, old_days = before
+    send_queue.submit(
+        settings.admin_group_id,
+        f"🛒 <b>خرید جدید از کیف پول</b>\n"
+        f"──────────────────\n"
+        f"👤 <b>کاربر:</b> {full_name} ({order.telegram_id})\n"
+        f"🛍️ <b>پلن:</b> {order.package_name}\n"
+        f"💰 <b>هزینه:</b> {order.price:,} تومان\n"
+        f"💳 <b>موجودی:</b> {balance:,} تومان\n"
+        f"──────────────────\n"
+        f"📊 <b>وضعیت قبل از خرید</b>\n"
+        f" {username}: {old_gb} GB | {old_days} روز\n\n"
+        f"📊 <b>وضعیت پس از خرید</b>\n"
+        f" {username}: {order.volume_gb} GB | {order.days} روز",
+        message_thread_id=settings.payment_receipts_topic_id,
+        parse_mode="HTML",
+    )
+
+
+def _notify_failed(order: PurchaseOutbox) -> None:
+    if not settings.admin_group_id:
+        return
+    send_queue.submit(
+        settings.admin_group_id,
+        f"🚨 <b>خرید ناموفق بدون بازگشت وجه</b>\n"
+        f"👤 {order.telegram_id} | 🛍️ {order.package_name} | 💰 {order.price:,} تومان\n"
+        f"🆔 <code>{order.idempotency_key}</code>\n"
+        f"❗️ {order.last_error or '—'}\n"
+        f"کاربر در دیتابیس پیدا نشد؛ بازگشت وجه باید دستی انجام شود.",
+        message_thread_id=settings.payment_receipts_topic_id,
+        parse_mode="HTML",
+    )
+
+
+def _notify_refunded(order: PurchaseOutbox, balance: int | None) -> None:
+    fa = order.lang == "fa"
+    send_queue.submit(
+        order.telegram_id,
+        f"❌ <b>{'اعمال بسته ناموفق بود' if fa else 'The package could not be applied'}</b>\n\n"
+        f"{'مبلغ' if fa else 'The amount of'} {order.price:,} {'تومان به کیف پول شما بازگردانده شد.' if fa else 'Toman has been refunded to your wallet.'}\n"
+        f"{'موجودی:' if fa else 'Balance:'} {balance or 0:,} {'تومان' if fa else 'Toman'}",
+        reply_markup=main_menu_kb(order.lang),
+        parse_mode="HTML",
+    )
+    if settings.admin_group_id:
+        send_queue.submit(
+            settings.admin_group_id,
+            f"⚠️ <b>خرید ناموفق و بازگشت وجه</b>\n"
+            f"👤 {order.telegram_id} | 🛍️ {order.package_name} | 💰 {order.price:,} تومان\n"
+            f"🆔 <code>{order.idempotency_key}</code>\n"
+            f"❗️ {order.last_error or '—'}",
+            message_thread_id=settings.payment_receipts_topic_id,
+            parse_mode="HTML",
+        )
+
+
+async def _claim_next(session: AsyncSession) -> PurchaseOutbox | None:
+    """Claim the next due order and commit the claim.
+
+    ``FOR UPDATE SKIP LOCKED`` keeps replicas off the same row while the claim
+    is written. The claim pushes ``next_attempt_at`` out by the claim timeout,
+    so the row stays out of the due set while the panel is called without a
+    lock. If this process dies mid-attempt, the order becomes due again.
+    """
+    result = await session.execute(
+        select(PurchaseOutbox)
+        .where(PurchaseOutbox.status == PENDING, PurchaseOutbox.next_attempt_at <= func.now())
+        .order_by(PurchaseOutbox.next_attempt_at)
+        .limit(1)
+        .with_for_update(skip_locked=True)
+    )
+    order = result.scalar_one_or_none()
+    if order is None:
+        return None
+
+    order.attempts += 1
+    order.next_attempt_at = datetime.now(timezone.utc) + timedelta(
+        seconds=settings.purchase_claim_timeout
+    )
+    await session.commit()
+    return order
+
+
+async def _lock_claimed(session: AsyncSession, order: PurchaseOutbox) -> PurchaseOutbox | None:
+    """Re-lock a claimed order, refreshed in place, to record its outcome.
+
+    Returns ``None`` when the claim expired and another worker has since made
+    a newer attempt; that worker owns the outcome.
+    """
+    result = await session.execute(
+        select(PurchaseOutbox)
+        .where(
+            PurchaseOutbox.id == order.id,
+            PurchaseOutbox.status == PENDING,
+            PurchaseOutbox.attempts == order.attempts,
+        )
+        .with_for_update()
+        .execution_options(populate_existing=True)
+    )
+    return result.scalar_one_or_none()
+
+
+async def _fulfil_next(session: AsyncSession) -> bool:
+    """Attempt the next due order; returns ``False`` when none is due.
+
+    The claim and the outcome commit in separate short transactions, and no
+    row lock or transaction is held while the panel is called. Nothing is
+    attempted while the panel circuit is open, so an outage does not use up
+    the orders' attempts and trigger refunds.
+    """
+    if not remnawave.available:
+        return False
+
+    order = await _claim_next(session)
+    if order is None:
+        return False
+
+    error = None
+    try:
+        before = await _apply(order)
+    except Exception as e:
+        error = str(e)[:256]
+
+    if await _lock_claimed(session, order) is None:
+        await session.rollback()
+        logger.warning(
+            f"Purchase {order.idempotency_key}: attempt {order.attempts} outlived its claim, "
+            "leaving the outcome to the newer attempt"
+        )
+        return True
+
+    if error is not None:
+        order.last_error = error
+        if order.attempts < settings.purchase_max_attempts:
+            delay = _retry_delay(order.attempts)
+            order.next_attempt_at = datetime.now(timezone.utc) + timedelta(seconds=delay)
+            await session.commit()
+            logger.warning(
+                f"Purchase {order.idempotency_key}: attempt {order.attempts} failed "
+                f"({order.last_error}), retrying in {delay:.0f}s"
+            )
+            return True
+
+        # Out of attempts: give the money back in the same transaction.
+        balance = await adjust_balance(
+            session, order.telegram_id, order.price, REFUND, order.idempotency_key
+        )
+        if balance is None:
+            # The wallet is gone, so nothing was refunded; leave it to an admin.
+            order.status = FAILED
+            await session.commit()
+            logger.error(
+                f"Purchase {order.idempotency_key}: failed after {order.attempts} attempts "
+                f"and could not be refunded (user {order.telegram_id} not found): "
+                f"{order.last_error}"
+            )
+            _notify_failed(order)
+            return True
+
+        order.status = REFUNDED
+        await session.commit()
+        logger.error(
+            f"Purchase {order.idempotency_key}: refunded after {order.attempts} attempts: "
+            f"{order.last_error}"
+        )
+        _notify_refunded(order, balance)
+        return True
+
+    order.status = DONE
+    order.last_error = None
+    await session.commit()
+    await invalidate_accounts(order.telegram_id)
+
+    user = (
+        await session.execute(select(User).where(User.telegram_id == order.telegram_id))
+    ).scalar_one_or_none()
+    _notify_done(order, user, before)
+    return True
+
+
+async def start_purchase_worker() -> None:
+    """Fulfil queued purchases, waking early when this process places an order."""
+    while True:
+        _wakeup.clear()
+        try:
+            async with AsyncSessionFactory() as session:
+                while await _fulfil_next(session):
+                    pass
+        except Exception as e:
+            logger.error(f"Purchase worker error: {e}")
+
+        try:
+            await asyncio.wait_for(_wakeup.wait(), timeout=settings.purchase_poll_interval)
+        except asyncio.TimeoutError:
+            pass
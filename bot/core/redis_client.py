@@ -0,0 +1,8 @@
+from __future__ import annotations
+
+from redis.asyncio import Redis
+
+from bot.config import settings
+
+# Shared connection pool for FSM storage, caches and coordination keys.
+redis_client: Redis = Redis.from_url(settings.redis_url)
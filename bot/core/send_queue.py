@@ -0,0 +1,194 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from dataclasses import dataclass, field
+from typing import Any
+
+from aiogram import Bot
+from aiogram.exceptions import (
+    TelegramBadRequest,
+    TelegramForbiddenError,
+    TelegramNetworkError,
+    TelegramRetryAfter,
+    TelegramServerError,
+)
+
+from bot.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class _TokenBucket:
+    """Classic token bucket: ``rate`` tokens per second, at most ``capacity`` stored."""
+
+    def __init__(self, rate: float, capacity: float) -> None:
+        self._rate = rate
+        self._capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self) -> None:
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(
+                    self._capacity, self._tokens + (now - self._updated) * self._rate
+                )
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self._rate)
+
+
+@dataclass
+class _OutboundMessage:
+    chat_id: int
+    kwargs: dict[str, Any]
+    future: asyncio.Future
+    enqueued_at: float = field(default_factory=time.monotonic)
+    attempts: int = 0
+
+
+class SendQueue:
+    """Central outbound queue for bulk Telegram messages.
+
+    Messages are drained by a small worker pool that respects a global token
+    bucket (Telegram allows ~30 msg/s per bot), spaces messages to the same chat,
+    pauses every worker when Telegram answers with ``retry_after`` and retries
+    transient network/server errors with exponential backoff.
+    """
+
+    def __init__(self) -> None:
+        self._queue: asyncio.Queue[_OutboundMessage] = asyncio.Queue()
+        self._bucket = _TokenBucket(settings.telegram_send_rate, settings.telegram_send_burst)
+        self._next_chat_slot: dict[int, float] = {}
+        self._paused_until = 0.0
+        self._workers: list[asyncio.Task] = []
+        self._bot: Bot | None = None
+
+        self.sent = 0
+        self.failed = 0
+        self.retried = 0
+        self.rate_limited = 0
+        self._latency_total = 0.0
+        self.latency_max = 0.0
+
+    def start(self, bot: Bot) -> None:
+        if self._workers:
+            return
+        self._bot = bot
+        self._workers = [
+            asyncio.create_task(self._worker(), name=f"send-queue-{i}")
+            for i in range(settings.telegram_send_workers)
+        ]
+        logger.info(f"Send queue started with {len(self._workers)} workers")
+
+    async def stop(self) -> None:
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+        logger.info(f"Send queue stopped: {self.stats()}")
+
+    def submit(self, chat_id: int, text: str, **kwargs: Any) -> asyncio.Future:
+        """Enqueue a message; the returned future resolves to ``True`` once delivered."""
+        future = asyncio.get_running_loop().create_future()
+        self._queue.put_nowait(
+            _OutboundMessage(chat_id=chat_id, kwargs={"text": text, **kwargs}, future=future)
+        )
+        return future
+
+    async def send_message(self, chat_id: int, text: str, **kwargs: Any) -> bool:
+        return await self.submit(chat_id, text, **kwargs)
+
+    def stats(self) -> dict[str, float]:
+        delivered = self.sent or 1
+        return {
+            "queued": self._queue.qsize(),
+            "sent": self.sent,
+            "failed": self.failed,
+            "retried": self.retried,
+            "rate_limited": self.rate_limited,
+            "latency_avg": round(self._latency_total / delivered, 3),
+            "latency_max": round(self.latency_max, 3),
+        }
+
+    async def _wait_for_slot(self, chat_id: int) -> None:
+        now = time.monotonic()
+        if self._paused_until > now:
+            await asyncio.sleep(self._paused_until - now)
+            now = time.monotonic()
+
+        slot = max(now, self._next_chat_slot.get(chat_id, 0.0))
+        self._next_chat_slot[chat_id] = slot + settings.telegram_chat_spacing
+        if slot > now:
+            await asyncio.sleep(slot - now)
+
+        await self._bucket.acquire()
+
+    def _finish(self, item: _OutboundMessage, ok: bool) -> None:
+        if ok:
+            self.sent += 1
+            latency = time.monotonic() - item.enqueued_at
+            self._latency_total += latency
+            self.latency_max = max(self.latency_max, latency)
+        else:
+            self.failed += 1
+        if not item.future.done():
+            item.future.set_result(ok)
+
+        # Drop spacing entries that are already in the past to keep the map small.
+        if self._next_chat_slot.get(item.chat_id, 0.0) <= time.monotonic():
+            self._next_chat_slot.pop(item.chat_id, None)
+
+    async def _worker(self) -> None:
+        while True:
+            item = await self._queue.get()
+            try:
+                await self._deliver(item)
+            except asyncio.CancelledError:
+                if not item.future.done():
+                    item.future.set_result(False)
+                raise
+            except Exception as e:
+                logger.error(f"Send queue: unexpected error for chat {item.chat_id}: {e}")
+                self._finish(item, False)
+            finally:
+                self._queue.task_done()
+
+    async def _deliver(self, item: _OutboundMessage) -> None:
+        while True:
+            await self._wait_for_slot(item.chat_id)
+            item.attempts += 1
+            try:
+                await self._bot.send_message(chat_id=item.chat_id, **item.kwargs)
+                self._finish(item, True)
+                return
+            except TelegramRetryAfter as e:
+                # Flood control is not the message's fault: pause everyone and retry.
+                self.rate_limited += 1
+                self._paused_until = max(self._paused_until, time.monotonic() + e.retry_after)
+                logger.warning(f"Send queue: rate limited, pausing for {e.retry_after}s")
+                item.attempts -= 1
+            except (TelegramForbiddenError, TelegramBadRequest) as e:
+                logger.error(f"Send queue: dropping message to {item.chat_id}: {e}")
+                self._finish(item, False)
+                return
+            except (TelegramNetworkError, TelegramServerError) as e:
+                if item.attempts >= settings.telegram_send_max_retries:
+                    logger.error(
+                        f"Send queue: giving up on {item.chat_id} after {item.attempts} "
+                        f"attempts: {e}"
+                    )
+                    self._finish(item, False)
+                    return
+                self.retried += 1
+                await asyncio.sleep(min(2 ** (item.attempts - 1), 30))
+
+
+# Singleton instance
+send_queue = SendQueue()
@@ -2,81 +2,332 @@ from __future__ import annotations
 
 import asyncio
 import logging
+import time
 from datetime import datetime, timedelta, timezone
 
 from bot.config import settings
-from bot.db.engine import engine
-from bot.db.base import Base
+from bot.core.forecast import (
+    depletion_time,
+    estimate_burn_rate,
+    forecast_scheduler,
+    next_check_time,
+)
+from bot.core.leader import background_lease, owns, stats_sync_shards
+from bot.core.notification_events import ThresholdEvent, detect_crossings, publish
+from bot.core.traffic_history import (
+    ensure_partitions,
+    prune_partitions,
+    record_usage,
+    traffic_day,
+    usage_delta,
+)
+from bot.db.engine import AsyncSessionFactory, engine
 from bot.db.models import User, UserStatsCache
 from bot.remnawave.client import remnawave
-from sqlalchemy import select
+from bot.utils.date import parse_iso_datetime
+from sqlalchemy import delete, select
+from sqlalchemy.dialects.postgresql import insert
 from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
 
 logger = logging.getLogger(__name__)
 
 SYNC_INTERVAL_MINUTES = 60
+FORECAST_SEED_RETRY_SECONDS = 60
 
 
-async def _sync_user_stats(session: AsyncSession) -> None:
-    result = await session.execute(select(User).where(User.remnawave_uuid.isnot(None)))
-    users = result.scalars().all()
+def _parse_panel_user(resp: dict) -> dict:
+    """Map a panel user payload to ``UserStatsCache`` column values."""
+    user_traffic = resp.get("userTraffic", {}) or {}
 
-    logger.info(f"Starting stats sync for {len(users)} users")
+    used_bytes = user_traffic.get("usedTrafficBytes", 0) or 0
+    total_bytes = resp.get("trafficLimitBytes", 0) or 0
+    remaining_bytes = max(0, total_bytes - used_bytes) if total_bytes > 0 else 0
 
-    for user in users:
-        if not user.remnawave_uuid:
-            continue
+    return {
+        "username": resp.get("username"),
+        "status": resp.get("status", "UNKNOWN"),
+        "used_traffic_bytes": used_bytes,
+        "total_traffic_bytes": total_bytes,
+        "remaining_traffic_bytes": remaining_bytes,
+        "expire_at": parse_iso_datetime(resp.get("expireAt")),
+        "online_at": parse_iso_datetime(user_traffic.get("onlineAt")),
+        "first_connected_at": parse_iso_datetime(user_traffic.get("firstConnectedAt")),
+    }
+
+
+class _StatsBatchWriter:
+    """Buffer parsed panel rows and upsert them into ``user_stats_cache`` in batches.
+
+    Each flush is a single ``INSERT ... ON CONFLICT (uuid) DO UPDATE`` followed by
+    one commit. The previous values of the batch are read first so newly crossed
+    warning thresholds can be published to the notifier, the traffic used
+    since the last pass can be added to the daily history and each account's
+    burn-rate forecast can be updated. Accounts predicted to cross a threshold
+    before the next regular pass are handed to the forecast scheduler.
+    """
+
+    def __init__(self, session: AsyncSession, batch_size: int) -> None:
+        self._session = session
+        self._batch_size = batch_size
+        self._rows: dict[str, dict] = {}
+        self.written = 0
+        self.events = 0
+
+    async def add(self, uuid: str, values: dict) -> None:
+        self._rows[uuid] = {"uuid": uuid, "updated_at": datetime.now(timezone.utc), **values}
+        if len(self._rows) >= self._batch_size:
+            await self.flush()
+
+    async def flush(self) -> None:
+        if not self._rows:
+            return
+        rows = list(self._rows.values())
+        self._rows = {}
+
+        result = await self._session.execute(
+            select(
+                UserStatsCache.uuid,
+                UserStatsCache.used_traffic_bytes,
+                UserStatsCache.total_traffic_bytes,
+                UserStatsCache.expire_at,
+                UserStatsCache.updated_at,
+                UserStatsCache.burn_rate,
+            ).where(UserStatsCache.uuid.in_([row["uuid"] for row in rows]))
+        )
+        previous = {row.uuid: row._asdict() for row in result.all()}
+
+        for row in rows:
+            rate = estimate_burn_rate(
+                previous.get(row["uuid"]), row["used_traffic_bytes"], row["updated_at"]
+            )
+            row["burn_rate"] = rate
+            row["depletes_at"] = depletion_time(
+                row["used_traffic_bytes"], row["total_traffic_bytes"], rate, row["updated_at"]
+            )
+            row["next_check_at"] = next_check_time(
+                row["used_traffic_bytes"],
+                row["total_traffic_bytes"],
+                row["expire_at"],
+                rate,
+                row["updated_at"],
+            )
+
+        stmt = insert(UserStatsCache).values(rows)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[UserStatsCache.uuid],
+            set_={column: stmt.excluded[column] for column in rows[0] if column != "uuid"},
+        )
+        await self._session.execute(stmt)
+
+        deltas = {
+            row["uuid"]: usage_delta(
+                previous[row["uuid"]]["used_traffic_bytes"] if row["uuid"] in previous else None,
+                row["used_traffic_bytes"],
+            )
+            for row in rows
+        }
+        await record_usage(self._session, deltas, traffic_day())
+
+        await self._session.commit()
+        self.written += len(rows)
+
+        now = datetime.now(timezone.utc)
+        events = [
+            ThresholdEvent(uuid=row["uuid"], kind=kind)
+            for row in rows
+            for kind in detect_crossings(previous.get(row["uuid"]), row, now)
+        ]
+        await publish(events)
+        self.events += len(events)
+
+        horizon = now + timedelta(minutes=SYNC_INTERVAL_MINUTES)
+        for row in rows:
+            if row["next_check_at"] is not None and row["next_check_at"] < horizon:
+                forecast_scheduler.schedule(row["uuid"], row["next_check_at"])
 
-        try:
-            data = await remnawave.get_user_stats(user.remnawave_uuid)
-            if data:
-                resp = data.get("response", data)
-                user_traffic = resp.get("userTraffic", {})
-
-                used_bytes = user_traffic.get("usedTrafficBytes", 0) or 0
-                total_bytes = resp.get("trafficLimitBytes", 0) or 0
-                remaining_bytes = max(0, total_bytes - used_bytes) if total_bytes > 0 else 0
-
-                result = await session.execute(
-                    select(UserStatsCache).where(UserStatsCache.uuid == user.remnawave_uuid)
-                )
-                cache = result.scalar_one_or_none()
-
-                if cache:
-                    cache.used_traffic_bytes = used_bytes
-                    cache.total_traffic_bytes = total_bytes
-                    cache.remaining_traffic_bytes = remaining_bytes
-                    cache.status = resp.get("status", "UNKNOWN")
-                    cache.expire_at = resp.get("expireAt")
-                    cache.online_at = user_traffic.get("onlineAt")
-                    cache.updated_at = datetime.now(timezone.utc)
-                else:
-                    cache = UserStatsCache(
-                        uuid=user.remnawave_uuid,
-                        username=resp.get("username"),
-                        status=resp.get("status", "UNKNOWN"),
-                        used_traffic_bytes=used_bytes,
-                        total_traffic_bytes=total_bytes,
-                        remaining_traffic_bytes=remaining_bytes,
-                        expire_at=resp.get("expireAt"),
-                        online_at=user_traffic.get("onlineAt"),
-                        updated_at=datetime.now(timezone.utc),
-                    )
-                    session.add(cache)
-
-                await session.commit()
 
+async def _sync_from_listing(
+    writer: _StatsBatchWriter, shard: tuple[int, int] | None = None
+) -> tuple[set[str], bool]:
+    """Refresh the cache from the paginated ``/api/users`` listing.
+
+    With a *shard*, every page is still read but only the accounts the shard
+    owns are written. Returns the set of uuids stored and whether every page
+    was read.
+    """
+    page_size = settings.stats_sync_page_size
+    semaphore = asyncio.Semaphore(settings.stats_sync_page_concurrency)
+    seen: set[str] = set()
+
+    async def fetch_page(page: int) -> list[dict] | None:
+        async with semaphore:
+            users, _ = await remnawave.get_all_users(page=page, per_page=page_size)
+            return users
+
+    async def store_page(users: list[dict]) -> None:
+        for resp in users:
+            uuid = resp.get("uuid")
+            if not uuid or (shard is not None and not owns(uuid, shard)):
+                continue
+            await writer.add(uuid, _parse_panel_user(resp))
+            seen.add(uuid)
+
+    first_page, total = await remnawave.get_all_users(page=1, per_page=page_size)
+    if first_page is None:
+        logger.error("Stats sync: failed to fetch first page of panel users")
+        return seen, False
+
+    await store_page(first_page)
+
+    complete = True
+    total_pages = (total + page_size - 1) // page_size
+    tasks = [asyncio.create_task(fetch_page(page)) for page in range(2, total_pages + 1)]
+    for task in asyncio.as_completed(tasks):
+        try:
+            users = await task
         except Exception as e:
-            logger.error(f"Failed to sync stats for {user.remnawave_uuid}: {e}")
+            logger.error(f"Stats sync: failed to fetch panel users page: {e}")
+            complete = False
+            continue
+        if not users:
+            complete = False
             continue
+        await store_page(users)
 
-    logger.info("Stats sync completed")
+    logger.info(f"Stats sync: refreshed {len(seen)} users from {max(total_pages, 1)} pages")
+    return seen, complete
 
 
-async def start_stats_sync_task() -> None:
-    async with engine.begin() as conn:
-        await conn.run_sync(Base.metadata.create_all)
+async def _prune_stats_cache(
+    session: AsyncSession, listed_since: datetime, shard: tuple[int, int] | None = None
+) -> None:
+    """Drop cache rows for accounts a complete listing pass no longer returned.
+
+    Every account in the listing was rewritten with ``updated_at`` after
+    *listed_since*, so older rows belong to users deleted on the panel. With a
+    *shard*, only the rows that shard owns (and so just rewrote) are dropped.
+    """
+    stale = delete(UserStatsCache).where(UserStatsCache.updated_at < listed_since)
+    if shard is not None:
+        result = await session.execute(
+            select(UserStatsCache.uuid).where(UserStatsCache.updated_at < listed_since)
+        )
+        owned = [uuid for uuid in result.scalars() if owns(uuid, shard)]
+        if not owned:
+            return
+        stale = stale.where(UserStatsCache.uuid.in_(owned))
+    result = await session.execute(stale)
+    await session.commit()
+    if result.rowcount:
+        logger.info(f"Stats sync: pruned {result.rowcount} cache rows missing from the panel")
+
+
+async def _sync_per_user(writer: _StatsBatchWriter, uuids: list[str]) -> None:
+    """Fetch stats one uuid at a time, fanned out over a bounded worker pool.
+
+    Each request is capped by ``stats_sync_request_timeout`` so a slow or failing
+    uuid only costs its own slot, never the whole pass.
+    """
+    semaphore = asyncio.Semaphore(settings.stats_sync_concurrency)
+    timeout = settings.stats_sync_request_timeout
+    batch_size = settings.stats_sync_batch_size
+
+    async def fetch(uuid: str) -> dict | None:
+        async with semaphore:
+            try:
+                data = await asyncio.wait_for(remnawave.get_user_stats(uuid), timeout)
+            except asyncio.TimeoutError:
+                logger.warning(f"Stats sync timed out for {uuid} after {timeout}s")
+                return None
+            except Exception as e:
+                logger.error(f"Failed to sync stats for {uuid}: {e}")
+                return None
+        if not data:
+            return None
+        return data.get("response", data)
+
+    for offset in range(0, len(uuids), batch_size):
+        batch = uuids[offset : offset + batch_size]
+        started = time.perf_counter()
 
+        results = await asyncio.gather(*(fetch(uuid) for uuid in batch))
+
+        synced = 0
+        for uuid, resp in zip(batch, results):
+            if resp:
+                await writer.add(uuid, _parse_panel_user(resp))
+                synced += 1
+
+        elapsed = time.perf_counter() - started
+        logger.info(
+            f"Stats sync per-user batch {offset // batch_size + 1}: "
+            f"{synced}/{len(batch)} ok in {elapsed:.1f}s"
+        )
+
+
+def _linked_uuids_query():
+    """Every panel uuid linked to a bot user.
+
+    Ordering by uuid lets the planner answer the DISTINCT straight from
+    ix_users_remnawave_uuid with an index-only scan instead of hashing the table.
+    """
+    return (
+        select(User.remnawave_uuid)
+        .where(User.remnawave_uuid.isnot(None))
+        .distinct()
+        .order_by(User.remnawave_uuid)
+    )
+
+
+async def _sync_user_stats(session: AsyncSession) -> None:
+    result = await session.execute(_linked_uuids_query())
+    uuids = [uuid for uuid in result.scalars().all() if uuid]
+
+    shard = None
+    if settings.stats_sync_sharding:
+        shard = await stats_sync_shards.current_shard()
+        uuids = [uuid for uuid in uuids if owns(uuid, shard)]
+        logger.info(f"Stats sync shard {shard[0] + 1}/{shard[1]}")
+
+    logger.info(f"Starting stats sync for {len(uuids)} users (mode={settings.stats_sync_mode})")
+
+    # Every replica writes daily traffic, so each makes sure its partitions exist;
+    # dropping old ones is left to a single replica.
+    await ensure_partitions(session)
+    if shard is None or background_lease.is_leader:
+        await prune_partitions(session)
+    await session.commit()
+
+    started = time.perf_counter()
+    writer = _StatsBatchWriter(session, settings.stats_sync_batch_size)
+
+    seen: set[str] = set()
+    complete = False
+    listed_since = datetime.now(timezone.utc)
+    # Sharded replicas each read the whole listing and keep their own accounts,
+    # so panel-only accounts still reach the cache and each shard can prune its part.
+    if settings.stats_sync_mode == "bulk":
+        seen, complete = await _sync_from_listing(writer, shard)
+
+    missing = [uuid for uuid in uuids if uuid not in seen]
+    if missing:
+        await _sync_per_user(writer, missing)
+
+    await writer.flush()
+
+    # Only a listing that returned every page shows which accounts are gone.
+    if complete and seen:
+        await _prune_stats_cache(session, listed_since, shard)
+
+    elapsed = time.perf_counter() - started
+    rate = writer.written / elapsed if elapsed > 0 else 0.0
+    logger.info(
+        f"Stats sync completed: {writer.written} rows in {elapsed:.1f}s ({rate:.0f} rows/sec), "
+        f"{writer.events} threshold events"
+    )
+
+
+async def start_stats_sync_task() -> None:
     session_factory = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
 
     while True:
@@ -87,3 +338,42 @@ async def start_stats_sync_task() -> None:
             logger.error(f"Stats sync error: {e}")
 
         await asyncio.sleep(SYNC_INTERVAL_MINUTES * 60)
+
+
+async def _refresh_accounts(uuids: list[str]) -> None:
+    """Re-fetch the given accounts from the panel and run them through the writer."""
+    async with AsyncSessionFactory() as session:
+        writer = _StatsBatchWriter(session, settings.stats_sync_batch_size)
+        await _sync_per_user(writer, uuids)
+        await writer.flush()
+
+
+async def _seed_forecast_schedule() -> None:
+    """Schedule the accounts already due before the next regular pass."""
+    horizon = datetime.now(timezone.utc) + timedelta(minutes=SYNC_INTERVAL_MINUTES)
+    async with AsyncSessionFactory() as session:
+        result = await session.execute(
+            select(UserStatsCache.uuid, UserStatsCache.next_check_at).where(
+                UserStatsCache.next_check_at < horizon
+            )
+        )
+        rows = result.all()
+
+    shard = await stats_sync_shards.current_shard() if settings.stats_sync_sharding else None
+    for uuid, next_check_at in rows:
+        if shard is None or owns(uuid, shard):
+            forecast_scheduler.schedule(uuid, next_check_at)
+
+
+async def start_forecast_task() -> None:
+    """Re-check accounts at their predicted threshold crossing between regular passes."""
+    while True:
+        try:
+            await _seed_forecast_schedule()
+            break
+        except Exception as e:
+            logger.error(f"Forecast scheduler seed error: {e}")
+        await asyncio.sleep(FORECAST_SEED_RETRY_SECONDS)
+
+    logger.info(f"Forecast scheduler started with {len(forecast_scheduler)} pending accounts")
+    await forecast_scheduler.run(_refresh_accounts)
@@ -0,0 +1,127 @@
+from __future__ import annotations
+
+import logging
+from datetime import date, datetime, timedelta
+from zoneinfo import ZoneInfo
+
+from bot.config import settings
+from bot.db.models import DailyTraffic
+from sqlalchemy import func, select, text
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+logger = logging.getLogger(__name__)
+
+# Days are counted in the users' local time, like the dates shown in the bot.
+TRAFFIC_DAY_TZ = ZoneInfo("Asia/Tehran")
+
+_PARTITION_PREFIX = f"{DailyTraffic.__tablename__}_"
+
+
+def traffic_day(now: datetime | None = None) -> date:
+    return (now or datetime.now(TRAFFIC_DAY_TZ)).astimezone(TRAFFIC_DAY_TZ).date()
+
+
+def _month_start(day: date, months_ahead: int = 0) -> date:
+    month_index = day.year * 12 + day.month - 1 + months_ahead
+    return date(month_index // 12, month_index % 12 + 1, 1)
+
+
+def usage_delta(previous_used: int | None, used: int) -> int:
+    """Bytes used since the previous snapshot.
+
+    A counter that went down was reset on the panel (renewal or manual reset),
+    so everything on it now was used since then. Accounts seen for the first
+    time have no baseline and contribute nothing.
+    """
+    if previous_used is None:
+        return 0
+    if used < previous_used:
+        return used
+    return used - previous_used
+
+
+async def ensure_partitions(session: AsyncSession, today: date | None = None) -> None:
+    """Create this month's and next month's partitions if they are missing.
+
+    Safe to run on every replica before it writes: ``IF NOT EXISTS`` alone
+    still races in the catalog, so concurrent callers queue on a transaction
+    advisory lock and the later ones find the tables already there.
+    """
+    today = today or traffic_day()
+    await session.execute(
+        text("SELECT pg_advisory_xact_lock(hashtext(:name))"),
+        {"name": _PARTITION_PREFIX},
+    )
+    for offset in (0, 1):
+        start = _month_start(today, offset)
+        end = _month_start(today, offset + 1)
+        await session.execute(
+            text(
+                f"CREATE TABLE IF NOT EXISTS {_PARTITION_PREFIX}{start:%Y%m} "
+                f"PARTITION OF {DailyTraffic.__tablename__} "
+                f"FOR VALUES FROM ('{start.isoformat()}') TO ('{end.isoformat()}')"
+            )
+        )
+
+
+async def prune_partitions(session: AsyncSession, today: date | None = None) -> None:
+    """Drop monthly partitions older than ``traffic_history_months``."""
+    today = today or traffic_day()
+    oldest_kept = f"{_month_start(today, 1 - settings.traffic_history_months):%Y%m}"
+
+    result = await session.execute(
+        text(
+            "SELECT child.relname FROM pg_inherits "
+            "JOIN pg_class parent ON parent.oid = pg_inherits.inhparent "
+            "JOIN pg_class child ON child.oid = pg_inherits.inhrelid "
+            "WHERE parent.relname = :parent"
+        ),
+        {"parent": DailyTraffic.__tablename__},
+    )
+    for (name,) in result.all():
+        suffix = name.removeprefix(_PARTITION_PREFIX)
+        if suffix.isdigit() and len(suffix) == 6 and suffix < oldest_kept:
+            await session.execute(text(f"DROP TABLE IF EXISTS {name}"))
+            logger.info(f"Traffic history: dropped partition {name}")
+
+
+async def record_usage(session: AsyncSession, deltas: dict[str, int], day: date) -> None:
+    """Add per-account byte deltas to *day*'s rows. Does not commit."""
+    rows = [
+        {"uuid": uuid, "day": day, "used_bytes": delta} for uuid, delta in deltas.items() if delta
+    ]
+    if not rows:
+        return
+    stmt = insert(DailyTraffic).values(rows)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[DailyTraffic.uuid, DailyTraffic.day],
+        set_={"used_bytes": DailyTraffic.used_bytes + stmt.excluded.used_bytes},
+    )
+    await session.execute(stmt)
+
+
+async def usage_since(session: AsyncSession, uuids: list[str], days: int = 1) -> dict[str, int]:
+    """Bytes used by each account over the last *days* days, today included."""
+    if not uuids:
+        return {}
+    since = traffic_day() - timedelta(days=days - 1)
+    result = await session.execute(
+        select(DailyTraffic.uuid, func.sum(DailyTraffic.used_bytes))
+        .where(DailyTraffic.uuid.in_(uuids), DailyTraffic.day >= since)
+        .group_by(DailyTraffic.uuid)
+    )
+    return {uuid: int(total or 0) for uuid, total in result.all()}
+
+
+async def recent_usage(session: AsyncSession, uuid: str) -> tuple[int, int]:
+    """Bytes *uuid* used today and over the last seven days, from one aggregate query."""
+    today = traffic_day()
+    result = await session.execute(
+        select(
+            func.sum(DailyTraffic.used_bytes).filter(DailyTraffic.day == today),
+            func.sum(DailyTraffic.used_bytes),
+        ).where(DailyTraffic.uuid == uuid, DailyTraffic.day >= today - timedelta(days=6))
+    )
+    today_bytes, week_bytes = result.one()
+    return int(today_bytes or 0), int(week_bytes or 0)
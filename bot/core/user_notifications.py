@@ -3,20 +3,36 @@ from __future__ import annotations
 import asyncio
 import logging
 from datetime import datetime, timedelta, timezone
-from aiogram import Bot
 
 from bot.config import settings
+from bot.core.notification_events import (
+    EXPIRY_WARNING_DAYS,
+    VOLUME_WARNING_TIERS,
+    acknowledge_events,
+    expiry_days_left,
+    pending_events,
+    period_marker,
+    requeue_unacknowledged,
+    volume_tier,
+    wait_for_events,
+)
+from bot.core.send_queue import send_queue
 from bot.db.engine import engine
-from bot.db.base import Base
-from bot.db.models import User, UserStatsCache
+from bot.db.models import NotificationLedger, User, UserStatsCache
 from bot.keyboards.inline import main_menu_kb
 from bot.remnawave.client import remnawave
-from sqlalchemy import select
+from sqlalchemy import and_, func, literal_column, or_, select
+from sqlalchemy.dialects.postgresql import insert
 from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
 
 logger = logging.getLogger(__name__)
 
-NOTIFICATION_INTERVAL_MINUTES = 60
+VOLUME_WARNING_PERCENT = VOLUME_WARNING_TIERS[0]
+NOTIFICATION_STREAM_CHUNK = 500
+NOTIFICATION_BATCH_WINDOW_SECONDS = 2
+NOTIFICATION_BATCH_MAX = 1000
+NOTIFICATION_POLL_SECONDS = 30
+NOTIFICATION_CATCH_UP_MINUTES = 360
 
 
 def format_bytes(bytes_val: int) -> str:
@@ -27,16 +43,37 @@ def format_bytes(bytes_val: int) -> str:
     return f"{bytes_val:.2f} PB"
 
 
-async def _send_notification(bot: Bot, user: User, cache: UserStatsCache, lang: str) -> None:
+def _renew_kb():
     from bot.keyboards.inline import InlineKeyboardMarkup, InlineKeyboardButton
 
+    return InlineKeyboardMarkup(
+        inline_keyboard=[
+            [
+                InlineKeyboardButton(text="💰 کیف پول", callback_data="menu:wallet"),
+                InlineKeyboardButton(text="📦 بسته ها", callback_data="packages:back"),
+            ],
+            [InlineKeyboardButton(text="🔙 منوی اصلی", callback_data="menu:main")],
+        ]
+    )
+
+
+def _due_warnings(user: User, cache: UserStatsCache, lang: str) -> list[tuple[str, str, str]]:
+    """Return ``(kind, marker, text)`` for every warning *user* is currently due.
+
+    The marker pins the warning to one threshold crossing within the current
+    subscription period (``expire_at`` changes on every renewal), which is what
+    the ledger compares against.
+    """
+    warnings: list[tuple[str, str, str]] = []
+
     used = cache.used_traffic_bytes or 0
     total = cache.total_traffic_bytes or 0
 
-    if total > 0:
-        usage_percent = (used / total) * 100
+    if user.volume_warning_enabled:
+        tier = volume_tier(used, total)
 
-        if usage_percent >= 90 and user.volume_warning_enabled:
+        if tier is not None:
+            usage_percent = (used / total) * 100
             used_gb = round(used / (1024**3), 2)
             total_gb = round(total / (1024**3), 2)
 
@@ -55,103 +92,178 @@ async def _send_notification(bot: Bot, user: User, cache: UserStatsCache, lang:
                     f"Tap the button below to renew your package:"
                 )
 
-            kb = InlineKeyboardMarkup(
-                inline_keyboard=[
-                    [
-                        InlineKeyboardButton(text="💰 کیف پول", callback_data="menu:wallet"),
-                        InlineKeyboardButton(text="📦 بسته ها", callback_data="packages:back"),
-                    ],
-                    [InlineKeyboardButton(text="🔙 منوی اصلی", callback_data="menu:main")],
-                ]
-            )
+            warnings.append(("volume", f"{tier}:{period_marker(cache.expire_at)}", text))
 
-            try:
-                await bot.send_message(
-                    chat_id=user.telegram_id, text=text, reply_markup=kb, parse_mode="HTML"
-                )
-                logger.info(f"Sent volume warning to user {user.telegram_id}")
-            except Exception as e:
-                logger.error(f"Failed to send volume warning to {user.telegram_id}: {e}")
+    if user.expiry_warning_enabled:
+        days_left = expiry_days_left(cache.expire_at, datetime.now(timezone.utc))
 
-    if cache.expire_at:
-        try:
-            expire_time = datetime.fromisoformat(cache.expire_at.replace("Z", "+00:00"))
-            now = datetime.now(timezone.utc)
-            days_left = (expire_time - now).days
-
-            if 0 <= days_left < 2 and user.expiry_warning_enabled:
-                if lang == "fa":
-                    text = (
-                        f"⏰ <b>هشدار انقضا!</b>\n\n"
-                        f"کاربر گرامی، تنها <b>{days_left} روز</b> از اشتراک شما باقی مانده است.\n\n"
-                        f"برای تمدید اشتراک، دکمه زیر را لمس کنید:"
-                    )
-                else:
-                    text = (
-                        f"⏰ <b>Expiry Warning!</b>\n\n"
-                        f"Dear user, you have only <b>{days_left} day(s)</b> left on your subscription.\n\n"
-                        f"Tap the button below to renew your subscription:"
-                    )
-
-                kb = InlineKeyboardMarkup(
-                    inline_keyboard=[
-                        [
-                            InlineKeyboardButton(text="💰 کیف پول", callback_data="menu:wallet"),
-                            InlineKeyboardButton(text="📦 بسته ها", callback_data="packages:back"),
-                        ],
-                        [InlineKeyboardButton(text="🔙 منوی اصلی", callback_data="menu:main")],
-                    ]
+        if days_left is not None:
+            if lang == "fa":
+                text = (
+                    f"⏰ <b>هشدار انقضا!</b>\n\n"
+                    f"کاربر گرامی، تنها <b>{days_left} روز</b> از اشتراک شما باقی مانده است.\n\n"
+                    f"برای تمدید اشتراک، دکمه زیر را لمس کنید:"
+                )
+            else:
+                text = (
+                    f"⏰ <b>Expiry Warning!</b>\n\n"
+                    f"Dear user, you have only <b>{days_left} day(s)</b> left on your subscription.\n\n"
+                    f"Tap the button below to renew your subscription:"
                 )
 
-                try:
-                    await bot.send_message(
-                        chat_id=user.telegram_id, text=text, reply_markup=kb, parse_mode="HTML"
+            warnings.append(("expiry", f"{days_left}:{period_marker(cache.expire_at)}", text))
+
+    return warnings
+
+
+async def _load_ledger(
+    session: AsyncSession, telegram_ids: list[int]
+) -> dict[tuple[int, str, str], str]:
+    result = await session.execute(
+        select(
+            NotificationLedger.telegram_id,
+            NotificationLedger.uuid,
+            NotificationLedger.kind,
+            NotificationLedger.marker,
+        ).where(NotificationLedger.telegram_id.in_(telegram_ids))
+    )
+    return {(tg, uuid, kind): marker for tg, uuid, kind, marker in result.all()}
+
+
+async def _record_sent(session: AsyncSession, rows: list[dict]) -> None:
+    if not rows:
+        return
+    stmt = insert(NotificationLedger).values(rows)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[
+            NotificationLedger.telegram_id,
+            NotificationLedger.uuid,
+            NotificationLedger.kind,
+        ],
+        set_={"marker": stmt.excluded.marker, "sent_at": func.now()},
+    )
+    await session.execute(stmt)
+    await session.commit()
+
+
+def _notification_candidates_query(now: datetime):
+    """Users joined to their stats row, limited in SQL to those that may need a warning.
+
+    Mirrors the thresholds in ``_due_warnings`` so the Python loop only
+    sees candidates.
+    """
+    # Literal constants keep the predicate identical to ix_user_stats_cache_low_traffic,
+    # and the bare boolean flags let the planner prove ix_users_remnawave_uuid_warnings.
+    volume_due = and_(
+        User.volume_warning_enabled,
+        UserStatsCache.total_traffic_bytes > literal_column("0"),
+        UserStatsCache.used_traffic_bytes * literal_column("100")
+        >= UserStatsCache.total_traffic_bytes * literal_column(str(VOLUME_WARNING_PERCENT)),
+    )
+    expiry_due = and_(
+        User.expiry_warning_enabled,
+        UserStatsCache.expire_at >= now,
+        UserStatsCache.expire_at < now + timedelta(days=EXPIRY_WARNING_DAYS),
+    )
+    return (
+        select(User, UserStatsCache)
+        .join(UserStatsCache, UserStatsCache.uuid == User.remnawave_uuid)
+        .where(or_(volume_due, expiry_due))
+        .execution_options(yield_per=NOTIFICATION_STREAM_CHUNK)
+    )
+
+
+async def _notify_accounts(
+    session: AsyncSession, kinds_by_uuid: dict[str, set[str]] | None
+) -> None:
+    """Send the warnings signalled for the given accounts, skipping ones already sent.
+
+    With ``None`` every candidate is checked for every warning kind: the
+    catch-up pass that delivers crossings whose event was lost or whose
+    message failed.
+    """
+    checked = 0
+    skipped = 0
+    queued: list[tuple[asyncio.Future, dict]] = []
+    stmt = _notification_candidates_query(datetime.now(timezone.utc))
+    if kinds_by_uuid is not None:
+        stmt = stmt.where(UserStatsCache.uuid.in_(list(kinds_by_uuid)))
+    result = await session.stream(stmt)
+    async for partition in result.partitions(NOTIFICATION_STREAM_CHUNK):
+        ledger = await _load_ledger(session, [user.telegram_id for user, _ in partition])
+
+        for user, cache in partition:
+            checked += 1
+            try:
+                for kind, marker, text in _due_warnings(user, cache, user.lang):
+                    if kinds_by_uuid is not None and kind not in kinds_by_uuid[cache.uuid]:
+                        continue
+                    if ledger.get((user.telegram_id, cache.uuid, kind)) == marker:
+                        skipped += 1
+                        continue
+                    future = send_queue.submit(
+                        user.telegram_id, text, reply_markup=_renew_kb(), parse_mode="HTML"
                     )
-                    logger.info(f"Sent expiry warning to user {user.telegram_id}")
-                except Exception as e:
-                    logger.error(f"Failed to send expiry warning to {user.telegram_id}: {e}")
-
-        except Exception as e:
-            logger.error(f"Failed to parse expire_at for user {user.telegram_id}: {e}")
-
-
-async def _check_user_notifications(bot: Bot, session: AsyncSession) -> None:
-    result = await session.execute(select(User).where(User.remnawave_uuid.isnot(None)))
-    users = result.scalars().all()
-
-    logger.info(f"Starting notification check for {len(users)} users")
-
-    for user in users:
-        if not user.remnawave_uuid:
-            continue
-
-        try:
-            result = await session.execute(
-                select(UserStatsCache).where(UserStatsCache.uuid == user.remnawave_uuid)
-            )
-            cache = result.scalar_one_or_none()
-
-            if cache:
-                await _send_notification(bot, user, cache, user.lang)
-
-        except Exception as e:
-            logger.error(f"Failed to check notifications for {user.telegram_id}: {e}")
-            continue
-
-    logger.info("Notification check completed")
-
-
-async def start_notification_task(bot: Bot) -> None:
-    async with engine.begin() as conn:
-        await conn.run_sync(Base.metadata.create_all)
-
+                    row = {
+                        "telegram_id": user.telegram_id,
+                        "uuid": cache.uuid,
+                        "kind": kind,
+                        "marker": marker,
+                    }
+                    queued.append((future, row))
+            except Exception as e:
+                logger.error(f"Failed to check notifications for {user.telegram_id}: {e}")
+                continue
+
+    delivered = await asyncio.gather(*(future for future, _ in queued))
+    await _record_sent(session, [row for ok, (_, row) in zip(delivered, queued) if ok])
+
+    scope = "accounts on catch-up" if kinds_by_uuid is None else f"{len(kinds_by_uuid)} accounts"
+    logger.info(
+        f"Notified {scope} ({checked} candidates): "
+        f"{sum(delivered)}/{len(delivered)} warnings delivered, {skipped} already sent "
+        f"({send_queue.stats()})"
+    )
+
+
+async def start_notification_task() -> None:
+    """Deliver warnings for the threshold events queued by the stats sync.
+
+    Events are acknowledged only after their batch has been handled. A failed
+    batch is requeued, and so is anything left claimed when the task starts,
+    so a restart or a lease moving to another replica picks them up again. Every
+    ``NOTIFICATION_CATCH_UP_MINUTES`` (and on start) all candidates are checked
+    against the ledger as well, which covers failed deliveries and events that
+    never reached Redis.
+    """
     session_factory = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    loop = asyncio.get_running_loop()
+    next_catch_up = loop.time()
+    requeue = True
 
     while True:
         try:
-            async with session_factory() as session:
-                await _check_user_notifications(bot, session)
+            if requeue:
+                await requeue_unacknowledged()
+                requeue = False
+            events = await pending_events(NOTIFICATION_BATCH_MAX)
+            if events:
+                kinds_by_uuid: dict[str, set[str]] = {}
+                for event in events:
+                    kinds_by_uuid.setdefault(event.uuid, set()).add(event.kind)
+                async with session_factory() as session:
+                    await _notify_accounts(session, kinds_by_uuid)
+                await acknowledge_events(events)
+                continue
+
+            if loop.time() >= next_catch_up:
+                next_catch_up = loop.time() + NOTIFICATION_CATCH_UP_MINUTES * 60
+                async with session_factory() as session:
+                    await _notify_accounts(session, None)
         except Exception as e:
-            logger.error(f"Notification check error: {e}")
+            logger.error(f"Notification delivery error: {e}")
+            requeue = True
 
-        await asyncio.sleep(NOTIFICATION_INTERVAL_MINUTES * 60)
+        await wait_for_events(NOTIFICATION_POLL_SECONDS)
+        # Let the rest of a sync burst arrive so it is handled as one batch.
+        await asyncio.sleep(NOTIFICATION_BATCH_WINDOW_SECONDS)
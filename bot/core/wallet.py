@@ -0,0 +1,163 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import func, literal, select, tuple_, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from bot.config import settings
+from bot.db.engine import AsyncSessionFactory
+from bot.db.models import User, WalletBalanceSummary, WalletTransaction
+
+logger = logging.getLogger(__name__)
+
+HISTORY_PAGE_SIZE = 10
+
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+_SUMMARY_ID = 1
+
+
+def record_transaction(
+    session: AsyncSession,
+    telegram_id: int,
+    kind: str,
+    amount: int,
+    balance_after: int,
+    reference: str | None = None,
+) -> None:
+    """Add a ledger row to *session*; it commits together with the balance change."""
+    session.add(
+        WalletTransaction(
+            telegram_id=telegram_id,
+            kind=kind,
+            amount=amount,
+            balance_after=balance_after,
+            reference=reference,
+        )
+    )
+
+
+async def adjust_balance(
+    session: AsyncSession,
+    telegram_id: int,
+    delta: int,
+    kind: str,
+    reference: str | None = None,
+) -> int | None:
+    """Apply *delta* to a wallet and record it; return the new balance.
+
+    The change is one conditional ``UPDATE ... RETURNING``, so concurrent
+    credits and debits cannot lose each other's writes and a debit can never
+    take the balance below zero. Returns ``None`` (and changes nothing) when
+    the user does not exist or the balance would go negative. The caller
+    commits, which keeps the ledger row and any related writes in the same
+    transaction.
+    """
+    result = await session.execute(
+        update(User)
+        .where(User.telegram_id == telegram_id, User.balance + delta >= 0)
+        .values(balance=User.balance + delta)
+        .returning(User.balance),
+        execution_options={"synchronize_session": "fetch"},
+    )
+    balance = result.scalar_one_or_none()
+    if balance is not None:
+        record_transaction(session, telegram_id, kind, delta, balance, reference)
+    return balance
+
+
+def encode_cursor(transaction: WalletTransaction) -> str:
+    """Position just past *transaction* in the history, compact enough for callback data."""
+    micros = (transaction.created_at - _EPOCH) // timedelta(microseconds=1)
+    return f"{micros}:{transaction.id}"
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, int]:
+    micros, transaction_id = cursor.split(":")
+    return _EPOCH + timedelta(microseconds=int(micros)), int(transaction_id)
+
+
+async def history_page(
+    session: AsyncSession,
+    telegram_id: int,
+    cursor: str | None = None,
+    limit: int = HISTORY_PAGE_SIZE,
+) -> tuple[list[WalletTransaction], str | None]:
+    """One page of a user's transactions, newest first, and the cursor of the next page.
+
+    Pages are keyed on ``(created_at, id)`` rather than an offset, so each page
+    is a bounded range scan of ``ix_wallet_transactions_history`` however deep
+    the user scrolls.
+    """
+    query = (
+        select(WalletTransaction)
+        .where(WalletTransaction.telegram_id == telegram_id)
+        .order_by(WalletTransaction.created_at.desc(), WalletTransaction.id.desc())
+        .limit(limit + 1)
+    )
+    if cursor:
+        query = query.where(
+            tuple_(WalletTransaction.created_at, WalletTransaction.id) < decode_cursor(cursor)
+        )
+
+    rows = list((await session.execute(query)).scalars().all())
+    if len(rows) > limit:
+        return rows[:limit], encode_cursor(rows[limit - 1])
+    return rows, None
+
+
+async def get_balance_summary(session: AsyncSession) -> WalletBalanceSummary:
+    """The latest wallet totals snapshot, taken on the spot if none exists yet."""
+    summary = await session.get(WalletBalanceSummary, _SUMMARY_ID)
+    if summary is None:
+        summary = await refresh_balance_summary(session)
+    return summary
+
+
+async def refresh_balance_summary(session: AsyncSession) -> WalletBalanceSummary:
+    """Recompute wallet totals and check every balance against its ledger."""
+    ledger = (
+        select(
+            WalletTransaction.telegram_id,
+            func.sum(WalletTransaction.amount).label("total"),
+        )
+        .group_by(WalletTransaction.telegram_id)
+        .subquery()
+    )
+    snapshot = select(
+        literal(_SUMMARY_ID),
+        func.coalesce(func.sum(User.balance), 0),
+        func.count().filter(User.balance > 0),
+        func.count().filter(User.balance != func.coalesce(ledger.c.total, 0)),
+        func.now(),
+    ).select_from(User.__table__.outerjoin(ledger, ledger.c.telegram_id == User.telegram_id))
+
+    columns = ["total_balance", "holders", "mismatched", "refreshed_at"]
+    stmt = insert(WalletBalanceSummary).from_select(["id", *columns], snapshot)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["id"], set_={column: stmt.excluded[column] for column in columns}
+    )
+    await session.execute(stmt)
+    await session.commit()
+
+    summary = await session.get(WalletBalanceSummary, _SUMMARY_ID, populate_existing=True)
+
+    if summary.mismatched:
+        logger.warning(
+            f"Wallet balance check: {summary.mismatched} users' balances differ from their ledger"
+        )
+    return summary
+
+
+async def start_balance_summary_task() -> None:
+    while True:
+        try:
+            async with AsyncSessionFactory() as session:
+                await refresh_balance_summary(session)
+        except Exception as e:
+            logger.error(f"Wallet balance summary error: {e}")
+
+        await asyncio.sleep(settings.wallet_summary_interval)
@@ -0,0 +1,80 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from pathlib import Path
+
+from alembic import command
+from alembic.config import Config
+from alembic.runtime.migration import MigrationContext
+from alembic.script import ScriptDirectory
+from sqlalchemy import inspect
+from sqlalchemy.engine import Connection
+
+from bot.db.engine import engine
+
+logger = logging.getLogger(__name__)
+
+PROJECT_ROOT = Path(__file__).resolve().parents[2]
+
+# Revision describing the schema that older releases created with ``create_all``.
+BASELINE_REVISION = "0001"
+# Releases between the notification ledger and Alembic also created this table.
+LEDGER_REVISION = "0002"
+
+
+def _alembic_config() -> Config:
+    config = Config(str(PROJECT_ROOT / "alembic.ini"))
+    config.set_main_option("script_location", str(PROJECT_ROOT / "migrations"))
+    config.attributes["configure_logger"] = False
+    return config
+
+
+def _schema_state(connection: Connection) -> tuple[set[str], str | None]:
+    current = set(MigrationContext.configure(connection).get_current_heads())
+    if current:
+        return current, None
+    inspector = inspect(connection)
+    if inspector.has_table("notification_ledger"):
+        return current, LEDGER_REVISION
+    if inspector.has_table("users"):
+        return current, BASELINE_REVISION
+    return current, None
+
+
+async def ensure_schema() -> None:
+    """Bring the database to the latest Alembic revision.
+
+    The common case — schema already at head — costs a single connection and
+    one ``alembic_version`` read. Databases created by ``create_all`` before
+    migrations existed are stamped with the revision matching their tables
+    first.
+    """
+    started = time.perf_counter()
+    config = _alembic_config()
+    heads = set(ScriptDirectory.from_config(config).get_heads())
+
+    async with engine.connect() as conn:
+        current, legacy_revision = await conn.run_sync(_schema_state)
+    check_ms = (time.perf_counter() - started) * 1000
+
+    if current == heads:
+        logger.info(f"Database schema at {', '.join(sorted(heads))} (head check {check_ms:.0f} ms)")
+        return
+
+    if legacy_revision is not None:
+        logger.warning(f"Unversioned database found, stamping {legacy_revision}")
+        await asyncio.to_thread(command.stamp, config, legacy_revision)
+
+    logger.info(f"Upgrading database schema from {sorted(current) or 'empty'} to head")
+    upgrade_started = time.perf_counter()
+    # env.py drives its own event loop, so run Alembic off this one.
+    await asyncio.to_thread(command.upgrade, config, "head")
+
+    upgrade_ms = (time.perf_counter() - upgrade_started) * 1000
+    total_ms = (time.perf_counter() - started) * 1000
+    logger.info(
+        f"Database schema upgraded to {', '.join(sorted(heads))} "
+        f"(head check {check_ms:.0f} ms, upgrade {upgrade_ms:.0f} ms, total {total_ms:.0f} ms)"
+    )
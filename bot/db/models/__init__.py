@@ -1,5 +1,18 @@
 from bot.db.models.user import User
 from bot.db.models.user_stats_cache import UserStatsCache
 from bot.db.models.package import Package
+from bot.db.models.notification_ledger import NotificationLedger
+from bot.db.models.daily_traffic import DailyTraffic
+from bot.db.models.wallet_transaction import WalletBalanceSummary, WalletTransaction
+from bot.db.models.purchase_outbox import PurchaseOutbox
 
-__all__ = ["User", "UserStatsCache", "Package"]
+__all__ = [
+    "User",
+    "UserStatsCache",
+    "Package",
+    "NotificationLedger",
+    "DailyTraffic",
+    "WalletTransaction",
+    "WalletBalanceSummary",
+    "PurchaseOutbox",
+]
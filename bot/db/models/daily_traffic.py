@@ -0,0 +1,27 @@
+from __future__ import annotations
+
+from datetime import date
+
+from sqlalchemy import BigInteger, Date, String
+from sqlalchemy.orm import Mapped, mapped_column
+
+from bot.db.base import Base
+
+
+class DailyTraffic(Base):
+    """Traffic used by one panel account on one day.
+
+    Append-only history filled by the stats sync from the change in
+    ``usedTrafficBytes`` between passes. The table is range-partitioned by month
+    on ``day``; partitions are created and pruned by ``bot.core.traffic_history``.
+    """
+
+    __tablename__ = "daily_traffic"
+    __table_args__ = {"postgresql_partition_by": "RANGE (day)"}
+
+    uuid: Mapped[str] = mapped_column(String(64), primary_key=True)
+    day: Mapped[date] = mapped_column(Date, primary_key=True)
+    used_bytes: Mapped[int] = mapped_column(BigInteger, nullable=False, default=0)
+
+    def __repr__(self) -> str:
+        return f"<DailyTraffic uuid={self.uuid} day={self.day} used={self.used_bytes}>"
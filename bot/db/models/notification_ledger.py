@@ -0,0 +1,32 @@
+from __future__ import annotations
+
+from datetime import datetime
+
+from sqlalchemy import BigInteger, DateTime, String, UniqueConstraint, func
+from sqlalchemy.orm import Mapped, mapped_column
+
+from bot.db.base import Base
+
+
+class NotificationLedger(Base):
+    """Last warning of each kind delivered to a user for one panel account.
+
+    ``marker`` identifies the threshold crossing (e.g. volume tier or days left
+    within the current subscription period); a warning is only sent again when
+    the marker changes.
+    """
+
+    __tablename__ = "notification_ledger"
+    __table_args__ = (UniqueConstraint("telegram_id", "uuid", "kind"),)
+
+    id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
+    telegram_id: Mapped[int] = mapped_column(BigInteger, nullable=False)
+    uuid: Mapped[str] = mapped_column(String(64), nullable=False)
+    kind: Mapped[str] = mapped_column(String(16), nullable=False)
+    marker: Mapped[str] = mapped_column(String(64), nullable=False)
+    sent_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), server_default=func.now(), nullable=False
+    )
+
+    def __repr__(self) -> str:
+        return f"<NotificationLedger tg={self.telegram_id} kind={self.kind} marker={self.marker}>"
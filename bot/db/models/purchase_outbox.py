@@ -0,0 +1,61 @@
+from __future__ import annotations
+
+from datetime import datetime
+
+from sqlalchemy import BigInteger, DateTime, Index, Integer, String, func, text
+from sqlalchemy.orm import Mapped, mapped_column
+
+from bot.db.base import Base
+
+PENDING = "pending"
+DONE = "done"
+REFUNDED = "refunded"
+# Out of attempts and the refund could not be applied; needs an admin.
+FAILED = "failed"
+
+
+class PurchaseOutbox(Base):
+    """A paid package purchase waiting to be applied on the panel.
+
+    Written in the same transaction that debits the wallet and fulfilled by the
+    background purchase worker. The panel payload (volume and absolute expiry)
+    is fixed when the order is placed, so replaying it after an ambiguous
+    failure sets the same state instead of extending the account twice.
+    """
+
+    __tablename__ = "purchase_outbox"
+    __table_args__ = (
+        # Orders the worker still has to attempt, in due order.
+        Index(
+            "ix_purchase_outbox_due",
+            "next_attempt_at",
+            postgresql_where=text("status = 'pending'"),
+        ),
+    )
+
+    id: Mapped[int] = mapped_column(BigInteger, primary_key=True, autoincrement=True)
+    idempotency_key: Mapped[str] = mapped_column(String(32), unique=True, nullable=False)
+    telegram_id: Mapped[int] = mapped_column(BigInteger, nullable=False)
+    uuid: Mapped[str] = mapped_column(String(64), nullable=False)
+    package_id: Mapped[int] = mapped_column(Integer, nullable=False)
+    package_name: Mapped[str] = mapped_column(String(128), nullable=False)
+    price: Mapped[int] = mapped_column(Integer, nullable=False)
+    volume_gb: Mapped[int] = mapped_column(Integer, nullable=False)
+    days: Mapped[int] = mapped_column(Integer, nullable=False)
+    expire_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False)
+    lang: Mapped[str] = mapped_column(String(4), nullable=False)
+    status: Mapped[str] = mapped_column(String(16), default=PENDING, nullable=False)
+    attempts: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+    next_attempt_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), server_default=func.now(), nullable=False
+    )
+    last_error: Mapped[str | None] = mapped_column(String(256), nullable=True)
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), server_default=func.now(), nullable=False
+    )
+    updated_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), nullable=False
+    )
+
+    def __repr__(self) -> str:
+        return f"<PurchaseOutbox {self.idempotency_key} tg={self.telegram_id} status={self.status}>"
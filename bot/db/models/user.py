@@ -2,7 +2,7 @@ from __future__ import annotations
 
 from datetime import datetime
 
-from sqlalchemy import BigInteger, Boolean, DateTime, Integer, String, func
+from sqlalchemy import BigInteger, Boolean, DateTime, Index, Integer, String, func, text
 from sqlalchemy.orm import Mapped, mapped_column
 
 from bot.db.base import Base
@@ -10,6 +10,20 @@ from bot.db.base import Base
 
 class User(Base):
     __tablename__ = "users"
+    __table_args__ = (
+        # Accounts the notifier may have to warn; the background loops join on uuid.
+        Index(
+            "ix_users_remnawave_uuid_warnings",
+            "remnawave_uuid",
+            postgresql_where=text("expiry_warning_enabled OR volume_warning_enabled"),
+        ),
+        # Wallet holders ranked by balance for the admin balance report.
+        Index(
+            "ix_users_balance_positive",
+            text("balance DESC"),
+            postgresql_where=text("balance > 0"),
+        ),
+    )
 
     id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
     telegram_id: Mapped[int] = mapped_column(BigInteger, unique=True, nullable=False, index=True)
@@ -18,7 +32,7 @@ class User(Base):
     lang: Mapped[str] = mapped_column(String(4), default="en", nullable=False)
     balance: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
     is_registered: Mapped[bool] = mapped_column(Boolean, default=False, nullable=False)
-    remnawave_uuid: Mapped[str | None] = mapped_column(String(64), nullable=True)
+    remnawave_uuid: Mapped[str | None] = mapped_column(String(64), nullable=True, index=True)
     expiry_warning_enabled: Mapped[bool] = mapped_column(Boolean, default=True, nullable=False)
     volume_warning_enabled: Mapped[bool] = mapped_column(Boolean, default=True, nullable=False)
     created_at: Mapped[datetime] = mapped_column(
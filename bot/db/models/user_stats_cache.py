@@ -2,14 +2,31 @@ from __future__ import annotations
 
 from datetime import datetime
 
-from sqlalchemy import BigInteger, String, DateTime, Text, JSON
+from sqlalchemy import BigInteger, String, DateTime, Float, Text, JSON, Index, text
 from sqlalchemy.orm import Mapped, mapped_column
 
 from bot.db.base import Base
 
 
+# Matches the first volume warning tier; the notifier's candidate query repeats
+# this predicate verbatim so the planner can use the partial index below.
+LOW_TRAFFIC_PERCENT = 90
+
+
 class UserStatsCache(Base):
     __tablename__ = "user_stats_cache"
+    __table_args__ = (
+        Index("ix_user_stats_cache_expire_at", "expire_at"),
+        Index("ix_user_stats_cache_online_at", "online_at"),
+        Index(
+            "ix_user_stats_cache_low_traffic",
+            "uuid",
+            postgresql_where=text(
+                "total_traffic_bytes > 0 "
+                f"AND used_traffic_bytes * 100 >= total_traffic_bytes * {LOW_TRAFFIC_PERCENT}"
+            ),
+        ),
+    )
 
     id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
     uuid: Mapped[str] = mapped_column(String(64), unique=True, nullable=False, index=True)
@@ -18,8 +35,17 @@ class UserStatsCache(Base):
     used_traffic_bytes: Mapped[int] = mapped_column(BigInteger, default=0)
     total_traffic_bytes: Mapped[int] = mapped_column(BigInteger, default=0)
     remaining_traffic_bytes: Mapped[int] = mapped_column(BigInteger, default=0)
-    expire_at: Mapped[str | None] = mapped_column(String(32), nullable=True)
-    online_at: Mapped[str | None] = mapped_column(String(64), nullable=True)
+    expire_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True), nullable=True)
+    online_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True), nullable=True)
+    first_connected_at: Mapped[datetime | None] = mapped_column(
+        DateTime(timezone=True), nullable=True
+    )
+    # Usage forecast, refreshed on every sync (see bot.core.forecast).
+    burn_rate: Mapped[float | None] = mapped_column(Float, nullable=True)  # bytes/second
+    depletes_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True), nullable=True)
+    next_check_at: Mapped[datetime | None] = mapped_column(
+        DateTime(timezone=True), nullable=True, index=True
+    )
     updated_at: Mapped[datetime] = mapped_column(
         DateTime(timezone=True), nullable=False, default=datetime.utcnow
     )
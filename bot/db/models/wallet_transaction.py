@@ -0,0 +1,68 @@
+from __future__ import annotations
+
+from datetime import datetime
+
+from sqlalchemy import BigInteger, DateTime, Index, Integer, String, func, text
+from sqlalchemy.orm import Mapped, mapped_column
+
+from bot.db.base import Base
+
+# Kinds of wallet movement recorded in the ledger.
+CHARGE = "charge"
+PURCHASE = "purchase"
+REFUND = "refund"
+ADJUST = "adjust"
+
+
+class WalletTransaction(Base):
+    """Append-only record of every change to a user's wallet balance.
+
+    ``amount`` is signed (debits are negative) and ``balance_after`` is the
+    balance the change produced, so a user's ledger always sums to
+    ``User.balance``. ``reference`` ties the row to its origin, such as the
+    charge request id or the purchased package.
+    """
+
+    __tablename__ = "wallet_transactions"
+    __table_args__ = (
+        # Serves the keyset-paginated wallet history, newest first.
+        Index(
+            "ix_wallet_transactions_history",
+            "telegram_id",
+            text("created_at DESC"),
+            text("id DESC"),
+        ),
+    )
+
+    id: Mapped[int] = mapped_column(BigInteger, primary_key=True, autoincrement=True)
+    telegram_id: Mapped[int] = mapped_column(BigInteger, nullable=False)
+    kind: Mapped[str] = mapped_column(String(16), nullable=False)
+    amount: Mapped[int] = mapped_column(Integer, nullable=False)
+    balance_after: Mapped[int] = mapped_column(Integer, nullable=False)
+    reference: Mapped[str | None] = mapped_column(String(64), nullable=True)
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), server_default=func.now(), nullable=False
+    )
+
+    def __repr__(self) -> str:
+        return f"<WalletTransaction tg={self.telegram_id} kind={self.kind} amount={self.amount}>"
+
+
+class WalletBalanceSummary(Base):
+    """Single-row snapshot of wallet totals, refreshed by a background job.
+
+    Lets the admin balance report avoid aggregating the whole ``users`` table
+    on every view. ``mismatched`` counts users whose balance disagrees with the
+    sum of their ledger rows.
+    """
+
+    __tablename__ = "wallet_balance_summary"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=False)
+    total_balance: Mapped[int] = mapped_column(BigInteger, nullable=False)
+    holders: Mapped[int] = mapped_column(Integer, nullable=False)
+    mismatched: Mapped[int] = mapped_column(Integer, nullable=False)
+    refreshed_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False)
+
+    def __repr__(self) -> str:
+        return f"<WalletBalanceSummary total={self.total_balance} holders={self.holders}>"
@@ -4,11 +4,11 @@ from aiogram import Router, F, Bot
 from aiogram.types import CallbackQuery, Message
 from aiogram.fsm.context import FSMContext
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
 import structlog
 
 from bot.config import settings
 from bot.core.i18n import t
+from bot.core.middlewares.user import forget_user_profile
 from bot.db.models.user import User
 from bot.keyboards.inline import auth_menu_kb, back_to_auth_kb, main_menu_kb, settings_kb
 from bot.remnawave.client import remnawave
@@ -22,14 +22,15 @@ router = Router(name="auth")
 
 
 @router.callback_query(F.data.startswith("lang:"))
-async def cb_lang_select(call: CallbackQuery, session: AsyncSession, state: FSMContext) -> None:
+async def cb_lang_select(
+    call: CallbackQuery, session: AsyncSession, state: FSMContext, user: User | None
+) -> None:
     lang = call.data.split(":")[1]
 
-    result = await session.execute(select(User).where(User.telegram_id == call.from_user.id))
-    user = result.scalar_one_or_none()
     if user:
         user.lang = lang
         await session.commit()
+        forget_user_profile(call.from_user.id)
 
     await state.update_data(lang=lang)
     await call.answer()
@@ -58,10 +59,10 @@ async def cb_lang_select(call: CallbackQuery, session: AsyncSession, state: FSMC
 
 
 @router.callback_query(F.data == "auth:login")
-async def cb_login(call: CallbackQuery, session: AsyncSession, state: FSMContext) -> None:
+async def cb_login(
+    call: CallbackQuery, session: AsyncSession, state: FSMContext, user: User | None
+) -> None:
     data = await state.get_data()
-    result = await session.execute(select(User).where(User.telegram_id == call.from_user.id))
-    user = result.scalar_one_or_none()
     lang = user.lang if user else data.get("lang", "en")
 
     await call.answer()
@@ -91,9 +92,7 @@ async def cb_login(call: CallbackQuery, session: AsyncSession, state: FSMContext
 
 
 @router.callback_query(F.data == "auth:back")
-async def cb_auth_back(call: CallbackQuery, session: AsyncSession, state: FSMContext) -> None:
-    result = await session.execute(select(User).where(User.telegram_id == call.from_user.id))
-    user = result.scalar_one_or_none()
+async def cb_auth_back(call: CallbackQuery, state: FSMContext, user: User | None) -> None:
     data = await state.get_data()
     lang = user.lang if user else data.get("lang", "en")
     await call.answer()
@@ -107,9 +106,7 @@ async def cb_auth_back(call: CallbackQuery, session: AsyncSession, state: FSMCon
 
 
 @router.callback_query(F.data == "auth:new_service")
-async def cb_new_service(call: CallbackQuery, session: AsyncSession, state: FSMContext) -> None:
-    result = await session.execute(select(User).where(User.telegram_id == call.from_user.id))
-    user = result.scalar_one_or_none()
+async def cb_new_service(call: CallbackQuery, state: FSMContext, user: User | None) -> None:
     data = await state.get_data()
     lang = user.lang if user else data.get("lang", "en")
     await call.answer()
@@ -126,12 +123,10 @@ async def cb_new_service(call: CallbackQuery, session: AsyncSession, state: FSMC
 @router.message(NewService.waiting_for_info)
 async def handle_new_service_info(
     message: Message,
-    session: AsyncSession,
     state: FSMContext,
     bot: Bot,
+    user: User | None,
 ) -> None:
-    result = await session.execute(select(User).where(User.telegram_id == message.from_user.id))
-    user = result.scalar_one_or_none()
     data = await state.get_data()
     lang = user.lang if user else data.get("lang", "en")
 
@@ -1,9 +1,18 @@
 from __future__ import annotations
 
+import asyncio
 from datetime import datetime, timedelta, timezone
 
+import aiohttp
+import structlog
 from aiogram import Router, F, Bot
-from aiogram.types import CallbackQuery, Message, InlineKeyboardMarkup, InlineKeyboardButton
+from aiogram.exceptions import TelegramBadRequest
+from aiogram.types import (
+    CallbackQuery,
+    Message,
+    InlineKeyboardMarkup,
+    InlineKeyboardButton,
+)
 from aiogram.fsm.context import FSMContext
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, func, and_
@@ -41,19 +50,19 @@ from bot.remnawave.client import (
     get_internal_squads,
     create_remnawave_user,
     revoke_user_subscription,
-    reset_and_set_user_package,
 )
+from bot.core.traffic_history import recent_usage, usage_since
+from bot.core.purchases import place_order
+from bot.core.wallet import get_balance_summary
+from bot.remnawave.cache import get_accounts_by_telegram_id, invalidate_accounts
 from bot.utils.date import to_persian_date, days_until_persian
+from bot.utils.qr import forget_qr_photo, get_qr_photo, remember_qr_photo, render_qr_photo
 from bot.states.fsm import Admin, Package
 
+log = structlog.get_logger()
 router = Router(name="menu")
 
 
-async def _get_user(session: AsyncSession, telegram_id: int) -> User | None:
-    result = await session.execute(select(User).where(User.telegram_id == telegram_id))
-    return result.scalar_one_or_none()
-
-
 async def _get_user_stats_from_cache(session: AsyncSession, uuid: str) -> UserStatsCache | None:
     result = await session.execute(select(UserStatsCache).where(UserStatsCache.uuid == uuid))
     return result.scalar_one_or_none()
@@ -63,9 +72,7 @@ async def _get_user_stats_from_cache(session: AsyncSession, uuid: str) -> UserSt
 
 
 @router.callback_query(F.data == "menu:back")
-async def cb_menu_back(call: CallbackQuery, session: AsyncSession) -> None:
-    user = await _get_user(session, call.from_user.id)
-    lang = user.lang if user else "en"
+async def cb_menu_back(call: CallbackQuery, lang: str) -> None:
     await call.answer()
     await call.message.edit_text(
         t(lang, "menu_welcome"),
@@ -76,7 +83,9 @@ async def cb_menu_back(call: CallbackQuery, session: AsyncSession) -> None:
 # ── Quick Stats ────────────────────────────────────────────────────────────────
 
 
-async def _build_stats_text(resp: dict, uuid: str, lang: str, use_cache: bool = False) -> str:
+async def _build_stats_text(
+    session: AsyncSession, resp: dict, uuid: str, lang: str, use_cache: bool = False
+) -> str:
     if use_cache and resp:
         cache = resp
         used_bytes = cache.used_traffic_bytes or 0
@@ -122,13 +131,16 @@ async def _build_stats_text(resp: dict, uuid: str, lang: str, use_cache: bool =
 
     last_connection = to_persian_date(online_at, include_time=True) if online_at else "—"
 
+    today_bytes, week_bytes = await recent_usage(session, uuid)
+
     return (
         f"👤 <b>{'نام' if lang == 'fa' else 'Name'}</b>: {username or '—'} ({status_fa})\n"
         f"──────────────────\n"
         f"🗂️ <b>{'حجم کل' if lang == 'fa' else 'Total'}</b>: {total_gb} GB\n"
         f"🔥 <b>{'حجم مصرف شده' if lang == 'fa' else 'Used'}</b>: {used_gb} GB\n"
         f"📥 <b>{'حجم باقیمانده' if lang == 'fa' else 'Remaining'}</b>: {remaining_gb} GB\n"
-        f"⚡️ <b>{'مصرف امروز' if lang == 'fa' else 'Today'}</b>: 0 MB\n"
+        f"⚡️ <b>{'مصرف امروز' if lang == 'fa' else 'Today'}</b>: {_format_bytes(today_bytes)}\n"
+        f"📆 <b>{'مصرف ۷ روز اخیر' if lang == 'fa' else 'Last 7 Days'}</b>: {_format_bytes(week_bytes)}\n"
         f"⏰ <b>{'آخرین اتصال' if lang == 'fa' else 'Last Connection'}</b>: {last_connection}\n"
         f"📅 <b>{'انقضا' if lang == 'fa' else 'Expiry'}</b>: {expire_display}\n"
         f"📊 <b>{'وضعیت' if lang == 'fa' else 'Status'}</b>: {progress_bar} {usage_percent}%\n"
@@ -151,16 +163,24 @@ def _format_bytes(bytes_val: int) -> str:
 
 
 @router.callback_query(F.data == "menu:stats")
-async def cb_stats(call: CallbackQuery, session: AsyncSession) -> None:
-    user = await _get_user(session, call.from_user.id)
-    lang = user.lang if user else "en"
+async def cb_stats(
+    call: CallbackQuery, session: AsyncSession, user: User | None, lang: str
+) -> None:
     await call.answer()
 
     if not user:
         await call.message.edit_text(t(lang, "not_authorized"), reply_markup=back_to_menu_kb(lang))
         return
 
-    all_users = await remnawave.get_all_users_by_telegram_id(call.from_user.id)
+    panel_failed = False
+    try:
+        all_users = await get_accounts_by_telegram_id(call.from_user.id)
+    except (aiohttp.ClientError, asyncio.TimeoutError):
+        all_users, panel_failed = [], True
+
+    if not all_users and user.remnawave_uuid and (panel_failed or not remnawave.available):
+        # Panel unreachable: answer from the synced stats of the linked account.
+        all_users = [{"uuid": user.remnawave_uuid}]
 
     if not all_users or not all_users[-1].get("uuid"):
         await call.message.edit_text(t(lang, "not_authorized"), reply_markup=back_to_menu_kb(lang))
@@ -170,12 +190,12 @@ async def cb_stats(call: CallbackQuery, session: AsyncSession) -> None:
     cache = await _get_user_stats_from_cache(session, uuid)
 
     if cache:
-        text = await _build_stats_text(cache, uuid, lang, use_cache=True)
+        text = await _build_stats_text(session, cache, uuid, lang, use_cache=True)
     else:
         data = await remnawave.get_user_stats(uuid)
         if data:
             resp = data.get("response", data)
-            text = await _build_stats_text(resp, uuid, lang)
+            text = await _build_stats_text(session, resp, uuid, lang)
         else:
             text = t(lang, "no_data")
 
@@ -187,14 +207,12 @@ async def cb_stats(call: CallbackQuery, session: AsyncSession) -> None:
 
 
 @router.callback_query(F.data.startswith("stats:nav:"))
-async def cb_stats_nav(call: CallbackQuery, session: AsyncSession) -> None:
-    user = await _get_user(session, call.from_user.id)
-    lang = user.lang if user else "en"
+async def cb_stats_nav(call: CallbackQuery, session: AsyncSession, lang: str) -> None:
     await call.answer()
 
     index = int(call.data.split(":")[-1])
 
-    all_users = await remnawave.get_all_users_by_telegram_id(call.from_user.id)
+    all_users = await get_accounts_by_telegram_id(call.from_user.id)
 
     if not all_users or index < 0 or index >= len(all_users):
         await call.message.edit_text(t(lang, "not_authorized"), reply_markup=back_to_menu_kb(lang))
@@ -205,12 +223,12 @@ async def cb_stats_nav(call: CallbackQuery, session: AsyncSession) -> None:
     cache = await _get_user_stats_from_cache(session, uuid)
 
     if cache:
-        text = await _build_stats_text(cache, uuid, lang, use_cache=True)
+        text = await _build_stats_text(session, cache, uuid, lang, use_cache=True)
     else:
         data = await remnawave.get_user_stats(uuid)
         if data:
             resp = data.get("response", data)
-            text = await _build_stats_text(resp, uuid, lang)
+            text = await _build_stats_text(session, resp, uuid, lang)
         else:
             text = t(lang, "no_data")
 
@@ -225,16 +243,14 @@ async def cb_stats_nav(call: CallbackQuery, session: AsyncSession) -> None:
 
 
 @router.callback_query(F.data == "menu:account")
-async def cb_account(call: CallbackQuery, session: AsyncSession) -> None:
-    user = await _get_user(session, call.from_user.id)
-    lang = user.lang if user else "en"
+async def cb_account(call: CallbackQuery, user: User | None, lang: str) -> None:
     await call.answer()
 
     if not user:
         await call.message.edit_text(t(lang, "not_authorized"), reply_markup=back_to_menu_kb(lang))
         return
 
-    all_users = await remnawave.get_all_users_by_telegram_id(call.from_user.id)
+    all_users = await get_accounts_by_telegram_id(call.from_user.id)
 
     if not all_users:
         await call.message.edit_text(t(lang, "not_authorized"), reply_markup=back_to_menu_kb(lang))
@@ -279,16 +295,14 @@ async def cb_account(call: CallbackQuery, session: AsyncSession) -> None:
 
 
 @router.callback_query(F.data == "account:list")
-async def cb_account_list(call: CallbackQuery, session: AsyncSession) -> None:
-    user = await _get_user(session, call.from_user.id)
-    lang = user.lang if user else "en"
+async def cb_account_list(call: CallbackQuery, user: User | None, lang: str) -> None:
     await call.answer()
 
     if not user:
         await call.message.edit_text(t(lang, "not_authorized"), reply_markup=back_to_menu_kb(lang))
         return
 
-    all_users = await remnawave.get_all_users_by_telegram_id(call.from_user.id)
+    all_users = await get_accounts_by_telegram_id(call.from_user.id)
 
     if not all_users:
         await call.message.edit_text(t(lang, "not_authorized"), reply_markup=back_to_menu_kb(lang))
@@ -337,21 +351,66 @@ async def cbnoop(call: CallbackQuery) -> None:
     await call.answer()
 
 
+async def _send_subscription_qr(
+    call: CallbackQuery, uuid: str, sub_url: str, short_link: str, lang: str
+) -> None:
+    """Send the subscription link with its QR code, reusing a cached Telegram file_id."""
+    text = (
+        f"🔗 <b>{'لینک اشتراک شما (Normal) آماده است' if lang == 'fa' else 'Your subscription link (Normal) is ready'}</b>\n\n"
+        f"{'۱. برای کپی کردن، روی لینک زیر ضربه بزنید:' if lang == 'fa' else '1. Tap the link below to copy:'}\n"
+        f"<code>{sub_url}</code>"
+    )
+
+    kb = [
+        [InlineKeyboardButton(text="🔄 عوض کردن لینک", callback_data=f"account:revoke:{uuid}")],
+        [InlineKeyboardButton(text="🔙 بازگشت", callback_data=f"account:{uuid}")],
+    ]
+
+    try:
+        photo = await get_qr_photo(short_link)
+        try:
+            sent = await call.message.answer_photo(
+                photo=photo,
+                caption=text,
+                reply_markup=InlineKeyboardMarkup(inline_keyboard=kb),
+                parse_mode="HTML",
+            )
+        except TelegramBadRequest:
+            if not isinstance(photo, str):
+                raise
+            # The cached file_id is no longer valid; render and upload again.
+            await forget_qr_photo(uuid)
+            sent = await call.message.answer_photo(
+                photo=await render_qr_photo(short_link),
+                caption=text,
+                reply_markup=InlineKeyboardMarkup(inline_keyboard=kb),
+                parse_mode="HTML",
+            )
+        await remember_qr_photo(uuid, short_link, sent)
+    except TelegramBadRequest as e:
+        log.warning("Failed to send subscription QR", uuid=uuid, error=str(e))
+        return
+    except Exception as e:
+        log.error("Unexpected error sending subscription QR", uuid=uuid, error=repr(e))
+        return
+
+    try:
+        await call.message.delete()
+    except TelegramBadRequest:
+        # Already deleted, or too old for the bot to delete.
+        pass
+
+
 @router.callback_query(F.data.startswith("account:"))
-async def cb_account_detail(call: CallbackQuery, session: AsyncSession) -> None:
-    user = await _get_user(session, call.from_user.id)
-    lang = user.lang if user else "en"
+async def cb_account_detail(
+    call: CallbackQuery, session: AsyncSession, user: User | None, lang: str
+) -> None:
     await call.answer()
 
     data_parts = call.data.split(":")
     action = data_parts[1] if len(data_parts) > 1 else ""
 
     if action == "link":
-        import qrcode
-        import tempfile
-        import os
-        from aiogram.types import FSInputFile
-
         uuid = data_parts[2] if len(data_parts) > 2 else ""
         if not uuid:
             await call.message.edit_text(t(lang, "error"), reply_markup=back_to_menu_kb(lang))
@@ -367,44 +426,7 @@ async def cb_account_detail(call: CallbackQuery, session: AsyncSession) -> None:
             if sub_url:
                 short_link = f"https://docs.cloudvibe.ir/{short_uuid}" if short_uuid else sub_url
 
-                qr = qrcode.QRCode(version=1, box_size=10, border=5)
-                qr.add_data(short_link)
-                qr.make(fit=True)
-                img = qr.make_image(fill_color="black", back_color="white")
-
-                temp_file = tempfile.NamedTemporaryFile(delete=False, suffix=".png")
-                img.save(temp_file.name, format="PNG")
-                temp_file.close()
-
-                text = (
-                    f"🔗 <b>{'لینک اشتراک شما (Normal) آماده است' if lang == 'fa' else 'Your subscription link (Normal) is ready'}</b>\n\n"
-                    f"{'۱. برای کپی کردن، روی لینک زیر ضربه بزنید:' if lang == 'fa' else '1. Tap the link below to copy:'}\n"
-                    f"<code>{sub_url}</code>"
-                )
-
-                kb = [
-                    [
-                        InlineKeyboardButton(
-                            text="🔄 عوض کردن لینک", callback_data=f"account:revoke:{uuid}"
-                        )
-                    ],
-                    [InlineKeyboardButton(text="🔙 بازگشت", callback_data=f"account:{uuid}")],
-                ]
-
-                try:
-                    await call.message.answer_photo(
-                        photo=FSInputFile(temp_file.name),
-                        caption=text,
-                        reply_markup=InlineKeyboardMarkup(inline_keyboard=kb),
-                        parse_mode="HTML",
-                    )
-                    try:
-                        await call.message.delete()
-                    except:
-                        pass
-                except Exception:
-                    pass
-                os.unlink(temp_file.name)
+                await _send_subscription_qr(call, uuid, sub_url, short_link, lang)
             else:
                 try:
                     await call.message.edit_text(
@@ -422,11 +444,6 @@ async def cb_account_detail(call: CallbackQuery, session: AsyncSession) -> None:
         return
 
     if action == "revoke":
-        import qrcode
-        import tempfile
-        import os
-        from aiogram.types import FSInputFile
-
         uuid = data_parts[2] if len(data_parts) > 2 else ""
         if not uuid:
             try:
@@ -438,6 +455,8 @@ async def cb_account_detail(call: CallbackQuery, session: AsyncSession) -> None:
         loading_msg = None
 
         revoke_result = await revoke_user_subscription(uuid)
+        await invalidate_accounts(call.from_user.id)
+        await forget_qr_photo(uuid)
         if not revoke_result:
             if loading_msg:
                 try:
@@ -467,49 +486,7 @@ async def cb_account_detail(call: CallbackQuery, session: AsyncSession) -> None:
             if sub_url:
                 short_link = f"https://docs.cloudvibe.ir/{short_uuid}" if short_uuid else sub_url
 
-                qr = qrcode.QRCode(version=1, box_size=10, border=5)
-                qr.add_data(short_link)
-                qr.make(fit=True)
-                img = qr.make_image(fill_color="black", back_color="white")
-
-                temp_file = tempfile.NamedTemporaryFile(delete=False, suffix=".png")
-                img.save(temp_file.name, format="PNG")
-                temp_file.close()
-
-                text = (
-                    f"🔗 <b>{'لینک اشتراک شما (Normal) آماده است' if lang == 'fa' else 'Your subscription link (Normal) is ready'}</b>\n\n"
-                    f"{'۱. برای کپی کردن، روی لینک زیر ضربه بزنید:' if lang == 'fa' else '1. Tap the link below to copy:'}\n"
-                    f"<code>{sub_url}</code>"
-                )
-
-                kb = [
-                    [
-                        InlineKeyboardButton(
-                            text="🔄 عوض کردن لینک", callback_data=f"account:revoke:{uuid}"
-                        )
-                    ],
-                    [InlineKeyboardButton(text="🔙 بازگشت", callback_data=f"account:{uuid}")],
-                ]
-
-                try:
-                    await call.message.answer_photo(
-                        photo=FSInputFile(temp_file.name),
-                        caption=text,
-                        reply_markup=InlineKeyboardMarkup(inline_keyboard=kb),
-                        parse_mode="HTML",
-                    )
-                    if loading_msg:
-                        try:
-                            await loading_msg.delete()
-                        except:
-                            pass
-                    try:
-                        await call.message.delete()
-                    except:
-                        pass
-                except Exception:
-                    pass
-                os.unlink(temp_file.name)
+                await _send_subscription_qr(call, uuid, sub_url, short_link, lang)
             else:
                 try:
                     await call.message.edit_text(
@@ -571,7 +548,7 @@ async def cb_account_detail(call: CallbackQuery, session: AsyncSession) -> None:
     volume_remaining_str = None
 
     if cache:
-        text = await _build_stats_text(cache, uuid, lang, use_cache=True)
+        text = await _build_stats_text(session, cache, uuid, lang, use_cache=True)
         if hasattr(cache, "remaining_traffic_bytes"):
             remaining = cache.remaining_traffic_bytes or 0
             if remaining > 0:
@@ -579,21 +556,12 @@ async def cb_account_detail(call: CallbackQuery, session: AsyncSession) -> None:
             if cache.expire_at:
                 from datetime import datetime, timezone
 
-                exp = cache.expire_at
-                if isinstance(exp, str):
-                    try:
-                        exp = datetime.fromisoformat(exp.replace("Z", "+00:00"))
-                    except:
-                        exp = None
-                if exp and exp.tzinfo is None:
-                    exp = exp.replace(tzinfo=timezone.utc)
-                if exp:
-                    days_remaining = (exp - datetime.now(timezone.utc)).days
+                days_remaining = (cache.expire_at - datetime.now(timezone.utc)).days
     else:
         data = await remnawave.get_user_stats(uuid)
         if data:
             resp = data.get("response", data)
-            text = await _build_stats_text(resp, uuid, lang)
+            text = await _build_stats_text(session, resp, uuid, lang)
             remaining = resp.get("remainingTrafficBytes") or resp.get("userTraffic", {}).get(
                 "remainingTrafficBytes", 0
             )
@@ -637,9 +605,7 @@ async def cb_account_detail(call: CallbackQuery, session: AsyncSession) -> None:
 
 
 @router.callback_query(F.data == "menu:services")
-async def cb_services(call: CallbackQuery, session: AsyncSession) -> None:
-    user = await _get_user(session, call.from_user.id)
-    lang = user.lang if user else "en"
+async def cb_services(call: CallbackQuery, user: User | None, lang: str) -> None:
     await call.answer()
 
     if not user:
@@ -655,9 +621,9 @@ async def cb_services(call: CallbackQuery, session: AsyncSession) -> None:
 
 
 @router.callback_query(F.data.startswith("packages:category:"))
-async def cb_packages_category(call: CallbackQuery, session: AsyncSession) -> None:
-    user = await _get_user(session, call.from_user.id)
-    lang = user.lang if user else "en"
+async def cb_packages_category(
+    call: CallbackQuery, session: AsyncSession, user: User | None, lang: str
+) -> None:
     await call.answer()
 
     if not user:
@@ -693,9 +659,7 @@ async def cb_packages_category(call: CallbackQuery, session: AsyncSession) -> No
 
 
 @router.callback_query(F.data == "packages:back")
-async def cb_packages_back(call: CallbackQuery, session: AsyncSession) -> None:
-    user = await _get_user(session, call.from_user.id)
-    lang = user.lang if user else "en"
+async def cb_packages_back(call: CallbackQuery, user: User | None, lang: str) -> None:
     await call.answer()
 
     if not user:
@@ -714,9 +678,7 @@ async def cb_packages_back(call: CallbackQuery, session: AsyncSession) -> None:
 
 
 @router.callback_query(F.data == "menu:tutorial")
-async def cb_tutorial(call: CallbackQuery, session: AsyncSession) -> None:
-    user = await _get_user(session, call.from_user.id)
-    lang = user.lang if user else "en"
+async def cb_tutorial(call: CallbackQuery, lang: str) -> None:
     await call.answer()
     await call.message.edit_text(
         t(lang, "tutorial_os_select"), reply_markup=tutorial_os_select_kb(lang)
@@ -724,9 +686,7 @@ async def cb_tutorial(call: CallbackQuery, session: AsyncSession) -> None:
 
 
 @router.callback_query(F.data.startswith("tutorial:os:"))
-async def cb_tutorial_os(call: CallbackQuery, session: AsyncSession) -> None:
-    user = await _get_user(session, call.from_user.id)
-    lang = user.lang if user else "en"
+async def cb_tutorial_os(call: CallbackQuery, lang: str) -> None:
     os_type = call.data.split(":")[-1]
     await call.answer()
     await call.message.edit_text(
@@ -735,9 +695,7 @@ async def cb_tutorial_os(call: CallbackQuery, session: AsyncSession) -> None:
 
 
 @router.callback_query(F.data == "tutorial:back_to_os")
-async def cb_tutorial_back_to_os(call: CallbackQuery, session: AsyncSession) -> None:
-    user = await _get_user(session, call.from_user.id)
-    lang = user.lang if user else "en"
+async def cb_tutorial_back_to_os(call: CallbackQuery, lang: str) -> None:
     await call.answer()
     await call.message.edit_text(
         t(lang, "tutorial_os_select"), reply_markup=tutorial_os_select_kb(lang)
@@ -745,9 +703,7 @@ async def cb_tutorial_back_to_os(call: CallbackQuery, session: AsyncSession) ->
 
 
 @router.callback_query(F.data.startswith("tutorial:app:"))
-async def cb_tutorial_app(call: CallbackQuery, session: AsyncSession) -> None:
-    user = await _get_user(session, call.from_user.id)
-    lang = user.lang if user else "en"
+async def cb_tutorial_app(call: CallbackQuery, lang: str) -> None:
     _, _, os_type, app = call.data.split(":")
 
     app_key = f"tutorial_{os_type}_{app}"
@@ -766,13 +722,9 @@ async def cb_tutorial_app(call: CallbackQuery, session: AsyncSession) -> None:
 
 
 @router.callback_query(F.data == "tutorial:back_to_apps")
-async def cb_tutorial_back_to_apps(
-    call: CallbackQuery, session: AsyncSession, state: FSMContext
-) -> None:
+async def cb_tutorial_back_to_apps(call: CallbackQuery, state: FSMContext, lang: str) -> None:
     data = await state.get_data()
     os_type = data.get("last_os", "android")
-    user = await _get_user(session, call.from_user.id)
-    lang = user.lang if user else "en"
     await call.answer()
     await call.message.edit_text(
         t(lang, "tutorial_app_select"), reply_markup=tutorial_app_select_kb(os_type, lang)
@@ -783,9 +735,7 @@ async def cb_tutorial_back_to_apps(
 
 
 @router.callback_query(F.data == "menu:settings")
-async def cb_settings(call: CallbackQuery, session: AsyncSession) -> None:
-    user = await _get_user(session, call.from_user.id)
-    lang = user.lang if user else "en"
+async def cb_settings(call: CallbackQuery, lang: str) -> None:
     await call.answer()
     await call.message.edit_text(t(lang, "settings_title"), reply_markup=settings_kb(lang))
 
@@ -802,9 +752,7 @@ async def cb_change_lang(call: CallbackQuery, session: AsyncSession, state: FSMC
 
 
 @router.callback_query(F.data == "settings:warnings")
-async def cb_settings_warnings(call: CallbackQuery, session: AsyncSession) -> None:
-    user = await _get_user(session, call.from_user.id)
-    lang = user.lang if user else "en"
+async def cb_settings_warnings(call: CallbackQuery, lang: str) -> None:
     await call.answer()
     await call.message.edit_text(
         t(lang, "settings_warnings_title"),
@@ -813,9 +761,9 @@ async def cb_settings_warnings(call: CallbackQuery, session: AsyncSession) -> No
 
 
 @router.callback_query(F.data == "settings:warning:expiry")
-async def cb_warning_expiry(call: CallbackQuery, session: AsyncSession) -> None:
-    user = await _get_user(session, call.from_user.id)
-    lang = user.lang if user else "en"
+async def cb_warning_expiry(
+    call: CallbackQuery, session: AsyncSession, user: User | None, lang: str
+) -> None:
     await call.answer()
     user.expiry_warning_enabled = not getattr(user, "expiry_warning_enabled", True)
     await session.commit()
@@ -826,9 +774,9 @@ async def cb_warning_expiry(call: CallbackQuery, session: AsyncSession) -> None:
 
 
 @router.callback_query(F.data == "settings:warning:volume")
-async def cb_warning_volume(call: CallbackQuery, session: AsyncSession) -> None:
-    user = await _get_user(session, call.from_user.id)
-    lang = user.lang if user else "en"
+async def cb_warning_volume(
+    call: CallbackQuery, session: AsyncSession, user: User | None, lang: str
+) -> None:
     await call.answer()
     user.volume_warning_enabled = not getattr(user, "volume_warning_enabled", True)
     await session.commit()
@@ -842,12 +790,10 @@ async def cb_warning_volume(call: CallbackQuery, session: AsyncSession) -> None:
 
 
 @router.callback_query(F.data == "menu:support")
-async def cb_support(call: CallbackQuery, session: AsyncSession) -> None:
+async def cb_support(call: CallbackQuery, lang: str) -> None:
     from bot.states.fsm import Support
     from aiogram.fsm.context import FSMContext
 
-    user = await _get_user(session, call.from_user.id)
-    lang = user.lang if user else "en"
     await call.answer()
     await call.message.edit_text(t(lang, "support_prompt"), reply_markup=back_to_menu_kb(lang))
 
@@ -856,9 +802,7 @@ async def cb_support(call: CallbackQuery, session: AsyncSession) -> None:
 
 
 @router.callback_query(F.data == "menu:profile")
-async def cb_profile(call: CallbackQuery, session: AsyncSession) -> None:
-    user = await _get_user(session, call.from_user.id)
-    lang = user.lang if user else "en"
+async def cb_profile(call: CallbackQuery, user: User | None, lang: str) -> None:
     await call.answer()
 
     text = (
@@ -876,9 +820,7 @@ async def cb_profile(call: CallbackQuery, session: AsyncSession) -> None:
 
 
 @router.callback_query(F.data == "menu:panel")
-async def cb_panel(call: CallbackQuery, session: AsyncSession) -> None:
-    user = await _get_user(session, call.from_user.id)
-    lang = user.lang if user else "en"
+async def cb_panel(call: CallbackQuery, lang: str) -> None:
     await call.answer()
 
     if call.from_user.id not in cfg.admin_ids:
@@ -893,9 +835,7 @@ async def cb_panel(call: CallbackQuery, session: AsyncSession) -> None:
 
 
 @router.callback_query(F.data == "admin:panel")
-async def cb_admin_panel(call: CallbackQuery, session: AsyncSession) -> None:
-    user = await _get_user(session, call.from_user.id)
-    lang = user.lang if user else "en"
+async def cb_admin_panel(call: CallbackQuery, lang: str) -> None:
     await call.answer()
 
     if call.from_user.id not in cfg.admin_ids:
@@ -910,9 +850,7 @@ async def cb_admin_panel(call: CallbackQuery, session: AsyncSession) -> None:
 
 
 @router.callback_query(F.data == "admin:users")
-async def cb_admin_users(call: CallbackQuery, session: AsyncSession) -> None:
-    user = await _get_user(session, call.from_user.id)
-    lang = user.lang if user else "en"
+async def cb_admin_users(call: CallbackQuery, lang: str) -> None:
     await call.answer()
 
     if call.from_user.id not in cfg.admin_ids:
@@ -926,9 +864,7 @@ async def cb_admin_users(call: CallbackQuery, session: AsyncSession) -> None:
 
 
 @router.callback_query(F.data == "admin:stats")
-async def cb_admin_stats(call: CallbackQuery, session: AsyncSession) -> None:
-    user = await _get_user(session, call.from_user.id)
-    lang = user.lang if user else "en"
+async def cb_admin_stats(call: CallbackQuery, lang: str) -> None:
     await call.answer()
 
     if call.from_user.id not in cfg.admin_ids:
@@ -942,9 +878,7 @@ async def cb_admin_stats(call: CallbackQuery, session: AsyncSession) -> None:
 
 
 @router.callback_query(F.data == "admin:packages")
-async def cb_admin_packages(call: CallbackQuery, session: AsyncSession) -> None:
-    user = await _get_user(session, call.from_user.id)
-    lang = user.lang if user else "en"
+async def cb_admin_packages(call: CallbackQuery, lang: str) -> None:
     await call.answer()
 
     if call.from_user.id not in cfg.admin_ids:
@@ -958,11 +892,7 @@ async def cb_admin_packages(call: CallbackQuery, session: AsyncSession) -> None:
 
 
 @router.callback_query(F.data == "admin:package:add")
-async def cb_admin_package_add(
-    call: CallbackQuery, session: AsyncSession, state: FSMContext
-) -> None:
-    user = await _get_user(session, call.from_user.id)
-    lang = user.lang if user else "en"
+async def cb_admin_package_add(call: CallbackQuery, state: FSMContext, lang: str) -> None:
     await call.answer()
 
     if call.from_user.id not in cfg.admin_ids:
@@ -979,12 +909,7 @@ async def cb_admin_package_add(
 
 
 @router.message(Package.waiting_for_name)
-async def handle_package_name(
-    message: Message, session: AsyncSession, state: FSMContext, bot: Bot
-) -> None:
-    user = await _get_user(session, message.from_user.id)
-    lang = user.lang if user else "en"
-
+async def handle_package_name(message: Message, state: FSMContext, bot: Bot, lang: str) -> None:
     if message.from_user.id not in cfg.admin_ids:
         return
 
@@ -1016,12 +941,7 @@ async def handle_package_name(
 
 
 @router.message(Package.waiting_for_volume)
-async def handle_package_volume(
-    message: Message, session: AsyncSession, state: FSMContext, bot: Bot
-) -> None:
-    user = await _get_user(session, message.from_user.id)
-    lang = user.lang if user else "en"
-
+async def handle_package_volume(message: Message, state: FSMContext, bot: Bot, lang: str) -> None:
     if message.from_user.id not in cfg.admin_ids:
         return
 
@@ -1063,12 +983,7 @@ async def handle_package_volume(
 
 
 @router.message(Package.waiting_for_days)
-async def handle_package_days(
-    message: Message, session: AsyncSession, state: FSMContext, bot: Bot
-) -> None:
-    user = await _get_user(session, message.from_user.id)
-    lang = user.lang if user else "en"
-
+async def handle_package_days(message: Message, state: FSMContext, bot: Bot, lang: str) -> None:
     if message.from_user.id not in cfg.admin_ids:
         return
 
@@ -1110,12 +1025,7 @@ async def handle_package_days(
 
 
 @router.message(Package.waiting_for_price)
-async def handle_package_price(
-    message: Message, session: AsyncSession, state: FSMContext, bot: Bot
-) -> None:
-    user = await _get_user(session, message.from_user.id)
-    lang = user.lang if user else "en"
-
+async def handle_package_price(message: Message, state: FSMContext, bot: Bot, lang: str) -> None:
     if message.from_user.id not in cfg.admin_ids:
         return
 
@@ -1162,11 +1072,8 @@ async def handle_package_price(
 
 @router.message(Package.waiting_for_category)
 async def handle_package_category(
-    message: Message, session: AsyncSession, state: FSMContext, bot: Bot
+    message: Message, session: AsyncSession, state: FSMContext, bot: Bot, lang: str
 ) -> None:
-    user = await _get_user(session, message.from_user.id)
-    lang = user.lang if user else "en"
-
     if message.from_user.id not in cfg.admin_ids:
         return
 
@@ -1254,9 +1161,7 @@ async def handle_package_category(
 
 
 @router.callback_query(F.data == "admin:package:list")
-async def cb_admin_package_list(call: CallbackQuery, session: AsyncSession) -> None:
-    user = await _get_user(session, call.from_user.id)
-    lang = user.lang if user else "en"
+async def cb_admin_package_list(call: CallbackQuery, session: AsyncSession, lang: str) -> None:
     await call.answer()
 
     if call.from_user.id not in cfg.admin_ids:
@@ -1291,9 +1196,7 @@ async def cb_admin_package_list(call: CallbackQuery, session: AsyncSession) -> N
 
 
 @router.callback_query(F.data.startswith("package:edit:"))
-async def cb_package_edit(call: CallbackQuery, session: AsyncSession) -> None:
-    user = await _get_user(session, call.from_user.id)
-    lang = user.lang if user else "en"
+async def cb_package_edit(call: CallbackQuery, session: AsyncSession, lang: str) -> None:
     await call.answer()
 
     if call.from_user.id not in cfg.admin_ids:
@@ -1320,9 +1223,7 @@ async def cb_package_edit(call: CallbackQuery, session: AsyncSession) -> None:
 
 
 @router.callback_query(F.data.startswith("package:toggle:"))
-async def cb_package_toggle(call: CallbackQuery, session: AsyncSession) -> None:
-    user = await _get_user(session, call.from_user.id)
-    lang = user.lang if user else "en"
+async def cb_package_toggle(call: CallbackQuery, session: AsyncSession, lang: str) -> None:
     await call.answer()
 
     if call.from_user.id not in cfg.admin_ids:
@@ -1355,9 +1256,7 @@ async def cb_package_toggle(call: CallbackQuery, session: AsyncSession) -> None:
 
 
 @router.callback_query(F.data.startswith("package:delete:"))
-async def cb_package_delete(call: CallbackQuery, session: AsyncSession) -> None:
-    user = await _get_user(session, call.from_user.id)
-    lang = user.lang if user else "en"
+async def cb_package_delete(call: CallbackQuery, session: AsyncSession, lang: str) -> None:
     await call.answer()
 
     if call.from_user.id not in cfg.admin_ids:
@@ -1384,9 +1283,9 @@ async def cb_package_delete(call: CallbackQuery, session: AsyncSession) -> None:
 
 
 @router.callback_query(F.data.startswith("package:buy:"))
-async def cb_package_buy(call: CallbackQuery, session: AsyncSession) -> None:
-    user = await _get_user(session, call.from_user.id)
-    lang = user.lang if user else "en"
+async def cb_package_buy(
+    call: CallbackQuery, session: AsyncSession, user: User | None, lang: str
+) -> None:
     await call.answer()
 
     if not user:
@@ -1408,7 +1307,7 @@ async def cb_package_buy(call: CallbackQuery, session: AsyncSession) -> None:
         )
         return
 
-    all_accounts = await remnawave.get_all_users_by_telegram_id(call.from_user.id)
+    all_accounts = await get_accounts_by_telegram_id(call.from_user.id)
 
     if not all_accounts:
         await call.message.edit_text(
@@ -1451,9 +1350,9 @@ async def show_account_selection_for_purchase(
 
 
 @router.callback_query(F.data.startswith("package:select:"))
-async def cb_package_select_account(call: CallbackQuery, session: AsyncSession) -> None:
-    user = await _get_user(session, call.from_user.id)
-    lang = user.lang if user else "en"
+async def cb_package_select_account(
+    call: CallbackQuery, session: AsyncSession, user: User | None, lang: str
+) -> None:
     await call.answer()
 
     parts = call.data.split(":")
@@ -1473,7 +1372,7 @@ async def cb_package_select_account(call: CallbackQuery, session: AsyncSession)
         )
         return
 
-    all_accounts = await remnawave.get_all_users_by_telegram_id(call.from_user.id)
+    all_accounts = await get_accounts_by_telegram_id(call.from_user.id)
     selected_account = next((acc for acc in all_accounts if acc.get("uuid") == uuid), None)
 
     if not selected_account:
@@ -1555,9 +1454,7 @@ async def process_package_purchase(
 
 
 @router.callback_query(F.data.startswith("package:confirm:"))
-async def cb_package_confirm(call: CallbackQuery, session: AsyncSession, bot: Bot) -> None:
-    user = await _get_user(session, call.from_user.id)
-    lang = user.lang if user else "en"
+async def cb_package_confirm(call: CallbackQuery, session: AsyncSession, lang: str) -> None:
     await call.answer()
 
     parts = call.data.split(":")
@@ -1577,7 +1474,8 @@ async def cb_package_confirm(call: CallbackQuery, session: AsyncSession, bot: Bo
         )
         return
 
-    if user.balance < pkg.price:
+    balance = await place_order(session, call.from_user.id, uuid, pkg, lang)
+    if balance is None:
         await call.message.edit_text(
             f"❌ {'موجودی ناکافی.' if lang == 'fa' else 'Insufficient balance.'}",
             reply_markup=back_to_menu_kb(lang),
@@ -1585,83 +1483,18 @@ async def cb_package_confirm(call: CallbackQuery, session: AsyncSession, bot: Bo
         )
         return
 
-    user.balance -= pkg.price
-    await session.commit()
-
-    account_data = await remnawave.get_user_stats(uuid)
-    if not account_data:
-        account_data = {}
-    account = account_data.get("response", account_data)
-
-    old_used = account.get("userTraffic", {}).get("usedTrafficBytes", 0) or 0
-    old_total = account.get("trafficLimitBytes", 0) or 0
-    old_expire = account.get("expireAt")
-
-    old_gb = round((old_total - old_used) / (1024**3), 2) if old_total > 0 else 0
-    old_days = 0
-    if old_expire:
-        try:
-            exp = datetime.fromisoformat(old_expire.replace("Z", "+00:00"))
-            old_days = max(0, (exp - datetime.now(timezone.utc)).days)
-        except:
-            old_days = 0
-
-    expire_datetime = datetime.now(timezone.utc) + timedelta(days=pkg.days)
-    expire_str = expire_datetime.strftime("%Y-%m-%dT%H:%M:%SZ")
-    volume_bytes = pkg.volume_gb * (1024**3)
-
-    result = await reset_and_set_user_package(uuid, volume_bytes, expire_str)
-
-    new_gb = pkg.volume_gb
-    new_days = pkg.days
-
     await call.message.edit_text(
-        f"✅ <b>{'خرید با موفقیت انجام شد!' if lang == 'fa' else 'Purchase successful!'}</b>\n\n"
+        f"⏳ <b>{'خرید شما ثبت شد!' if lang == 'fa' else 'Your purchase has been placed!'}</b>\n\n"
         f"<b>{'بسته:' if lang == 'fa' else 'Package:'} {pkg.name}</b>\n"
-        f"<b>{'حجم جدید:' if lang == 'fa' else 'New Volume:'} {new_gb} GB</b>\n"
-        f"<b>{'مدت جدید:' if lang == 'fa' else 'New Duration:'} {new_days} {'روز' if lang == 'fa' else 'days'}</b>\n\n"
-        f"{'از حالا می‌توانید از اکانت خود استفاده کنید.' if lang == 'fa' else 'You can now use your account.'}\n"
-        f"{'موجودی باقیمانده:' if lang == 'fa' else 'Remaining Balance:'} {user.balance:,} {'تومان' if lang == 'fa' else 'Toman'}",
+        f"{'بسته در حال اعمال روی اکانت شماست و پس از اتمام به شما اطلاع داده می‌شود.' if lang == 'fa' else 'The package is being applied to your account; you will be notified when it is done.'}\n"
+        f"{'موجودی باقیمانده:' if lang == 'fa' else 'Remaining Balance:'} {balance:,} {'تومان' if lang == 'fa' else 'Toman'}",
         reply_markup=main_menu_kb(lang),
         parse_mode="HTML",
     )
 
-    if cfg.admin_group_id:
-        username = f"@{user.username}" if user.username else "—"
-        user_full_name = user.full_name or "—"
-
-        admin_text = (
-            f"🛒 <b>خرید جدید از کیف پول</b>\n"
-            f"──────────────────\n"
-            f"👤 <b>کاربر:</b> {user_full_name} ({user.telegram_id})\n"
-            f"🛍️ <b>پلن:</b> {pkg.name}\n"
-            f"💰 <b>هزینه:</b> {pkg.price:,} تومان\n"
-            f"💳 <b>موجودی:</b> {user.balance:,} تومان\n"
-            f"──────────────────\n"
-            f"📊 <b>وضعیت قبل از خرید</b>\n"
-            f" {username}: {old_gb} GB | {old_days} روز\n\n"
-            f"📊 <b>وضعیت پس از خرید</b>\n"
-            f" {username}: {new_gb} GB | {new_days} روز"
-        )
-
-        try:
-            await bot.send_message(
-                chat_id=cfg.admin_group_id,
-                text=admin_text,
-                message_thread_id=getattr(cfg, "payment_receipts_topic_id", None),
-                parse_mode="HTML",
-            )
-        except Exception as e:
-            import structlog
-
-            log = structlog.get_logger()
-            log.error(f"Failed to send purchase notification to admin: {e}")
-
 
 @router.callback_query(F.data == "admin:user:add")
-async def cb_admin_user_add(call: CallbackQuery, session: AsyncSession, state: FSMContext) -> None:
-    user = await _get_user(session, call.from_user.id)
-    lang = user.lang if user else "en"
+async def cb_admin_user_add(call: CallbackQuery, state: FSMContext, lang: str) -> None:
     await call.answer()
 
     if call.from_user.id not in cfg.admin_ids:
@@ -1679,12 +1512,7 @@ async def cb_admin_user_add(call: CallbackQuery, session: AsyncSession, state: F
 
 
 @router.message(Admin.waiting_for_username)
-async def handle_admin_username(
-    message: Message, session: AsyncSession, state: FSMContext, bot: Bot
-) -> None:
-    user = await _get_user(session, message.from_user.id)
-    lang = user.lang if user else "en"
-
+async def handle_admin_username(message: Message, state: FSMContext, bot: Bot, lang: str) -> None:
     if message.from_user.id not in cfg.admin_ids:
         return
 
@@ -1720,11 +1548,8 @@ async def handle_admin_username(
 
 @router.message(Admin.waiting_for_telegram_id)
 async def handle_admin_telegram_id(
-    message: Message, session: AsyncSession, state: FSMContext, bot: Bot
+    message: Message, state: FSMContext, bot: Bot, lang: str
 ) -> None:
-    user = await _get_user(session, message.from_user.id)
-    lang = user.lang if user else "en"
-
     if message.from_user.id not in cfg.admin_ids:
         return
 
@@ -1762,12 +1587,7 @@ async def handle_admin_telegram_id(
 
 
 @router.message(Admin.waiting_for_volume)
-async def handle_admin_volume(
-    message: Message, session: AsyncSession, state: FSMContext, bot: Bot
-) -> None:
-    user = await _get_user(session, message.from_user.id)
-    lang = user.lang if user else "en"
-
+async def handle_admin_volume(message: Message, state: FSMContext, bot: Bot, lang: str) -> None:
     if message.from_user.id not in cfg.admin_ids:
         return
 
@@ -1803,12 +1623,7 @@ async def handle_admin_volume(
 
 
 @router.message(Admin.waiting_for_days)
-async def handle_admin_days(
-    message: Message, session: AsyncSession, state: FSMContext, bot: Bot
-) -> None:
-    user = await _get_user(session, message.from_user.id)
-    lang = user.lang if user else "en"
-
+async def handle_admin_days(message: Message, state: FSMContext, bot: Bot, lang: str) -> None:
     if message.from_user.id not in cfg.admin_ids:
         return
 
@@ -1889,6 +1704,7 @@ async def _create_remnawave_user_final(
         expire_at=expire_at,
         squads=selected_squads if selected_squads else None,
     )
+    await invalidate_accounts(data.get("telegram_id"))
 
     if bot_msg_id:
         try:
@@ -1916,12 +1732,7 @@ async def _create_remnawave_user_final(
 
 
 @router.message(Admin.waiting_for_squads)
-async def handle_admin_squads(
-    message: Message, session: AsyncSession, state: FSMContext, bot: Bot
-) -> None:
-    user = await _get_user(session, message.from_user.id)
-    lang = user.lang if user else "en"
-
+async def handle_admin_squads(message: Message, state: FSMContext, bot: Bot, lang: str) -> None:
     if message.from_user.id not in cfg.admin_ids:
         return
 
@@ -1950,9 +1761,7 @@ async def handle_admin_squads(
 
 
 @router.callback_query(F.data == "admin:user:list")
-async def cb_admin_user_list(call: CallbackQuery, session: AsyncSession) -> None:
-    user = await _get_user(session, call.from_user.id)
-    lang = user.lang if user else "en"
+async def cb_admin_user_list(call: CallbackQuery, session: AsyncSession, lang: str) -> None:
     await call.answer()
 
     if call.from_user.id not in cfg.admin_ids:
@@ -2023,9 +1832,7 @@ async def _show_remnawave_user_list(
 
 
 @router.callback_query(F.data.startswith("admin:user:list:"))
-async def cb_admin_user_list_page(call: CallbackQuery, session: AsyncSession) -> None:
-    user = await _get_user(session, call.from_user.id)
-    lang = user.lang if user else "en"
+async def cb_admin_user_list_page(call: CallbackQuery, session: AsyncSession, lang: str) -> None:
     await call.answer()
 
     if call.from_user.id not in cfg.admin_ids:
@@ -2036,11 +1843,7 @@ async def cb_admin_user_list_page(call: CallbackQuery, session: AsyncSession) ->
 
 
 @router.callback_query(F.data == "admin:user:search")
-async def cb_admin_user_search(
-    call: CallbackQuery, session: AsyncSession, state: FSMContext
-) -> None:
-    user = await _get_user(session, call.from_user.id)
-    lang = user.lang if user else "en"
+async def cb_admin_user_search(call: CallbackQuery, state: FSMContext, lang: str) -> None:
     await call.answer()
 
     if call.from_user.id not in cfg.admin_ids:
@@ -2056,10 +1859,9 @@ async def cb_admin_user_search(
 
 
 @router.message(Admin.waiting_for_search)
-async def handle_admin_search(message: Message, session: AsyncSession, state: FSMContext) -> None:
-    user = await _get_user(session, message.from_user.id)
-    lang = user.lang if user else "en"
-
+async def handle_admin_search(
+    message: Message, session: AsyncSession, state: FSMContext, lang: str
+) -> None:
     if message.from_user.id not in cfg.admin_ids:
         return
 
@@ -2112,182 +1914,99 @@ async def handle_admin_search(message: Message, session: AsyncSession, state: FS
     await state.clear()
 
 
-@router.callback_query(F.data == "admin:stats:online")
-async def cb_admin_stats_online(call: CallbackQuery, session: AsyncSession) -> None:
-    user = await _get_user(session, call.from_user.id)
-    lang = user.lang if user else "en"
-    await call.answer()
-
-    if call.from_user.id not in cfg.admin_ids:
-        return
+# ── Activity buckets ───────────────────────────────────────────────────────────
+#
+# Computed over the whole population in ``user_stats_cache`` (kept fresh by the
+# stats sync) rather than a single page of the panel API.
 
-    all_users_result = await remnawave.get_all_users(page=1, per_page=200)
-    if not all_users_result or not all_users_result[0]:
-        await call.message.edit_text(
-            f"🟢 <b>{'کاربران آنلاین (۵ دقیقه تا ۱ روز)' if lang == 'fa' else 'Online Users (5min - 1 day)'}</b>\n\n"
-            f"{'کاربری یافت نشد' if lang == 'fa' else 'No users found'}",
-            reply_markup=admin_stats_back_kb(lang),
-            parse_mode="HTML",
-        )
-        return
+ACTIVITY_PAGE_SIZE = 40
 
-    all_users = all_users_result[0]
-    from datetime import datetime, timezone, timedelta
+_ACTIVITY_TITLES = {
+    "online": ("کاربران آنلاین (۵ دقیقه تا ۱ روز)", "Online Users (5min - 1 day)"),
+    "online_now": ("کاربران آنلاین (همین الان)", "Online Users (Now)"),
+    "inactive_7d": ("کاربران غیرفعال 1 تا 7 روز", "Inactive Users (1-7 days)"),
+    "never": ("کاربرانی که هرگز متصل نشده‌اند", "Never Connected Users"),
+}
+_ACTIVITY_ICONS = {"online": "🟢", "online_now": "🟢", "inactive_7d": "🟡", "never": "🔴"}
 
-    now = datetime.now(timezone.utc)
-    online_users = []
 
-    for u in all_users:
-        user_traffic = u.get("userTraffic", {})
-        online_at = user_traffic.get("onlineAt")
+def _activity_condition(bucket: str, now: datetime):
+    online_at = UserStatsCache.online_at
+    if bucket == "online_now":
+        return online_at >= now - timedelta(minutes=5)
+    if bucket == "online":
+        return and_(online_at >= now - timedelta(days=1), online_at < now - timedelta(minutes=5))
+    if bucket == "inactive_7d":
+        return and_(online_at >= now - timedelta(days=7), online_at < now - timedelta(days=1))
+    return UserStatsCache.first_connected_at.is_(None)
 
-        if not online_at:
-            continue
 
-        try:
-            online_time = datetime.fromisoformat(online_at.replace("Z", "+00:00"))
-            diff = now - online_time
-            diff_hours = diff.total_seconds() / 3600
-
-            if 5 / 60 <= diff_hours < 24:
-                expire_at = u.get("expireAt")
-                days_left = "—"
-                if expire_at:
-                    try:
-                        expire_time = datetime.fromisoformat(expire_at.replace("Z", "+00:00"))
-                        days_left = (expire_time - now).days
-                        days_left = max(0, days_left)
-                    except:
-                        pass
-                online_users.append(
-                    {
-                        "username": u.get("username", "—"),
-                        "uuid": u.get("uuid"),
-                        "online_at": online_at,
-                        "hours_ago": round(diff_hours, 1),
-                        "days_left": days_left,
-                    }
-                )
-        except:
-            continue
+async def _load_activity_page(
+    session: AsyncSession, bucket: str, page: int
+) -> tuple[int, list[UserStatsCache]]:
+    """Return the bucket's total size and the rows of one page, both computed in SQL."""
+    condition = _activity_condition(bucket, datetime.now(timezone.utc))
 
-    if not online_users:
-        await call.message.edit_text(
-            f"🟢 <b>{'کاربران آنلاین (۵ دقیقه تا ۱ روز)' if lang == 'fa' else 'Online Users (5min - 1 day)'}</b>\n\n"
-            f"{'کاربری یافت نشد' if lang == 'fa' else 'No users found'}",
-            reply_markup=admin_stats_back_kb(lang),
-            parse_mode="HTML",
-        )
-        return
+    total = await session.scalar(select(func.count()).select_from(UserStatsCache).where(condition))
+    if bucket == "never":
+        order_by = (UserStatsCache.id,)
+    else:
+        order_by = (UserStatsCache.online_at.desc(), UserStatsCache.id)
 
-    page = 0
-    page_size = 40
-    start = page * page_size
-    page_users = online_users[start : start + page_size]
+    result = await session.execute(
+        select(UserStatsCache)
+        .where(condition)
+        .order_by(*order_by)
+        .offset(page * ACTIVITY_PAGE_SIZE)
+        .limit(ACTIVITY_PAGE_SIZE)
+    )
+    return total or 0, list(result.scalars().all())
+
+
+def _activity_line(
+    bucket: str, index: int, row: UserStatsCache, lang: str, now: datetime, today_bytes: int
+) -> str:
+    username = row.username or "—"
+    if bucket in ("online", "online_now"):
+        days_left = max(0, (row.expire_at - now).days) if row.expire_at else "—"
+        return f"{index}. {username} | {_format_bytes(today_bytes)} | {days_left}"
+    if bucket == "inactive_7d":
+        days = round((now - row.online_at).total_seconds() / 86400, 1)
+        time_str = f"{days} روز پیش" if lang == "fa" else f"{days}d ago"
+        return f"{index}. 👤 {username} ({time_str})"
+    return f"{index}. 👤 {username}"
 
-    lines = [
-        f"🟢 <b>{'کاربران آنلاین (۵ دقیقه تا ۱ روز)' if lang == 'fa' else 'Online Users (5min - 1 day)'}</b>\n"
-    ]
-    lines.append(f"{'تعداد کل: ' if lang == 'fa' else 'Total: '}{len(online_users)}\n")
 
-    for i, u in enumerate(page_users, start + 1):
-        username = u.get("username", "—")
-        days_left = u.get("days_left", "—")
-        daily_usage = 0
-        lines.append(f"{i}. {username} | {daily_usage} | {days_left}")
+async def show_activity_users(
+    call: CallbackQuery, session: AsyncSession, lang: str, bucket: str, page: int
+) -> None:
+    title_fa, title_en = _ACTIVITY_TITLES[bucket]
+    title = f"{_ACTIVITY_ICONS[bucket]} <b>{title_fa if lang == 'fa' else title_en}</b>"
 
-    kb_buttons = []
-    if len(online_users) > page_size:
-        kb_buttons.append(
-            [InlineKeyboardButton(text="➡️ بعدی", callback_data=f"admin:stats:online:1")]
+    total, rows = await _load_activity_page(session, bucket, page)
+    if not total:
+        await call.message.edit_text(
+            f"{title}\n\n{'کاربری یافت نشد' if lang == 'fa' else 'No users found'}",
+            reply_markup=admin_stats_back_kb(lang),
+            parse_mode="HTML",
         )
-    kb_buttons.append([InlineKeyboardButton(text="🔙 بازگشت", callback_data="admin:stats")])
-
-    await call.message.edit_text(
-        "\n".join(lines),
-        reply_markup=InlineKeyboardMarkup(inline_keyboard=kb_buttons),
-        parse_mode="HTML",
-    )
-
-
-@router.callback_query(F.data.startswith("admin:stats:online:"))
-async def cb_admin_stats_online_page(call: CallbackQuery, session: AsyncSession) -> None:
-    user = await _get_user(session, call.from_user.id)
-    lang = user.lang if user else "en"
-    await call.answer()
-
-    if call.from_user.id not in cfg.admin_ids:
-        return
-
-    page = int(call.data.split(":")[-1])
-    page_size = 40
-
-    all_users_result = await remnawave.get_all_users(page=1, per_page=200)
-    if not all_users_result or not all_users_result[0]:
         return
 
-    all_users = all_users_result[0]
-    from datetime import datetime, timezone
-
     now = datetime.now(timezone.utc)
-    online_users = []
-
-    for u in all_users:
-        user_traffic = u.get("userTraffic", {})
-        online_at = user_traffic.get("onlineAt")
-
-        if not online_at:
-            continue
-
-        try:
-            online_time = datetime.fromisoformat(online_at.replace("Z", "+00:00"))
-            diff = now - online_time
-            diff_hours = diff.total_seconds() / 3600
-
-            if diff_hours < 24:
-                expire_at = u.get("expireAt")
-                days_left = "—"
-                if expire_at:
-                    try:
-                        expire_time = datetime.fromisoformat(expire_at.replace("Z", "+00:00"))
-                        days_left = (expire_time - now).days
-                        days_left = max(0, days_left)
-                    except:
-                        pass
-                online_users.append(
-                    {
-                        "username": u.get("username", "—"),
-                        "uuid": u.get("uuid"),
-                        "online_at": online_at,
-                        "hours_ago": round(diff_hours, 1),
-                        "days_left": days_left,
-                    }
-                )
-        except:
-            continue
-
-    start = page * page_size
-    page_users = online_users[start : start + page_size]
-
-    lines = [
-        f"🟢 <b>{'کاربران آنلاین (۵ دقیقه تا ۱ روز)' if lang == 'fa' else 'Online Users (5min - 1 day)'}</b>\n"
-    ]
-    lines.append(f"{'تعداد کل: ' if lang == 'fa' else 'Total: '}{len(online_users)}\n")
-
-    for i, u in enumerate(page_users, start + 1):
-        username = u.get("username", "—")
-        days_left = u.get("days_left", "—")
-        daily_usage = 0
-        lines.append(f"{i}. {username} | {daily_usage} | {days_left}")
+    today_usage = await usage_since(session, [row.uuid for row in rows])
+    start = page * ACTIVITY_PAGE_SIZE
+    lines = [f"{title}\n", f"{'تعداد کل: ' if lang == 'fa' else 'Total: '}{total}\n"]
+    for i, row in enumerate(rows, start + 1):
+        lines.append(_activity_line(bucket, i, row, lang, now, today_usage.get(row.uuid, 0)))
 
     kb_buttons = []
-    if start + page_size < len(online_users):
+    if start + ACTIVITY_PAGE_SIZE < total:
         kb_buttons.append(
-            [InlineKeyboardButton(text="➡️ بعدی", callback_data=f"admin:stats:online:{page + 1}")]
+            [InlineKeyboardButton(text="➡️ بعدی", callback_data=f"admin:stats:{bucket}:{page + 1}")]
         )
     if page > 0:
         kb_buttons.append(
-            [InlineKeyboardButton(text="➡️ قبلی", callback_data=f"admin:stats:online:{page - 1}")]
+            [InlineKeyboardButton(text="➡️ قبلی", callback_data=f"admin:stats:{bucket}:{page - 1}")]
         )
     kb_buttons.append([InlineKeyboardButton(text="🔙 بازگشت", callback_data="admin:stats")])
 
@@ -2298,348 +2017,96 @@ async def cb_admin_stats_online_page(call: CallbackQuery, session: AsyncSession)
     )
 
 
-@router.callback_query(F.data == "admin:stats:online_now")
-async def cb_admin_stats_online_now(call: CallbackQuery, session: AsyncSession) -> None:
-    user = await _get_user(session, call.from_user.id)
-    lang = user.lang if user else "en"
+@router.callback_query(F.data == "admin:stats:online")
+async def cb_admin_stats_online(call: CallbackQuery, session: AsyncSession, lang: str) -> None:
     await call.answer()
 
     if call.from_user.id not in cfg.admin_ids:
         return
 
-    page = 0
-    await show_online_now_users(call, lang, page)
+    await show_activity_users(call, session, lang, "online", 0)
 
 
-@router.callback_query(F.data.startswith("admin:stats:online_now:"))
-async def cb_admin_stats_online_now_page(call: CallbackQuery, session: AsyncSession) -> None:
-    user = await _get_user(session, call.from_user.id)
-    lang = user.lang if user else "en"
+@router.callback_query(F.data.startswith("admin:stats:online:"))
+async def cb_admin_stats_online_page(call: CallbackQuery, session: AsyncSession, lang: str) -> None:
     await call.answer()
 
     if call.from_user.id not in cfg.admin_ids:
         return
 
     page = int(call.data.split(":")[-1])
-    await show_online_now_users(call, lang, page)
+    await show_activity_users(call, session, lang, "online", page)
 
 
-async def show_online_now_users(call: CallbackQuery, lang: str, page: int) -> None:
-    from datetime import datetime, timezone
+@router.callback_query(F.data == "admin:stats:online_now")
+async def cb_admin_stats_online_now(call: CallbackQuery, session: AsyncSession, lang: str) -> None:
+    await call.answer()
 
-    page_size = 40
-    all_users_result = await remnawave.get_all_users(page=1, per_page=200)
-    if not all_users_result or not all_users_result[0]:
-        await call.message.edit_text(
-            f"🟢 <b>{'کاربران آنلاین (همین الان)' if lang == 'fa' else 'Online Users (Now)'}</b>\n\n"
-            f"{'کاربری یافت نشد' if lang == 'fa' else 'No users found'}",
-            reply_markup=admin_stats_back_kb(lang),
-            parse_mode="HTML",
-        )
+    if call.from_user.id not in cfg.admin_ids:
         return
 
-    all_users = all_users_result[0]
-    now = datetime.now(timezone.utc)
-    online_users = []
+    await show_activity_users(call, session, lang, "online_now", 0)
 
-    for u in all_users:
-        user_traffic = u.get("userTraffic", {})
-        online_at = user_traffic.get("onlineAt")
-
-        if not online_at:
-            continue
 
-        try:
-            online_time = datetime.fromisoformat(online_at.replace("Z", "+00:00"))
-            diff = now - online_time
-            diff_minutes = diff.total_seconds() / 60
-
-            if diff_minutes < 5:
-                expire_at = u.get("expireAt")
-                days_left = "—"
-                if expire_at:
-                    try:
-                        expire_time = datetime.fromisoformat(expire_at.replace("Z", "+00:00"))
-                        days_left = (expire_time - now).days
-                        days_left = max(0, days_left)
-                    except:
-                        pass
-                online_users.append(
-                    {
-                        "username": u.get("username", "—"),
-                        "uuid": u.get("uuid"),
-                        "online_at": online_at,
-                        "mins_ago": round(diff_minutes, 1),
-                        "days_left": days_left,
-                    }
-                )
-        except:
-            continue
+@router.callback_query(F.data.startswith("admin:stats:online_now:"))
+async def cb_admin_stats_online_now_page(
+    call: CallbackQuery, session: AsyncSession, lang: str
+) -> None:
+    await call.answer()
 
-    if not online_users:
-        await call.message.edit_text(
-            f"🟢 <b>{'کاربران آنلاین (همین الان)' if lang == 'fa' else 'Online Users (Now)'}</b>\n\n"
-            f"{'کاربری یافت نشد' if lang == 'fa' else 'No users found'}",
-            reply_markup=admin_stats_back_kb(lang),
-            parse_mode="HTML",
-        )
+    if call.from_user.id not in cfg.admin_ids:
         return
 
-    start = page * page_size
-    page_users = online_users[start : start + page_size]
-
-    lines = [
-        f"🟢 <b>{'کاربران آنلاین (همین الان)' if lang == 'fa' else 'Online Users (Now)'}</b>\n"
-    ]
-    lines.append(f"{'تعداد کل: ' if lang == 'fa' else 'Total: '}{len(online_users)}\n")
-
-    for i, u in enumerate(page_users, start + 1):
-        username = u.get("username", "—")
-        days_left = u.get("days_left", "—")
-        daily_usage = 0
-        lines.append(f"{i}. {username} | {daily_usage} | {days_left}")
-
-    kb_buttons = []
-    if start + page_size < len(online_users):
-        kb_buttons.append(
-            [
-                InlineKeyboardButton(
-                    text="➡️ بعدی", callback_data=f"admin:stats:online_now:{page + 1}"
-                )
-            ]
-        )
-    if page > 0:
-        kb_buttons.append(
-            [
-                InlineKeyboardButton(
-                    text="➡️ قبلی", callback_data=f"admin:stats:online_now:{page - 1}"
-                )
-            ]
-        )
-    kb_buttons.append([InlineKeyboardButton(text="🔙 بازگشت", callback_data="admin:stats")])
-
-    await call.message.edit_text(
-        "\n".join(lines),
-        reply_markup=InlineKeyboardMarkup(inline_keyboard=kb_buttons),
-        parse_mode="HTML",
-    )
+    page = int(call.data.split(":")[-1])
+    await show_activity_users(call, session, lang, "online_now", page)
 
 
 @router.callback_query(F.data == "admin:stats:inactive_7d")
-async def cb_admin_stats_inactive_7d(call: CallbackQuery, session: AsyncSession) -> None:
-    user = await _get_user(session, call.from_user.id)
-    lang = user.lang if user else "en"
+async def cb_admin_stats_inactive_7d(call: CallbackQuery, session: AsyncSession, lang: str) -> None:
     await call.answer()
 
     if call.from_user.id not in cfg.admin_ids:
         return
 
-    page = 0
-    await show_inactive_users(call, lang, page)
+    await show_activity_users(call, session, lang, "inactive_7d", 0)
 
 
 @router.callback_query(F.data.startswith("admin:stats:inactive_7d:"))
-async def cb_admin_stats_inactive_7d_page(call: CallbackQuery, session: AsyncSession) -> None:
-    user = await _get_user(session, call.from_user.id)
-    lang = user.lang if user else "en"
+async def cb_admin_stats_inactive_7d_page(
+    call: CallbackQuery, session: AsyncSession, lang: str
+) -> None:
     await call.answer()
 
     if call.from_user.id not in cfg.admin_ids:
         return
 
     page = int(call.data.split(":")[-1])
-    await show_inactive_users(call, lang, page)
-
-
-async def show_inactive_users(call: CallbackQuery, lang: str, page: int) -> None:
-    from datetime import datetime, timezone
-
-    page_size = 40
-    all_users_result = await remnawave.get_all_users(page=1, per_page=200)
-    if not all_users_result or not all_users_result[0]:
-        await call.message.edit_text(
-            f"🟡 <b>{'کاربران غیرفعال 1 تا 7 روز' if lang == 'fa' else 'Inactive Users (1-7 days)'}</b>\n\n"
-            f"{'کاربری یافت نشد' if lang == 'fa' else 'No users found'}",
-            reply_markup=admin_stats_back_kb(lang),
-            parse_mode="HTML",
-        )
-        return
-
-    all_users = all_users_result[0]
-    now = datetime.now(timezone.utc)
-    inactive_users = []
-
-    for u in all_users:
-        user_traffic = u.get("userTraffic", {})
-        online_at = user_traffic.get("onlineAt")
-
-        if not online_at:
-            continue
-
-        try:
-            online_time = datetime.fromisoformat(online_at.replace("Z", "+00:00"))
-            diff = now - online_time
-            diff_hours = diff.total_seconds() / 3600
-
-            if 24 <= diff_hours < 24 * 7:
-                inactive_users.append(
-                    {
-                        "username": u.get("username", "—"),
-                        "uuid": u.get("uuid"),
-                        "online_at": online_at,
-                        "days_ago": round(diff_hours / 24, 1),
-                    }
-                )
-        except:
-            continue
-
-    if not inactive_users:
-        await call.message.edit_text(
-            f"🟡 <b>{'کاربران غیرفعال 1 تا 7 روز' if lang == 'fa' else 'Inactive Users (1-7 days)'}</b>\n\n"
-            f"{'کاربری یافت نشد' if lang == 'fa' else 'No users found'}",
-            reply_markup=admin_stats_back_kb(lang),
-            parse_mode="HTML",
-        )
-        return
-
-    start = page * page_size
-    page_users = inactive_users[start : start + page_size]
-
-    lines = [
-        f"🟡 <b>{'کاربران غیرفعال 1 تا 7 روز' if lang == 'fa' else 'Inactive Users (1-7 days)'}</b>\n"
-    ]
-    lines.append(f"{'تعداد کل: ' if lang == 'fa' else 'Total: '}{len(inactive_users)}\n")
-
-    for i, u in enumerate(page_users, start + 1):
-        days = u.get("days_ago", 0)
-        time_str = f"{days} روز پیش" if lang == "fa" else f"{days}d ago"
-        lines.append(f"{i}. 👤 {u['username']} ({time_str})")
-
-    kb_buttons = []
-    if start + page_size < len(inactive_users):
-        kb_buttons.append(
-            [
-                InlineKeyboardButton(
-                    text="➡️ بعدی", callback_data=f"admin:stats:inactive_7d:{page + 1}"
-                )
-            ]
-        )
-    if page > 0:
-        kb_buttons.append(
-            [
-                InlineKeyboardButton(
-                    text="➡️ قبلی", callback_data=f"admin:stats:inactive_7d:{page - 1}"
-                )
-            ]
-        )
-    kb_buttons.append([InlineKeyboardButton(text="🔙 بازگشت", callback_data="admin:stats")])
-
-    await call.message.edit_text(
-        "\n".join(lines),
-        reply_markup=InlineKeyboardMarkup(inline_keyboard=kb_buttons),
-        parse_mode="HTML",
-    )
+    await show_activity_users(call, session, lang, "inactive_7d", page)
 
 
 @router.callback_query(F.data == "admin:stats:never")
-async def cb_admin_stats_never(call: CallbackQuery, session: AsyncSession) -> None:
-    user = await _get_user(session, call.from_user.id)
-    lang = user.lang if user else "en"
+async def cb_admin_stats_never(call: CallbackQuery, session: AsyncSession, lang: str) -> None:
     await call.answer()
 
     if call.from_user.id not in cfg.admin_ids:
         return
 
-    page = 0
-    await show_never_connected_users(call, lang, page)
+    await show_activity_users(call, session, lang, "never", 0)
 
 
 @router.callback_query(F.data.startswith("admin:stats:never:"))
-async def cb_admin_stats_never_page(call: CallbackQuery, session: AsyncSession) -> None:
-    user = await _get_user(session, call.from_user.id)
-    lang = user.lang if user else "en"
+async def cb_admin_stats_never_page(call: CallbackQuery, session: AsyncSession, lang: str) -> None:
     await call.answer()
 
     if call.from_user.id not in cfg.admin_ids:
         return
 
     page = int(call.data.split(":")[-1])
-    await show_never_connected_users(call, lang, page)
-
-
-async def show_never_connected_users(call: CallbackQuery, lang: str, page: int) -> None:
-    page_size = 40
-    all_users_result = await remnawave.get_all_users(page=1, per_page=200)
-    if not all_users_result or not all_users_result[0]:
-        await call.message.edit_text(
-            f"🔴 <b>{'کاربرانی که هرگز متصل نشده‌اند' if lang == 'fa' else 'Never Connected Users'}</b>\n\n"
-            f"{'کاربری یافت نشد' if lang == 'fa' else 'No users found'}",
-            reply_markup=admin_stats_back_kb(lang),
-            parse_mode="HTML",
-        )
-        return
-
-    all_users = all_users_result[0]
-    never_connected_users = []
-
-    for u in all_users:
-        user_traffic = u.get("userTraffic", {})
-        first_connected_at = user_traffic.get("firstConnectedAt")
-
-        if first_connected_at is None:
-            never_connected_users.append(
-                {
-                    "username": u.get("username", "—"),
-                    "uuid": u.get("uuid"),
-                    "email": u.get("email", "—"),
-                    "created_at": u.get("createdAt", "—"),
-                }
-            )
-
-    if not never_connected_users:
-        await call.message.edit_text(
-            f"🔴 <b>{'کاربرانی که هرگز متصل نشده‌اند' if lang == 'fa' else 'Never Connected Users'}</b>\n\n"
-            f"{'کاربری یافت نشد' if lang == 'fa' else 'No users found'}",
-            reply_markup=admin_stats_back_kb(lang),
-            parse_mode="HTML",
-        )
-        return
-
-    start = page * page_size
-    page_users = never_connected_users[start : start + page_size]
-
-    lines = [
-        f"🔴 <b>{'کاربرانی که هرگز متصل نشده‌اند' if lang == 'fa' else 'Never Connected Users'}</b>\n"
-    ]
-    lines.append(f"{'تعداد کل: ' if lang == 'fa' else 'Total: '}{len(never_connected_users)}\n")
-
-    for i, u in enumerate(page_users, start + 1):
-        username = u["username"]
-        email = u.get("email", "—")
-        lines.append(f"{i}. 👤 {username} ({email})")
-
-    kb_buttons = []
-    if start + page_size < len(never_connected_users):
-        kb_buttons.append(
-            [InlineKeyboardButton(text="➡️ بعدی", callback_data=f"admin:stats:never:{page + 1}")]
-        )
-    if page > 0:
-        kb_buttons.append(
-            [InlineKeyboardButton(text="➡️ قبلی", callback_data=f"admin:stats:never:{page - 1}")]
-        )
-    kb_buttons.append([InlineKeyboardButton(text="🔙 بازگشت", callback_data="admin:stats")])
-
-    await call.message.edit_text(
-        "\n".join(lines),
-        reply_markup=InlineKeyboardMarkup(inline_keyboard=kb_buttons),
-        parse_mode="HTML",
-    )
+    await show_activity_users(call, session, lang, "never", page)
 
 
 @router.callback_query(F.data == "admin:stats:all_users")
-async def cb_admin_stats_all_users(call: CallbackQuery, session: AsyncSession) -> None:
-    user = await _get_user(session, call.from_user.id)
-    lang = user.lang if user else "en"
+async def cb_admin_stats_all_users(call: CallbackQuery, session: AsyncSession, lang: str) -> None:
     await call.answer()
 
     if call.from_user.id not in cfg.admin_ids:
@@ -2670,9 +2137,7 @@ async def cb_admin_stats_all_users(call: CallbackQuery, session: AsyncSession) -
 
 
 @router.callback_query(F.data == "admin:stats:bot_users")
-async def cb_admin_stats_bot_users(call: CallbackQuery, session: AsyncSession) -> None:
-    user = await _get_user(session, call.from_user.id)
-    lang = user.lang if user else "en"
+async def cb_admin_stats_bot_users(call: CallbackQuery, session: AsyncSession, lang: str) -> None:
     await call.answer()
 
     if call.from_user.id not in cfg.admin_ids:
@@ -2724,9 +2189,9 @@ async def _show_bot_user_list(
 
 
 @router.callback_query(F.data.startswith("admin:stats:bot_users:"))
-async def cb_admin_stats_bot_users_page(call: CallbackQuery, session: AsyncSession) -> None:
-    user = await _get_user(session, call.from_user.id)
-    lang = user.lang if user else "en"
+async def cb_admin_stats_bot_users_page(
+    call: CallbackQuery, session: AsyncSession, lang: str
+) -> None:
     await call.answer()
 
     if call.from_user.id not in cfg.admin_ids:
@@ -2737,9 +2202,7 @@ async def cb_admin_stats_bot_users_page(call: CallbackQuery, session: AsyncSessi
 
 
 @router.callback_query(F.data == "admin:stats:balances")
-async def cb_admin_stats_balances(call: CallbackQuery, session: AsyncSession) -> None:
-    user = await _get_user(session, call.from_user.id)
-    lang = user.lang if user else "en"
+async def cb_admin_stats_balances(call: CallbackQuery, session: AsyncSession, lang: str) -> None:
     await call.answer()
 
     if call.from_user.id not in cfg.admin_ids:
@@ -2750,9 +2213,9 @@ async def cb_admin_stats_balances(call: CallbackQuery, session: AsyncSession) ->
 
 
 @router.callback_query(F.data.startswith("admin:stats:balances:"))
-async def cb_admin_stats_balances_page(call: CallbackQuery, session: AsyncSession) -> None:
-    user = await _get_user(session, call.from_user.id)
-    lang = user.lang if user else "en"
+async def cb_admin_stats_balances_page(
+    call: CallbackQuery, session: AsyncSession, lang: str
+) -> None:
     await call.answer()
 
     if call.from_user.id not in cfg.admin_ids:
@@ -2767,11 +2230,9 @@ async def show_user_balances(
 ) -> None:
     page_size = 40
 
-    result = await session.execute(select(func.sum(User.balance)))
-    total_balance = result.scalar() or 0
-
-    result = await session.execute(select(func.count(User.id)).where(User.balance > 0))
-    count_with_balance = result.scalar() or 0
+    summary = await get_balance_summary(session)
+    total_balance = summary.total_balance
+    count_with_balance = summary.holders
 
     result = await session.execute(
         select(User)
@@ -2784,8 +2245,15 @@ async def show_user_balances(
 
     lines = [f"💰 <b>{'موجودی کاربران' if lang == 'fa' else 'User Balances'}</b>\n"]
     lines.append(
-        f"{'کل موجودی' if lang == 'fa' else 'Total Balance'}: {total_balance:,} {'تومان' if lang == 'fa' else 'Toman'}\n"
+        f"{'کل موجودی' if lang == 'fa' else 'Total Balance'}: {total_balance:,} {'تومان' if lang == 'fa' else 'Toman'}"
     )
+    lines.append(
+        f"🕒 {'بروزرسانی' if lang == 'fa' else 'Updated'}: {to_persian_date(summary.refreshed_at, include_time=True)}\n"
+    )
+    if summary.mismatched:
+        lines.append(
+            f"⚠️ {'مغایرت موجودی با تراکنش‌ها' if lang == 'fa' else 'Balances not matching the ledger'}: {summary.mismatched}\n"
+        )
 
     if users_with_balance:
         lines.append(f"\n{'کاربران با موجودی:' if lang == 'fa' else 'Users with balance:'}")
@@ -2817,9 +2285,7 @@ async def show_user_balances(
 
 
 @router.callback_query(F.data == "admin:backup")
-async def cb_admin_backup(call: CallbackQuery, session: AsyncSession) -> None:
-    user = await _get_user(session, call.from_user.id)
-    lang = user.lang if user else "en"
+async def cb_admin_backup(call: CallbackQuery, lang: str) -> None:
     await call.answer()
 
     if call.from_user.id not in cfg.admin_ids:
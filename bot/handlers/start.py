@@ -5,7 +5,6 @@ from aiogram.filters import CommandStart
 from aiogram.types import Message, CallbackQuery
 from aiogram.fsm.context import FSMContext
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
 
 from bot.core.i18n import t
 from bot.db.models.user import User
@@ -22,11 +21,10 @@ router = Router(name="start")
 
 
 @router.message(CommandStart())
-async def cmd_start(message: Message, session: AsyncSession, state: FSMContext) -> None:
+async def cmd_start(
+    message: Message, session: AsyncSession, state: FSMContext, user: User | None
+) -> None:
     """Handle /start — show rules first, then language selection."""
-    result = await session.execute(select(User).where(User.telegram_id == message.from_user.id))
-    user = result.scalar_one_or_none()
-
     if user is None:
         user = User(
             telegram_id=message.from_user.id,
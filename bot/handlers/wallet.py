@@ -1,18 +1,20 @@
 from __future__ import annotations
 
+import time
 import uuid as uuid_lib
-import asyncio
 
 from aiogram import Router, F, Bot
 from aiogram.types import CallbackQuery, Message
 from aiogram.fsm.context import FSMContext
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
 import structlog
 
 from bot.config import settings
+from bot.core.charge_requests import ChargeRequest, charge_requests
 from bot.core.i18n import t
+from bot.core.wallet import adjust_balance, history_page
 from bot.db.models.user import User
+from bot.db.models.wallet_transaction import CHARGE, PURCHASE, REFUND
 from bot.keyboards.inline import (
     wallet_main_kb,
     wallet_cancel_kb,
@@ -20,40 +22,30 @@ from bot.keyboards.inline import (
     wallet_success_kb,
     back_to_menu_kb,
     admin_approve_reject_kb,
+    admin_charge_list_kb,
+    wallet_history_kb,
 )
 from bot.states.fsm import Wallet
+from bot.utils.date import to_persian_date
 
 log = structlog.get_logger()
 router = Router(name="wallet")
 
-pending_requests: dict[str, dict] = {}
+CHARGE_LIST_PAGE_SIZE = 10
 
-
-async def _get_user(session: AsyncSession, telegram_id: int) -> User | None:
-    result = await session.execute(select(User).where(User.telegram_id == telegram_id))
-    return result.scalar_one_or_none()
-
-
-async def _get_user_balance(session: AsyncSession, telegram_id: int) -> int:
-    user = await _get_user(session, telegram_id)
-    return user.balance if user else 0
-
-
-async def _update_user_balance(session: AsyncSession, telegram_id: int, amount: int) -> None:
-    user = await _get_user(session, telegram_id)
-    if user:
-        user.balance += amount
-        await session.commit()
+_TRANSACTION_LABELS = {
+    CHARGE: ("➕ شارژ", "➕ Charge"),
+    PURCHASE: ("🛒 خرید", "🛒 Purchase"),
+    REFUND: ("↩️ بازگشت وجه", "↩️ Refund"),
+}
 
 
 @router.callback_query(F.data == "menu:wallet")
-async def cb_wallet(call: CallbackQuery, session: AsyncSession, state: FSMContext) -> None:
-    user = await _get_user(session, call.from_user.id)
-    lang = user.lang if user else "en"
+async def cb_wallet(call: CallbackQuery, state: FSMContext, user: User | None, lang: str) -> None:
     await call.answer()
     await state.set_state(Wallet.idle)
 
-    balance = await _get_user_balance(session, call.from_user.id)
+    balance = user.balance if user else 0
 
     text = f"💰 <b>{'کیف پول' if lang == 'fa' else 'Wallet'}</b>"
     await call.message.edit_text(
@@ -64,12 +56,12 @@ async def cb_wallet(call: CallbackQuery, session: AsyncSession, state: FSMContex
 
 
 @router.callback_query(F.data == "wallet:balance")
-async def cb_wallet_balance(call: CallbackQuery, session: AsyncSession, state: FSMContext) -> None:
-    user = await _get_user(session, call.from_user.id)
-    lang = user.lang if user else "en"
+async def cb_wallet_balance(
+    call: CallbackQuery, state: FSMContext, user: User | None, lang: str
+) -> None:
     await call.answer()
 
-    balance = await _get_user_balance(session, call.from_user.id)
+    balance = user.balance if user else 0
 
     text = f"💰 <b>{'کیف پول' if lang == 'fa' else 'Wallet'}</b>"
     await call.message.edit_text(
@@ -79,24 +71,34 @@ async def cb_wallet_balance(call: CallbackQuery, session: AsyncSession, state: F
     )
 
 
-@router.callback_query(F.data == "wallet:history")
-async def cb_wallet_history(call: CallbackQuery, session: AsyncSession, state: FSMContext) -> None:
-    user = await _get_user(session, call.from_user.id)
-    lang = user.lang if user else "en"
+@router.callback_query(F.data.startswith("wallet:history"))
+async def cb_wallet_history(call: CallbackQuery, session: AsyncSession, lang: str) -> None:
     await call.answer()
 
-    text = f"📜 <b>{'تاریخچه تراکنش‌ها' if lang == 'fa' else 'Transaction History'}</b>\n\n{'به زودی...' if lang == 'fa' else 'Coming soon...'}"
+    cursor = call.data.removeprefix("wallet:history").removeprefix(":") or None
+    transactions, next_cursor = await history_page(session, call.from_user.id, cursor)
+
+    lines = [f"📜 <b>{'تاریخچه تراکنش‌ها' if lang == 'fa' else 'Transaction History'}</b>\n"]
+    if not transactions:
+        lines.append(f"{'تراکنشی ثبت نشده است.' if lang == 'fa' else 'No transactions yet.'}")
+
+    for tx in transactions:
+        fa_label, en_label = _TRANSACTION_LABELS.get(tx.kind, ("✏️ اصلاح", "✏️ Adjustment"))
+        lines.append(
+            f"{fa_label if lang == 'fa' else en_label} | <b>{tx.amount:+,}</b> | "
+            f"{'موجودی' if lang == 'fa' else 'Balance'}: {tx.balance_after:,}\n"
+            f"🕒 {to_persian_date(tx.created_at, include_time=True) if lang == 'fa' else tx.created_at.strftime('%Y-%m-%d %H:%M')}"
+        )
+
     await call.message.edit_text(
-        text,
-        reply_markup=back_to_menu_kb(lang),
+        "\n".join(lines),
+        reply_markup=wallet_history_kb(lang, next_cursor, first_page=cursor is None),
         parse_mode="HTML",
     )
 
 
 @router.callback_query(F.data == "wallet:charge")
-async def cb_wallet_charge(call: CallbackQuery, session: AsyncSession, state: FSMContext) -> None:
-    user = await _get_user(session, call.from_user.id)
-    lang = user.lang if user else "en"
+async def cb_wallet_charge(call: CallbackQuery, state: FSMContext, lang: str) -> None:
     await call.answer()
     await state.set_state(Wallet.waiting_for_amount)
 
@@ -114,12 +116,7 @@ async def cb_wallet_charge(call: CallbackQuery, session: AsyncSession, state: FS
 
 
 @router.message(Wallet.waiting_for_amount)
-async def handle_wallet_amount(
-    message: Message, session: AsyncSession, state: FSMContext, bot: Bot
-) -> None:
-    user = await _get_user(session, message.from_user.id)
-    lang = user.lang if user else "en"
-
+async def handle_wallet_amount(message: Message, state: FSMContext, bot: Bot, lang: str) -> None:
     try:
         amount = int(message.text.strip().replace(",", ""))
         if amount <= 0:
@@ -139,15 +136,6 @@ async def handle_wallet_amount(
     data = await state.get_data()
     message_id = data.get("wallet_message_id")
 
-    pending_requests[request_id] = {
-        "user_id": message.from_user.id,
-        "username": message.from_user.username,
-        "full_name": message.from_user.full_name,
-        "amount": amount,
-        "lang": lang,
-        "message_id": message_id,
-    }
-
     await state.update_data(wallet_request_id=request_id, wallet_amount=amount)
     await state.set_state(Wallet.waiting_for_receipt)
 
@@ -177,19 +165,14 @@ async def handle_wallet_amount(
 
 @router.message(Wallet.waiting_for_receipt, F.photo)
 async def handle_wallet_receipt(
-    message: Message,
-    session: AsyncSession,
-    state: FSMContext,
-    bot: Bot,
+    message: Message, state: FSMContext, bot: Bot, user: User | None, lang: str
 ) -> None:
-    user = await _get_user(session, message.from_user.id)
-    lang = user.lang if user else "en"
     data = await state.get_data()
     request_id = data.get("wallet_request_id", "unknown")
     amount = data.get("wallet_amount", 0)
     message_id = data.get("wallet_message_id")
 
-    balance = await _get_user_balance(session, message.from_user.id)
+    balance = user.balance if user else 0
     balance_text = f"{balance:,}"
     amount_text = f"{amount:,}"
 
@@ -209,9 +192,22 @@ async def handle_wallet_receipt(
         f"💳 {'مبلغ درخواستی' if lang == 'fa' else 'Requested Amount'}: {amount_text} {'تومان' if lang == 'fa' else 'Toman'}"
     )
 
+    # Stored before the receipt is posted so an immediate admin click finds it.
+    await charge_requests.add(
+        ChargeRequest(
+            request_id=request_id,
+            user_id=message.from_user.id,
+            username=message.from_user.username,
+            full_name=message.from_user.full_name,
+            amount=amount,
+            lang=lang,
+            message_id=message_id,
+        )
+    )
+
     try:
         photo = message.photo[-1]
-        await bot.send_photo(
+        receipt = await bot.send_photo(
             chat_id=settings.admin_group_id,
             message_thread_id=settings.payment_receipts_topic_id,
             photo=photo.file_id,
@@ -221,6 +217,7 @@ async def handle_wallet_receipt(
         )
     except Exception as e:
         log.error("Failed to send receipt to admin", error=str(e))
+        await charge_requests.claim(request_id)
         await message.answer(
             t(lang, "error_occurred")
             if hasattr(t(lang), "__call__")
@@ -229,6 +226,8 @@ async def handle_wallet_receipt(
         )
         return
 
+    await charge_requests.set_receipt_message(request_id, receipt.message_id)
+
     try:
         await bot.delete_message(chat_id=message.chat.id, message_id=message.message_id)
     except Exception as e:
@@ -255,10 +254,8 @@ async def handle_wallet_receipt(
 
 @router.message(Wallet.waiting_for_receipt)
 async def handle_wallet_receipt_invalid(
-    message: Message, session: AsyncSession, state: FSMContext, bot: Bot
+    message: Message, state: FSMContext, bot: Bot, lang: str
 ) -> None:
-    user = await _get_user(session, message.from_user.id)
-    lang = user.lang if user else "en"
     data = await state.get_data()
     message_id = data.get("wallet_message_id")
 
@@ -279,14 +276,14 @@ async def handle_wallet_receipt_invalid(
 
 
 @router.callback_query(F.data == "wallet:cancel")
-async def cb_wallet_cancel(call: CallbackQuery, session: AsyncSession, state: FSMContext) -> None:
-    user = await _get_user(session, call.from_user.id)
-    lang = user.lang if user else "en"
+async def cb_wallet_cancel(
+    call: CallbackQuery, state: FSMContext, user: User | None, lang: str
+) -> None:
     await call.answer()
     await state.clear()
     await state.set_state(Wallet.idle)
 
-    balance = await _get_user_balance(session, call.from_user.id)
+    balance = user.balance if user else 0
 
     text = f"💰 <b>{'کیف پول' if lang == 'fa' else 'Wallet'}</b>"
     await call.message.edit_text(
@@ -303,22 +300,29 @@ async def cb_wallet_approve(call: CallbackQuery, session: AsyncSession, bot: Bot
         return
 
     request_id = call.data.split(":")[-1]
-    await call.answer()
-
-    if request_id not in pending_requests:
-        await call.message.edit_text(
-            "درخواست یافت نشد.",
-            parse_mode="HTML",
-        )
+    request = await charge_requests.claim(request_id)
+    if request is None:
+        await call.answer("درخواست یافت نشد یا قبلاً بررسی شده است.", show_alert=True)
         return
 
-    request_data = pending_requests.pop(request_id)
-    user_id = request_data["user_id"]
-    amount = request_data["amount"]
-    lang = request_data["lang"]
-    user_message_id = request_data.get("message_id")
+    user_id = request.user_id
+    amount = request.amount
+    lang = request.lang
+    user_message_id = request.message_id
 
-    await _update_user_balance(session, user_id, amount)
+    try:
+        balance = await adjust_balance(session, user_id, amount, CHARGE, request_id)
+        await session.commit()
+    except Exception:
+        # Put the request back so the charge can be approved again.
+        await charge_requests.add(request)
+        raise
+    if balance is None:
+        await charge_requests.add(request)
+        log.error("Charge approved for unknown user", user_id=user_id, request_id=request_id)
+        await call.answer("کاربر در دیتابیس یافت نشد؛ کیف پول شارژ نشد.", show_alert=True)
+        return
+    await call.answer()
 
     amount_text = f"{amount:,}"
 
@@ -339,8 +343,8 @@ async def cb_wallet_approve(call: CallbackQuery, session: AsyncSession, bot: Bot
     except Exception as e:
         log.error("Failed to notify user of approval", error=str(e))
 
-    await call.message.edit_text(
-        call.message.text + "\n\n✅ <b>تایید شد</b>",
+    await call.message.edit_caption(
+        caption=call.message.html_text + "\n\n✅ <b>تایید شد</b>",
         reply_markup=None,
         parse_mode="HTML",
     )
@@ -353,19 +357,15 @@ async def cb_wallet_reject(call: CallbackQuery, session: AsyncSession, bot: Bot)
         return
 
     request_id = call.data.split(":")[-1]
-    await call.answer()
-
-    if request_id not in pending_requests:
-        await call.message.edit_text(
-            "درخواست یافت نشد.",
-            parse_mode="HTML",
-        )
+    request = await charge_requests.claim(request_id)
+    if request is None:
+        await call.answer("درخواست یافت نشد یا قبلاً بررسی شده است.", show_alert=True)
         return
+    await call.answer()
 
-    request_data = pending_requests.pop(request_id)
-    user_id = request_data["user_id"]
-    lang = request_data["lang"]
-    user_message_id = request_data.get("message_id")
+    user_id = request.user_id
+    lang = request.lang
+    user_message_id = request.message_id
 
     try:
         if user_message_id:
@@ -382,8 +382,75 @@ async def cb_wallet_reject(call: CallbackQuery, session: AsyncSession, bot: Bot)
     except Exception as e:
         log.error("Failed to notify user of rejection", error=str(e))
 
-    await call.message.edit_text(
-        call.message.text + "\n\n❌ <b>رد شد</b>",
+    await call.message.edit_caption(
+        caption=call.message.html_text + "\n\n❌ <b>رد شد</b>",
         reply_markup=None,
         parse_mode="HTML",
     )
+
+
+@router.callback_query(F.data == "admin:charges")
+async def cb_admin_charges(call: CallbackQuery, lang: str) -> None:
+    await call.answer()
+
+    if call.from_user.id not in settings.admin_ids:
+        return
+
+    await _show_charge_list(call, lang, page=0)
+
+
+@router.callback_query(F.data.startswith("admin:charges:"))
+async def cb_admin_charges_page(call: CallbackQuery, lang: str) -> None:
+    await call.answer()
+
+    if call.from_user.id not in settings.admin_ids:
+        return
+
+    page = int(call.data.split(":")[-1])
+    await _show_charge_list(call, lang, page=page)
+
+
+def _receipt_link(request: ChargeRequest) -> str:
+    if not request.receipt_message_id:
+        return ""
+    chat = str(settings.admin_group_id).removeprefix("-100")
+    return f' | <a href="https://t.me/c/{chat}/{request.receipt_message_id}">🧾</a>'
+
+
+async def _show_charge_list(call: CallbackQuery, lang: str, page: int = 0) -> None:
+    total_count, requests = await charge_requests.list_pending(
+        offset=page * CHARGE_LIST_PAGE_SIZE, limit=CHARGE_LIST_PAGE_SIZE
+    )
+    total_pages = max(1, (total_count + CHARGE_LIST_PAGE_SIZE - 1) // CHARGE_LIST_PAGE_SIZE)
+
+    title = (
+        f"💸 <b>{'درخواست‌های شارژ در انتظار' if lang == 'fa' else 'Pending Charge Requests'}</b>\n"
+    )
+    if not requests:
+        await call.message.edit_text(
+            f"{title}\n{'درخواستی در انتظار بررسی نیست.' if lang == 'fa' else 'No requests awaiting review.'}",
+            reply_markup=admin_charge_list_kb(0, 1, lang),
+            parse_mode="HTML",
+        )
+        return
+
+    lines = [title]
+    lines.append(
+        f"{'صفحه' if lang == 'fa' else 'Page'} {page + 1} / {total_pages} | {'تعداد کل' if lang == 'fa' else 'Total'}: {total_count}\n"
+    )
+
+    now = time.time()
+    for request in requests:
+        username = f"@{request.username}" if request.username else "—"
+        hours = int((now - request.created_at) // 3600)
+        lines.append(
+            f"<code>{request.request_id}</code> | {request.user_id} | {username} | "
+            f"💰 {request.amount:,} | ⏱ {hours}h{_receipt_link(request)}"
+        )
+
+    await call.message.edit_text(
+        "\n".join(lines),
+        reply_markup=admin_charge_list_kb(page, total_pages, lang),
+        parse_mode="HTML",
+        disable_web_page_preview=True,
+    )
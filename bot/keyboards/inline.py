@@ -201,6 +201,23 @@ def wallet_main_kb(lang: str, balance: int = 0) -> InlineKeyboardMarkup:
     )
 
 
+def wallet_history_kb(
+    lang: str, next_cursor: str | None, first_page: bool = True
+) -> InlineKeyboardMarkup:
+    kb = []
+    nav_buttons = []
+    if not first_page:
+        nav_buttons.append(InlineKeyboardButton(text="⏮ جدیدترین", callback_data="wallet:history"))
+    if next_cursor:
+        nav_buttons.append(
+            InlineKeyboardButton(text="قدیمی‌تر ➡️", callback_data=f"wallet:history:{next_cursor}")
+        )
+    if nav_buttons:
+        kb.append(nav_buttons)
+    kb.append([InlineKeyboardButton(text="💼 بازگشت به کیف پول", callback_data="menu:wallet")])
+    return InlineKeyboardMarkup(inline_keyboard=kb)
+
+
 def wallet_cancel_kb(lang: str) -> InlineKeyboardMarkup:
     return InlineKeyboardMarkup(
         inline_keyboard=[
@@ -267,6 +284,9 @@ def admin_main_kb(lang: str = "fa") -> InlineKeyboardMarkup:
                 InlineKeyboardButton(text="💾 پشتیبان‌گیری", callback_data="admin:backup"),
                 InlineKeyboardButton(text="📦 مدیریت بسته‌ها", callback_data="admin:packages"),
             ],
+            [
+                InlineKeyboardButton(text="💸 درخواست‌های شارژ", callback_data="admin:charges"),
+            ],
             [
                 InlineKeyboardButton(text="🔙 بازگشت به منوی اصلی", callback_data="menu:back"),
             ],
@@ -363,6 +383,24 @@ def admin_bot_user_list_kb(page: int, total_pages: int, lang: str = "fa") -> Inl
     return InlineKeyboardMarkup(inline_keyboard=kb)
 
 
+def admin_charge_list_kb(page: int, total_pages: int, lang: str = "fa") -> InlineKeyboardMarkup:
+    kb = []
+    nav_buttons = []
+    if page > 0:
+        nav_buttons.append(
+            InlineKeyboardButton(text="⬅️ قبلی", callback_data=f"admin:charges:{page - 1}")
+        )
+    if page < total_pages - 1:
+        nav_buttons.append(
+            InlineKeyboardButton(text="بعدی ➡️", callback_data=f"admin:charges:{page + 1}")
+        )
+    if nav_buttons:
+        kb.append(nav_buttons)
+    kb.append([InlineKeyboardButton(text="🔄 بروزرسانی", callback_data=f"admin:charges:{page}")])
+    kb.append([InlineKeyboardButton(text="🔙 بازگشت", callback_data="admin:panel")])
+    return InlineKeyboardMarkup(inline_keyboard=kb)
+
+
 def tutorial_os_select_kb(lang: str = "fa") -> InlineKeyboardMarkup:
     return InlineKeyboardMarkup(
         inline_keyboard=[
@@ -6,26 +6,72 @@ import structlog
 
 from bot.config import settings
 from bot.core.dispatcher import create_dispatcher
-from bot.core.stats_sync import start_stats_sync_task
+from bot.core.executor import render_executor
+from bot.core.leader import background_lease, stats_sync_shards
+from bot.core.purchases import start_purchase_worker
+from bot.core.send_queue import send_queue
+from bot.core.stats_sync import start_forecast_task, start_stats_sync_task
 from bot.core.user_notifications import start_notification_task
-from bot.db.engine import engine
-from bot.db.base import Base
-from bot.db.models import User, UserStatsCache  # noqa: F401
+from bot.core.wallet import start_balance_summary_task
+from bot.db.migrate import ensure_schema
+from bot.remnawave.client import remnawave
+
+
+def _start_sync_jobs() -> list[asyncio.Task]:
+    jobs = [
+        asyncio.create_task(start_stats_sync_task(), name="stats-sync"),
+        asyncio.create_task(start_forecast_task(), name="forecast-scheduler"),
+    ]
+    logging.info("Stats sync and forecast scheduler tasks started")
+    return jobs
+
+
+def _start_singleton_jobs() -> list[asyncio.Task]:
+    jobs = [
+        asyncio.create_task(start_notification_task(), name="notifications"),
+        asyncio.create_task(start_balance_summary_task(), name="wallet-summary"),
+        asyncio.create_task(start_purchase_worker(), name="purchase-worker"),
+    ]
+    logging.info("Notification, wallet and purchase tasks started")
+    return jobs
+
+
+def _start_jobs() -> list[asyncio.Task]:
+    return _start_sync_jobs() + _start_singleton_jobs()
+
+
+def start_background_tasks(bot) -> None:
+    send_queue.start(bot)
+
+    if settings.stats_sync_sharding:
+        # Every replica syncs its own share of the accounts; the rest of the jobs,
+        # including traffic partition maintenance, stay with the lease holder.
+        asyncio.create_task(stats_sync_shards.run())
+        _start_sync_jobs()
+        asyncio.create_task(background_lease.run(_start_singleton_jobs))
+    else:
+        # Exactly one replica holds the lease and runs the jobs.
+        asyncio.create_task(background_lease.run(_start_jobs))
+    logging.info("Campaigning for the background jobs lease")
 
 
 async def on_startup(bot, dispatcher) -> None:
-    async with engine.begin() as conn:
-        await conn.run_sync(Base.metadata.create_all)
-    logging.info("Database tables ensured.")
+    await ensure_schema()
+    await remnawave.start()
+    start_background_tasks(bot)
 
-    asyncio.create_task(start_stats_sync_task())
-    logging.info("Stats sync task started")
 
-    asyncio.create_task(start_notification_task(bot))
-    logging.info("Notification task started")
+async def on_shutdown(bot, dispatcher) -> None:
+    await background_lease.release()
+    if settings.stats_sync_sharding:
+        await stats_sync_shards.leave()
+    await send_queue.stop()
+    render_executor.shutdown()
+    await remnawave.close()
+    logging.info("Remnawave session closed")
 
 
-async def main() -> None:
+def configure_logging() -> None:
     logging.basicConfig(
         level=settings.log_level.upper(),
         format="%(asctime)s | %(levelname)-8s | %(name)s | %(message)s",
@@ -36,9 +82,16 @@ async def main() -> None:
         ),
     )
 
+
+async def main() -> None:
+    configure_logging()
+
     bot, dp = create_dispatcher()
     dp.startup.register(on_startup)
+    dp.shutdown.register(on_shutdown)
 
+    # A webhook left behind by webhook mode would make getUpdates fail.
+    await bot.delete_webhook()
     logging.info("Starting Remnabot polling...")
     await dp.start_polling(bot, allowed_updates=dp.resolve_used_update_types())
 
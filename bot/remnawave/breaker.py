@@ -0,0 +1,95 @@
+from __future__ import annotations
+
+import time
+
+import structlog
+
+log = structlog.get_logger()
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+# Numeric encoding of the state for metrics.
+STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+
+class CircuitBreaker:
+    """Consecutive-failure circuit breaker for calls to one upstream.
+
+    After ``failure_threshold`` failures in a row the circuit opens and every
+    call is rejected without touching the network. Once ``reset_timeout``
+    seconds have passed a single probe is let through (half-open): success
+    closes the circuit, failure opens it for another ``reset_timeout``. A probe
+    that never reports back (e.g. cancelled) is replaced after the same delay.
+    """
+
+    def __init__(self, name: str, failure_threshold: int, reset_timeout: float) -> None:
+        self.name = name
+        self._threshold = max(1, failure_threshold)
+        self._reset_timeout = reset_timeout
+        self._state = CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probe_started: float | None = None
+
+        self.opened = 0
+        self.rejected = 0
+
+    @property
+    def state(self) -> str:
+        if self._state == OPEN and time.monotonic() - self._opened_at >= self._reset_timeout:
+            return HALF_OPEN
+        return self._state
+
+    @property
+    def is_open(self) -> bool:
+        return self.state == OPEN
+
+    def allow(self) -> bool:
+        """Whether a call may go out now; rejected calls are counted."""
+        state = self.state
+        if state == CLOSED:
+            return True
+        now = time.monotonic()
+        if state == HALF_OPEN and (
+            self._probe_started is None or now - self._probe_started >= self._reset_timeout
+        ):
+            self._probe_started = now
+            return True
+        self.rejected += 1
+        return False
+
+    def record_success(self) -> None:
+        self._probe_started = None
+        self._failures = 0
+        if self._state != CLOSED:
+            self._transition(CLOSED)
+
+    def record_failure(self) -> None:
+        self._probe_started = None
+        self._failures += 1
+        if self._state == OPEN or self._failures >= self._threshold:
+            self._opened_at = time.monotonic()
+            if self._state != OPEN:
+                self.opened += 1
+                self._transition(OPEN)
+
+    def _transition(self, state: str) -> None:
+        self._state = state
+        log.warning(
+            "circuit_breaker_state",
+            breaker=self.name,
+            state=state,
+            state_value=STATE_VALUES[state],
+            failures=self._failures,
+        )
+
+    def stats(self) -> dict[str, float]:
+        state = self.state
+        return {
+            "state": STATE_VALUES[state],
+            "consecutive_failures": self._failures,
+            "opened": self.opened,
+            "rejected": self.rejected,
+        }
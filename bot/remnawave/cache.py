@@ -0,0 +1,107 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import weakref
+
+import structlog
+
+from bot.config import settings
+from bot.core.redis_client import redis_client
+from bot.remnawave.client import remnawave
+
+log = structlog.get_logger()
+
+ACCOUNTS_KEY = "rw:accounts:{telegram_id}"
+ACCOUNTS_LOCK_KEY = "rw:accounts:lock:{telegram_id}"
+LOCK_TTL_MS = 10_000
+LOCK_WAIT_SECONDS = 3.0
+LOCK_POLL_SECONDS = 0.1
+
+_local_locks: weakref.WeakValueDictionary[int, asyncio.Lock] = weakref.WeakValueDictionary()
+
+
+async def _read_cached(key: str) -> list[dict] | None:
+    try:
+        raw = await redis_client.get(key)
+    except Exception as e:
+        log.warning("remnawave_cache_read_error", key=key, error=str(e))
+        return None
+    return json.loads(raw) if raw else None
+
+
+async def _write_cached(key: str, accounts: list[dict]) -> None:
+    try:
+        await redis_client.set(key, json.dumps(accounts), ex=settings.remnawave_cache_ttl)
+    except Exception as e:
+        log.warning("remnawave_cache_write_error", key=key, error=str(e))
+
+
+async def _fetch_with_lock(telegram_id: int) -> list[dict]:
+    """Fetch from the panel so that only one caller per telegram id hits it at a time.
+
+    A per-process lock collapses concurrent callers in this worker; a short Redis
+    ``SET NX`` lock does the same across workers. Callers that lose the Redis race
+    poll the cache briefly and fall back to fetching themselves.
+    """
+    key = ACCOUNTS_KEY.format(telegram_id=telegram_id)
+    lock_key = ACCOUNTS_LOCK_KEY.format(telegram_id=telegram_id)
+
+    try:
+        acquired = await redis_client.set(lock_key, "1", nx=True, px=LOCK_TTL_MS)
+    except Exception:
+        acquired = True
+
+    if not acquired:
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + LOCK_WAIT_SECONDS
+        while loop.time() < deadline:
+            await asyncio.sleep(LOCK_POLL_SECONDS)
+            cached = await _read_cached(key)
+            if cached is not None:
+                return cached
+
+    try:
+        accounts = await remnawave.get_all_users_by_telegram_id(telegram_id)
+        if accounts:
+            await _write_cached(key, accounts)
+        return accounts
+    finally:
+        if acquired:
+            try:
+                await redis_client.delete(lock_key)
+            except Exception:
+                pass
+
+
+async def get_accounts_by_telegram_id(telegram_id: int) -> list[dict]:
+    """Read-through cached ``RemnawaveClient.get_all_users_by_telegram_id``.
+
+    Empty results are not cached, so a transient panel error is never pinned
+    for the whole TTL.
+    """
+    key = ACCOUNTS_KEY.format(telegram_id=telegram_id)
+    cached = await _read_cached(key)
+    if cached is not None:
+        return cached
+
+    lock = _local_locks.get(telegram_id)
+    if lock is None:
+        lock = asyncio.Lock()
+        _local_locks[telegram_id] = lock
+
+    async with lock:
+        cached = await _read_cached(key)
+        if cached is not None:
+            return cached
+        return await _fetch_with_lock(telegram_id)
+
+
+async def invalidate_accounts(telegram_id: int | None) -> None:
+    """Drop the cached account list after a change on the panel."""
+    if not telegram_id:
+        return
+    try:
+        await redis_client.delete(ACCOUNTS_KEY.format(telegram_id=telegram_id))
+    except Exception as e:
+        log.warning("remnawave_cache_invalidate_error", telegram_id=telegram_id, error=str(e))
@@ -1,17 +1,35 @@
 from __future__ import annotations
 
+import asyncio
+import random
 from typing import Any
 
 import aiohttp
 import structlog
 
 from bot.config import settings
+from bot.remnawave.breaker import CircuitBreaker
 
 log = structlog.get_logger()
 
+# Statuses worth retrying: the panel is overloaded or restarting.
+_RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+
 
 class RemnawaveClient:
-    """Async HTTP client for the Remnawave panel API."""
+    """Async HTTP client for the Remnawave panel API.
+
+    A single ``aiohttp.ClientSession`` is shared by every request so TCP/TLS
+    connections to the panel are pooled and kept alive. Call :meth:`start` on
+    startup and :meth:`close` on shutdown; the session is also created lazily
+    on first use.
+
+    Requests carry connect/read timeouts instead of one long total timeout.
+    GETs are retried with jittered exponential backoff on transport errors
+    and 429/5xx answers; POSTs are never retried. Every call goes through a
+    circuit breaker: while it is open the client answers ``None`` at once
+    instead of queueing behind a panel that is down.
+    """
 
     def __init__(self) -> None:
         self._base_url = settings.remnawave_api_url.rstrip("/")
@@ -19,29 +37,120 @@ class RemnawaveClient:
             "Authorization": f"Bearer {settings.remnawave_api_token}",
             "Content-Type": "application/json",
         }
-        self._timeout = aiohttp.ClientTimeout(total=30)
+        self._timeout = self.timeout(settings.remnawave_read_timeout)
+        self._session: aiohttp.ClientSession | None = None
+        self.breaker = CircuitBreaker(
+            "remnawave",
+            failure_threshold=settings.remnawave_breaker_threshold,
+            reset_timeout=settings.remnawave_breaker_reset,
+        )
+
+    @staticmethod
+    def timeout(read: float) -> aiohttp.ClientTimeout:
+        return aiohttp.ClientTimeout(
+            total=None, connect=settings.remnawave_connect_timeout, sock_read=read
+        )
+
+    @property
+    def available(self) -> bool:
+        """``False`` while the circuit is open and calls are being refused."""
+        return not self.breaker.is_open
+
+    async def start(self) -> None:
+        """Open the pooled HTTP session (no-op if already open)."""
+        if self._session is not None and not self._session.closed:
+            return
+        connector = aiohttp.TCPConnector(
+            limit=settings.remnawave_pool_size,
+            limit_per_host=settings.remnawave_pool_size_per_host,
+            ttl_dns_cache=settings.remnawave_dns_cache_ttl,
+            keepalive_timeout=settings.remnawave_keepalive_timeout,
+            ssl=False,
+        )
+        self._session = aiohttp.ClientSession(
+            headers=self._headers,
+            timeout=self._timeout,
+            connector=connector,
+        )
+        log.info("remnawave_session_opened", pool_size=settings.remnawave_pool_size)
+
+    async def close(self) -> None:
+        """Close the pooled HTTP session and release its connections."""
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+            log.info("remnawave_session_closed")
+        self._session = None
+
+    async def _get_session(self) -> aiohttp.ClientSession:
+        if self._session is None or self._session.closed:
+            await self.start()
+        return self._session
+
+    async def _request(
+        self,
+        method: str,
+        url: str,
+        ok_statuses: tuple[int, ...],
+        timeout: aiohttp.ClientTimeout | None = None,
+        **kwargs: Any,
+    ) -> tuple[int, Any]:
+        """One call through the breaker; returns ``(status, json or None)``.
+
+        Transport errors and 429/5xx count against the breaker, other answers
+        (including 4xx) prove the panel is up.
+        """
+        if not self.breaker.allow():
+            log.warning("remnawave_circuit_open", url=url)
+            return 0, None
+
+        session = await self._get_session()
+        try:
+            async with session.request(
+                method, url, timeout=timeout or self._timeout, **kwargs
+            ) as resp:
+                log.info("remnawave_response", method=method, status=resp.status, url=url)
+                body = await resp.json() if resp.status in ok_statuses else None
+        except (aiohttp.ClientError, asyncio.TimeoutError):
+            self.breaker.record_failure()
+            raise
+
+        if resp.status in _RETRY_STATUSES:
+            self.breaker.record_failure()
+        else:
+            self.breaker.record_success()
+        if body is None:
+            log.warning("remnawave_api_error", status=resp.status, url=url)
+        return resp.status, body
 
-    async def _get(self, path: str, params: dict | None = None) -> Any:
+    async def _get(
+        self, path: str, params: dict | None = None, timeout: aiohttp.ClientTimeout | None = None
+    ) -> Any:
         url = f"{self._base_url}{path}"
         log.info("remnawave_request", url=url, params=params)
-        async with aiohttp.ClientSession(headers=self._headers, timeout=self._timeout) as session:
-            async with session.get(url, params=params, ssl=False) as resp:
-                log.info("remnawave_response", status=resp.status, url=url)
-                if resp.status == 200:
-                    return await resp.json()
-                log.warning("remnawave_api_error", status=resp.status, url=url)
-                return None
+        attempts = settings.remnawave_get_retries + 1
+        for attempt in range(attempts):
+            last = attempt == attempts - 1
+            try:
+                status, body = await self._request(
+                    "GET", url, (200,), timeout=timeout, params=params
+                )
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                if last or not self.available:
+                    raise
+                log.warning("remnawave_retry", url=url, attempt=attempt + 1, error=repr(e))
+            else:
+                if status not in _RETRY_STATUSES or last or not self.available:
+                    return body
+                log.warning("remnawave_retry", url=url, attempt=attempt + 1, status=status)
+            # Full jitter keeps retries from many callers from arriving in lockstep.
+            await asyncio.sleep(random.uniform(0, settings.remnawave_retry_backoff * 2**attempt))
+        return None
 
     async def _post(self, path: str, data: dict | None = None) -> Any:
         url = f"{self._base_url}{path}"
         log.info("remnawave_post_request", url=url, data=data)
-        async with aiohttp.ClientSession(headers=self._headers, timeout=self._timeout) as session:
-            async with session.post(url, json=data, ssl=False) as resp:
-                log.info("remnawave_post_response", status=resp.status, url=url)
-                if resp.status in (200, 201):
-                    return await resp.json()
-                log.warning("remnawave_api_error", status=resp.status, url=url)
-                return None
+        _, body = await self._request("POST", url, (200, 201), json=data)
+        return body
 
     async def get_user_by_telegram_id(self, telegram_id: int) -> dict | None:
         """Return user dict from Remnawave if telegram_id matches, else None."""
@@ -98,7 +207,9 @@ class RemnawaveClient:
     ) -> tuple[list[dict] | None, int]:
         """Return paginated users from RemnaWave panel or None on error."""
         params = {"start": (page - 1) * per_page, "size": per_page}
-        result = await self._get("/api/users", params=params)
+        result = await self._get(
+            "/api/users", params=params, timeout=self.timeout(settings.remnawave_bulk_read_timeout)
+        )
         if result is None:
             return None, 0
 
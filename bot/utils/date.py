@@ -5,15 +5,18 @@ from datetime import datetime as dt
 from zoneinfo import ZoneInfo 
 
 def to_persian_date(
-    gregorian_datetime: str | int | float | None, include_time: bool = False
+    gregorian_datetime: datetime | str | int | float | None, include_time: bool = False
 ) -> str:
     if not gregorian_datetime:
         return "—"
     try:
         dt_obj = None
         
+        if isinstance(gregorian_datetime, datetime):
+            dt_obj = gregorian_datetime
+
         # Handle Timestamp (int/float)
-        if isinstance(gregorian_datetime, (int, float)):
+        elif isinstance(gregorian_datetime, (int, float)):
             try:
                 ts = int(gregorian_datetime)
                 # تشخیص میلی‌ثانیه یا ثانیه
@@ -83,4 +86,17 @@ def days_until_persian(gregorian_date_str: str | None) -> int:
         today = gregorian_date.today()
         return (target - today).days
     except Exception:
-        return 0
\ No newline at end of file
+        return 0
+
+
+def parse_iso_datetime(value: str | None) -> datetime | None:
+    """Parse an ISO-8601 timestamp from the panel API (``...Z`` suffix allowed)."""
+    if not value:
+        return None
+    try:
+        parsed = dt.fromisoformat(value.replace("Z", "+00:00"))
+    except ValueError:
+        return None
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed
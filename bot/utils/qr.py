@@ -0,0 +1,76 @@
+from __future__ import annotations
+
+import hashlib
+import io
+
+import qrcode
+import structlog
+from aiogram.types import BufferedInputFile, Message
+
+from bot.core.executor import render_executor
+from bot.core.redis_client import redis_client
+
+log = structlog.get_logger()
+
+QR_FILE_ID_KEY = "qr:file_id:{digest}"
+QR_LINK_KEY = "qr:link:{uuid}"
+QR_FILE_ID_TTL = 30 * 24 * 3600
+
+
+def render_qr_png(data: str) -> bytes:
+    qr = qrcode.QRCode(version=1, box_size=10, border=5)
+    qr.add_data(data)
+    qr.make(fit=True)
+    img = qr.make_image(fill_color="black", back_color="white")
+
+    buffer = io.BytesIO()
+    img.save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+def _file_id_key(link: str) -> str:
+    return QR_FILE_ID_KEY.format(digest=hashlib.sha1(link.encode()).hexdigest())
+
+
+async def get_qr_photo(link: str) -> str | BufferedInputFile:
+    """Telegram ``file_id`` of a previously sent QR for *link*, or a freshly rendered PNG."""
+    try:
+        cached = await redis_client.get(_file_id_key(link))
+    except Exception as e:
+        log.warning("qr_cache_read_error", error=str(e))
+        cached = None
+    if cached:
+        return cached.decode()
+
+    return await render_qr_photo(link)
+
+
+async def render_qr_photo(link: str) -> BufferedInputFile:
+    png = await render_executor.run(render_qr_png, link)
+    return BufferedInputFile(png, filename="qr.png")
+
+
+async def remember_qr_photo(uuid: str, link: str, message: Message) -> None:
+    """Cache the ``file_id`` Telegram assigned to the QR photo in *message*."""
+    if not message.photo:
+        return
+    try:
+        async with redis_client.pipeline(transaction=False) as pipe:
+            pipe.set(_file_id_key(link), message.photo[-1].file_id, ex=QR_FILE_ID_TTL)
+            pipe.set(QR_LINK_KEY.format(uuid=uuid), link, ex=QR_FILE_ID_TTL)
+            await pipe.execute()
+    except Exception as e:
+        log.warning("qr_cache_write_error", error=str(e))
+
+
+async def forget_qr_photo(uuid: str) -> None:
+    """Drop the cached QR of *uuid*'s current link (call when the link is revoked)."""
+    link_key = QR_LINK_KEY.format(uuid=uuid)
+    try:
+        link = await redis_client.get(link_key)
+        keys = [link_key]
+        if link:
+            keys.append(_file_id_key(link.decode()))
+        await redis_client.delete(*keys)
+    except Exception as e:
+        log.warning("qr_cache_delete_error", error=str(e))
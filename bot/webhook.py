@@ -0,0 +1,130 @@
+"""Webhook entry point: ``python -m bot.webhook``.
+
+The parent process migrates the schema and registers the webhook, then starts
+``webhook_workers`` processes that each run an aiohttp server on the same port
+(``SO_REUSEPORT``), so the kernel spreads incoming updates across them. FSM
+state is shared through Redis. Background jobs run in worker 0 only.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import multiprocessing
+import signal
+
+from aiogram import Bot, Dispatcher
+from aiogram.webhook.aiohttp_server import SimpleRequestHandler, setup_application
+from aiohttp import web
+
+from bot.config import settings
+from bot.core.dispatcher import create_dispatcher
+from bot.core.metrics import render_metrics
+from bot.db.migrate import ensure_schema
+from bot.main import configure_logging, on_shutdown, start_background_tasks
+from bot.remnawave.client import remnawave
+
+logger = logging.getLogger(__name__)
+
+
+async def on_worker_startup(bot: Bot, dispatcher: Dispatcher, worker_index: int) -> None:
+    await remnawave.start()
+    if worker_index == 0:
+        start_background_tasks(bot)
+
+
+async def _metrics(request: web.Request) -> web.Response:
+    return web.Response(text=render_metrics(), content_type="text/plain")
+
+
+async def _serve(worker_index: int) -> None:
+    bot, dp = create_dispatcher()
+    dp.startup.register(on_worker_startup)
+    dp.shutdown.register(on_shutdown)
+
+    app = web.Application()
+    SimpleRequestHandler(
+        dispatcher=dp,
+        bot=bot,
+        secret_token=settings.webhook_secret or None,
+    ).register(app, path=settings.webhook_path)
+    setup_application(app, dp, bot=bot, worker_index=worker_index)
+    app.router.add_get(settings.webhook_metrics_path, _metrics)
+
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(
+        runner,
+        settings.webhook_host,
+        settings.webhook_port,
+        reuse_port=settings.webhook_workers > 1,
+    )
+    await site.start()
+    logger.info(f"Webhook worker {worker_index} listening on port {settings.webhook_port}")
+
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await runner.cleanup()
+
+
+def _run_worker(worker_index: int) -> None:
+    configure_logging()
+    # Treat SIGTERM from the parent like Ctrl+C so the worker shuts down cleanly.
+    signal.signal(signal.SIGTERM, signal.default_int_handler)
+    try:
+        asyncio.run(_serve(worker_index))
+    except KeyboardInterrupt:
+        pass
+
+
+async def _prepare() -> None:
+    await ensure_schema()
+
+    bot, dp = create_dispatcher()
+    try:
+        await bot.set_webhook(
+            url=settings.webhook_base_url.rstrip("/") + settings.webhook_path,
+            secret_token=settings.webhook_secret or None,
+            allowed_updates=dp.resolve_used_update_types(),
+        )
+    finally:
+        await bot.session.close()
+
+
+def main() -> None:
+    configure_logging()
+    if not settings.webhook_base_url:
+        raise SystemExit("WEBHOOK_BASE_URL must be set for webhook mode")
+
+    asyncio.run(_prepare())
+
+    workers = max(1, settings.webhook_workers)
+    if workers == 1:
+        _run_worker(0)
+        return
+
+    context = multiprocessing.get_context("spawn")
+    processes = [
+        context.Process(target=_run_worker, args=(index,), name=f"webhook-{index}")
+        for index in range(workers)
+    ]
+    for process in processes:
+        process.start()
+    logger.info(f"Started {workers} webhook workers")
+
+    try:
+        for process in processes:
+            process.join()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        for process in processes:
+            if process.is_alive():
+                process.terminate()
+        for process in processes:
+            process.join()
+
+
+if __name__ == "__main__":
+    main()
@@ -9,10 +9,11 @@ from alembic import context
 
 # Import models so Alembic can detect them
 from bot.db.base import Base
-from bot.db.models import User  # noqa: F401
+import bot.db.models  # noqa: F401
 
 config = context.config
-if config.config_file_name is not None:
+# The bot runs migrations in-process at startup and keeps its own logging setup.
+if config.config_file_name is not None and config.attributes.get("configure_logger", True):
     fileConfig(config.config_file_name)
 
 target_metadata = Base.metadata
@@ -0,0 +1,86 @@
+"""Initial schema
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-18
+"""
+
+from __future__ import annotations
+
+import sqlalchemy as sa
+from alembic import op
+
+revision = "0001"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "users",
+        sa.Column("id", sa.Integer(), primary_key=True, autoincrement=True),
+        sa.Column("telegram_id", sa.BigInteger(), nullable=False),
+        sa.Column("username", sa.String(64), nullable=True),
+        sa.Column("full_name", sa.String(256), nullable=True),
+        sa.Column("lang", sa.String(4), nullable=False),
+        sa.Column("balance", sa.Integer(), nullable=False),
+        sa.Column("is_registered", sa.Boolean(), nullable=False),
+        sa.Column("remnawave_uuid", sa.String(64), nullable=True),
+        sa.Column("expiry_warning_enabled", sa.Boolean(), nullable=False),
+        sa.Column("volume_warning_enabled", sa.Boolean(), nullable=False),
+        sa.Column(
+            "created_at",
+            sa.DateTime(timezone=True),
+            server_default=sa.func.now(),
+            nullable=False,
+        ),
+        sa.Column(
+            "updated_at",
+            sa.DateTime(timezone=True),
+            server_default=sa.func.now(),
+            nullable=False,
+        ),
+    )
+    op.create_index("ix_users_telegram_id", "users", ["telegram_id"], unique=True)
+
+    op.create_table(
+        "packages",
+        sa.Column("id", sa.Integer(), primary_key=True, autoincrement=True),
+        sa.Column("name", sa.String(128), nullable=False),
+        sa.Column("volume_gb", sa.Integer(), nullable=False),
+        sa.Column("days", sa.Integer(), nullable=False),
+        sa.Column("price", sa.Integer(), nullable=False),
+        sa.Column("category", sa.String(32), nullable=False),
+        sa.Column("is_active", sa.Boolean(), nullable=False),
+        sa.Column("sort_order", sa.Integer(), nullable=False),
+        sa.Column(
+            "created_at",
+            sa.DateTime(timezone=True),
+            server_default=sa.func.now(),
+            nullable=False,
+        ),
+    )
+
+    op.create_table(
+        "user_stats_cache",
+        sa.Column("id", sa.Integer(), primary_key=True, autoincrement=True),
+        sa.Column("uuid", sa.String(64), nullable=False),
+        sa.Column("username", sa.String(64), nullable=True),
+        sa.Column("status", sa.String(16), nullable=False),
+        sa.Column("used_traffic_bytes", sa.BigInteger(), nullable=False),
+        sa.Column("total_traffic_bytes", sa.BigInteger(), nullable=False),
+        sa.Column("remaining_traffic_bytes", sa.BigInteger(), nullable=False),
+        sa.Column("expire_at", sa.String(32), nullable=True),
+        sa.Column("online_at", sa.String(64), nullable=True),
+        sa.Column("updated_at", sa.DateTime(timezone=True), nullable=False),
+    )
+    op.create_index("ix_user_stats_cache_uuid", "user_stats_cache", ["uuid"], unique=True)
+
+
+def downgrade() -> None:
+    op.drop_index("ix_user_stats_cache_uuid", table_name="user_stats_cache")
+    op.drop_table("user_stats_cache")
+    op.drop_table("packages")
+    op.drop_index("ix_users_telegram_id", table_name="users")
+    op.drop_table("users")
@@ -0,0 +1,38 @@
+"""Notification ledger
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-18
+"""
+
+from __future__ import annotations
+
+import sqlalchemy as sa
+from alembic import op
+
+revision = "0002"
+down_revision = "0001"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "notification_ledger",
+        sa.Column("id", sa.Integer(), primary_key=True, autoincrement=True),
+        sa.Column("telegram_id", sa.BigInteger(), nullable=False),
+        sa.Column("uuid", sa.String(64), nullable=False),
+        sa.Column("kind", sa.String(16), nullable=False),
+        sa.Column("marker", sa.String(64), nullable=False),
+        sa.Column(
+            "sent_at",
+            sa.DateTime(timezone=True),
+            server_default=sa.func.now(),
+            nullable=False,
+        ),
+        sa.UniqueConstraint("telegram_id", "uuid", "kind"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("notification_ledger")
@@ -0,0 +1,48 @@
+"""Store user_stats_cache timestamps as timestamptz
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-18
+"""
+
+from __future__ import annotations
+
+import sqlalchemy as sa
+from alembic import op
+
+revision = "0003"
+down_revision = "0002"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    for column in ("expire_at", "online_at"):
+        op.alter_column(
+            "user_stats_cache",
+            column,
+            type_=sa.DateTime(timezone=True),
+            postgresql_using=f"NULLIF({column}, '')::timestamptz",
+        )
+
+    op.add_column(
+        "user_stats_cache",
+        sa.Column("first_connected_at", sa.DateTime(timezone=True), nullable=True),
+    )
+    # Anyone seen online has connected at least once; the next sync fills in the real value.
+    op.execute(
+        "UPDATE user_stats_cache SET first_connected_at = online_at WHERE online_at IS NOT NULL"
+    )
+
+
+def downgrade() -> None:
+    op.drop_column("user_stats_cache", "first_connected_at")
+
+    iso_format = 'YYYY-MM-DD"T"HH24:MI:SS.MS"Z"'
+    for column, length in (("expire_at", 32), ("online_at", 64)):
+        op.alter_column(
+            "user_stats_cache",
+            column,
+            type_=sa.String(length),
+            postgresql_using=f"to_char({column} AT TIME ZONE 'UTC', '{iso_format}')",
+        )
@@ -0,0 +1,35 @@
+"""Index user_stats_cache timestamps and low-traffic accounts
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-18
+"""
+
+from __future__ import annotations
+
+import sqlalchemy as sa
+from alembic import op
+
+revision = "0004"
+down_revision = "0003"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_index("ix_user_stats_cache_expire_at", "user_stats_cache", ["expire_at"])
+    op.create_index("ix_user_stats_cache_online_at", "user_stats_cache", ["online_at"])
+    op.create_index(
+        "ix_user_stats_cache_low_traffic",
+        "user_stats_cache",
+        ["uuid"],
+        postgresql_where=sa.text(
+            "total_traffic_bytes > 0 AND used_traffic_bytes * 100 >= total_traffic_bytes * 90"
+        ),
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_user_stats_cache_low_traffic", table_name="user_stats_cache")
+    op.drop_index("ix_user_stats_cache_online_at", table_name="user_stats_cache")
+    op.drop_index("ix_user_stats_cache_expire_at", table_name="user_stats_cache")
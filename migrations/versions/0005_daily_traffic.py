@@ -0,0 +1,32 @@
+"""Per-day traffic history, partitioned by month
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-18
+"""
+
+from __future__ import annotations
+
+import sqlalchemy as sa
+from alembic import op
+
+revision = "0005"
+down_revision = "0004"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Monthly partitions are created by the stats sync (bot.core.traffic_history).
+    op.create_table(
+        "daily_traffic",
+        sa.Column("uuid", sa.String(64), nullable=False),
+        sa.Column("day", sa.Date(), nullable=False),
+        sa.Column("used_bytes", sa.BigInteger(), nullable=False),
+        sa.PrimaryKeyConstraint("uuid", "day"),
+        postgresql_partition_by="RANGE (day)",
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("daily_traffic")
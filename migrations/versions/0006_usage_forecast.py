@@ -0,0 +1,36 @@
+"""Usage forecast columns on user_stats_cache
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-18
+"""
+
+from __future__ import annotations
+
+import sqlalchemy as sa
+from alembic import op
+
+revision = "0006"
+down_revision = "0005"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column("user_stats_cache", sa.Column("burn_rate", sa.Float(), nullable=True))
+    op.add_column(
+        "user_stats_cache",
+        sa.Column("depletes_at", sa.DateTime(timezone=True), nullable=True),
+    )
+    op.add_column(
+        "user_stats_cache",
+        sa.Column("next_check_at", sa.DateTime(timezone=True), nullable=True),
+    )
+    op.create_index("ix_user_stats_cache_next_check_at", "user_stats_cache", ["next_check_at"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_user_stats_cache_next_check_at", table_name="user_stats_cache")
+    op.drop_column("user_stats_cache", "next_check_at")
+    op.drop_column("user_stats_cache", "depletes_at")
+    op.drop_column("user_stats_cache", "burn_rate")
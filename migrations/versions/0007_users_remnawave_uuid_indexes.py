@@ -0,0 +1,31 @@
+"""Index users.remnawave_uuid
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-18
+"""
+
+from __future__ import annotations
+
+import sqlalchemy as sa
+from alembic import op
+
+revision = "0007"
+down_revision = "0006"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_index("ix_users_remnawave_uuid", "users", ["remnawave_uuid"])
+    op.create_index(
+        "ix_users_remnawave_uuid_warnings",
+        "users",
+        ["remnawave_uuid"],
+        postgresql_where=sa.text("expiry_warning_enabled OR volume_warning_enabled"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_users_remnawave_uuid_warnings", table_name="users")
+    op.drop_index("ix_users_remnawave_uuid", table_name="users")
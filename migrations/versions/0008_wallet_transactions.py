@@ -0,0 +1,70 @@
+"""Wallet transaction ledger and balance summary
+
+Revision ID: 0008
+Revises: 0007
+Create Date: 2026-10-18
+"""
+
+from __future__ import annotations
+
+import sqlalchemy as sa
+from alembic import op
+
+revision = "0008"
+down_revision = "0007"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "wallet_transactions",
+        sa.Column("id", sa.BigInteger(), autoincrement=True, nullable=False),
+        sa.Column("telegram_id", sa.BigInteger(), nullable=False),
+        sa.Column("kind", sa.String(16), nullable=False),
+        sa.Column("amount", sa.Integer(), nullable=False),
+        sa.Column("balance_after", sa.Integer(), nullable=False),
+        sa.Column("reference", sa.String(64), nullable=True),
+        sa.Column(
+            "created_at",
+            sa.DateTime(timezone=True),
+            server_default=sa.text("now()"),
+            nullable=False,
+        ),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index(
+        "ix_wallet_transactions_history",
+        "wallet_transactions",
+        ["telegram_id", sa.text("created_at DESC"), sa.text("id DESC")],
+    )
+    # Existing balances predate the ledger: open it with one adjustment per wallet.
+    op.execute(
+        "INSERT INTO wallet_transactions (telegram_id, kind, amount, balance_after, reference) "
+        "SELECT telegram_id, 'adjust', balance, balance, 'opening balance' "
+        "FROM users WHERE balance <> 0"
+    )
+
+    op.create_table(
+        "wallet_balance_summary",
+        sa.Column("id", sa.Integer(), autoincrement=False, nullable=False),
+        sa.Column("total_balance", sa.BigInteger(), nullable=False),
+        sa.Column("holders", sa.Integer(), nullable=False),
+        sa.Column("mismatched", sa.Integer(), nullable=False),
+        sa.Column("refreshed_at", sa.DateTime(timezone=True), nullable=False),
+        sa.PrimaryKeyConstraint("id"),
+    )
+
+    op.create_index(
+        "ix_users_balance_positive",
+        "users",
+        [sa.text("balance DESC")],
+        postgresql_where=sa.text("balance > 0"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_users_balance_positive", table_name="users")
+    op.drop_table("wallet_balance_summary")
+    op.drop_index("ix_wallet_transactions_history", table_name="wallet_transactions")
+    op.drop_table("wallet_transactions")
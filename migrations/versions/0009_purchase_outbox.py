@@ -0,0 +1,67 @@
+"""Purchase outbox for background fulfillment
+
+Revision ID: 0009
+Revises: 0008
+Create Date: 2026-10-18
+"""
+
+from __future__ import annotations
+
+import sqlalchemy as sa
+from alembic import op
+
+revision = "0009"
+down_revision = "0008"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "purchase_outbox",
+        sa.Column("id", sa.BigInteger(), autoincrement=True, nullable=False),
+        sa.Column("idempotency_key", sa.String(32), nullable=False),
+        sa.Column("telegram_id", sa.BigInteger(), nullable=False),
+        sa.Column("uuid", sa.String(64), nullable=False),
+        sa.Column("package_id", sa.Integer(), nullable=False),
+        sa.Column("package_name", sa.String(128), nullable=False),
+        sa.Column("price", sa.Integer(), nullable=False),
+        sa.Column("volume_gb", sa.Integer(), nullable=False),
+        sa.Column("days", sa.Integer(), nullable=False),
+        sa.Column("expire_at", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("lang", sa.String(4), nullable=False),
+        sa.Column("status", sa.String(16), nullable=False),
+        sa.Column("attempts", sa.Integer(), nullable=False),
+        sa.Column(
+            "next_attempt_at",
+            sa.DateTime(timezone=True),
+            server_default=sa.text("now()"),
+            nullable=False,
+        ),
+        sa.Column("last_error", sa.String(256), nullable=True),
+        sa.Column(
+            "created_at",
+            sa.DateTime(timezone=True),
+            server_default=sa.text("now()"),
+            nullable=False,
+        ),
+        sa.Column(
+            "updated_at",
+            sa.DateTime(timezone=True),
+            server_default=sa.text("now()"),
+            nullable=False,
+        ),
+        sa.PrimaryKeyConstraint("id"),
+        sa.UniqueConstraint("idempotency_key"),
+    )
+    op.create_index(
+        "ix_purchase_outbox_due",
+        "purchase_outbox",
+        ["next_attempt_at"],
+        postgresql_where=sa.text("status = 'pending'"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_purchase_outbox_due", table_name="purchase_outbox")
+    op.drop_table("purchase_outbox")
@@ -0,0 +1,105 @@
+"""Load generator for the webhook entry point: ``python scripts/webhook_load.py``.
+
+Posts synthetic Telegram ``message`` updates to a running ``python -m bot.webhook``
+at a fixed concurrency and reports throughput, latency percentiles and the
+response status counts. Run it against a staging bot: every update is
+dispatched for real, so replies go to ``--chat-id`` through the Bot API.
+
+Example, comparing worker counts on the same host::
+
+    WEBHOOK_WORKERS=1 python -m bot.webhook &
+    python scripts/webhook_load.py --requests 5000 --concurrency 100
+    WEBHOOK_WORKERS=4 python -m bot.webhook &
+    python scripts/webhook_load.py --requests 5000 --concurrency 100
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import itertools
+import os
+import statistics
+import time
+from collections import Counter
+
+import aiohttp
+
+_update_ids = itertools.count(int(time.time()) * 1000)
+
+
+def _update(chat_id: int, text: str) -> dict:
+    update_id = next(_update_ids)
+    user = {"id": chat_id, "is_bot": False, "first_name": "Load", "language_code": "en"}
+    return {
+        "update_id": update_id,
+        "message": {
+            "message_id": update_id,
+            "date": int(time.time()),
+            "chat": {"id": chat_id, "type": "private", "first_name": "Load"},
+            "from": user,
+            "text": text,
+        },
+    }
+
+
+def _percentile(sorted_values: list[float], percent: float) -> float:
+    index = min(len(sorted_values) - 1, round(percent / 100 * (len(sorted_values) - 1)))
+    return sorted_values[index]
+
+
+async def _run(args: argparse.Namespace) -> None:
+    headers = {"X-Telegram-Bot-Api-Secret-Token": args.secret} if args.secret else {}
+    latencies: list[float] = []
+    statuses: Counter[str] = Counter()
+    remaining = iter(range(args.requests))
+
+    async def worker(session: aiohttp.ClientSession) -> None:
+        for _ in remaining:
+            started = time.perf_counter()
+            try:
+                async with session.post(
+                    args.url, json=_update(args.chat_id, args.text), headers=headers
+                ) as response:
+                    await response.read()
+                    statuses[str(response.status)] += 1
+            except aiohttp.ClientError as e:
+                statuses[type(e).__name__] += 1
+                continue
+            latencies.append((time.perf_counter() - started) * 1000)
+
+    connector = aiohttp.TCPConnector(limit=args.concurrency)
+    timeout = aiohttp.ClientTimeout(total=args.timeout)
+    async with aiohttp.ClientSession(connector=connector, timeout=timeout) as session:
+        started = time.perf_counter()
+        await asyncio.gather(*(worker(session) for _ in range(args.concurrency)))
+        elapsed = time.perf_counter() - started
+
+    print(f"{args.requests} updates, concurrency {args.concurrency}, {elapsed:.2f}s")
+    print(f"throughput: {args.requests / elapsed:.0f} updates/s")
+    if latencies:
+        latencies.sort()
+        print(
+            f"latency ms: mean {statistics.fmean(latencies):.1f}  "
+            f"p50 {_percentile(latencies, 50):.1f}  p95 {_percentile(latencies, 95):.1f}  "
+            f"p99 {_percentile(latencies, 99):.1f}  max {latencies[-1]:.1f}"
+        )
+    print("responses: " + ", ".join(f"{key}={count}" for key, count in sorted(statuses.items())))
+
+
+def main() -> None:
+    port = os.getenv("WEBHOOK_PORT", "8080")
+    path = os.getenv("WEBHOOK_PATH", "/webhook")
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--url", default=f"http://127.0.0.1:{port}{path}")
+    parser.add_argument("--secret", default=os.getenv("WEBHOOK_SECRET", ""))
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--chat-id", type=int, default=int(os.getenv("LOAD_CHAT_ID", "1")))
+    parser.add_argument("--text", default="/start")
+    parser.add_argument("--timeout", type=float, default=30.0)
+    asyncio.run(_run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""Concurrency checks for wallet balance changes."""
+
+from __future__ import annotations
+
+import asyncio
+import random
+
+from sqlalchemy import delete, func, select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from bot.core.wallet import adjust_balance
+from bot.db.models import User, WalletTransaction
+from bot.db.models.wallet_transaction import ADJUST, PURCHASE
+
+OPENING_BALANCE = 3000
+DEBIT = 30
+# Enough debits to queue on the row lock; each holds its own pooled connection,
+# so the server needs max_connections above this.
+CONCURRENT_DEBITS = 300
+
+
+def test_parallel_debits_never_overdraw(database_url: str) -> None:
+    async def run() -> None:
+        # A pool as wide as the burst, so the debits really run side by side.
+        engine = create_async_engine(
+            database_url, pool_size=CONCURRENT_DEBITS, max_overflow=0, pool_timeout=60
+        )
+        session_factory = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+        telegram_id = random.randint(10**12, 2 * 10**12)
+
+        async def debit() -> int | None:
+            async with session_factory() as session:
+                balance = await adjust_balance(session, telegram_id, -DEBIT, PURCHASE)
+                await session.commit()
+                return balance
+
+        try:
+            async with session_factory() as session:
+                session.add(User(telegram_id=telegram_id, lang="en", balance=0))
+                await session.flush()
+                await adjust_balance(session, telegram_id, OPENING_BALANCE, ADJUST)
+                await session.commit()
+
+            results = await asyncio.gather(*(debit() for _ in range(CONCURRENT_DEBITS)))
+
+            succeeded = [balance for balance in results if balance is not None]
+            assert len(succeeded) == OPENING_BALANCE // DEBIT
+            # Every successful debit saw a distinct balance on its way to zero.
+            assert sorted(succeeded) == list(range(OPENING_BALANCE % DEBIT, OPENING_BALANCE, DEBIT))
+
+            async with session_factory() as session:
+                balance = await session.scalar(
+                    select(User.balance).where(User.telegram_id == telegram_id)
+                )
+                ledger_total = await session.scalar(
+                    select(func.sum(WalletTransaction.amount)).where(
+                        WalletTransaction.telegram_id == telegram_id
+                    )
+                )
+            assert balance == OPENING_BALANCE % DEBIT
+            assert ledger_total == balance
+        finally:
+            async with session_factory() as session:
+                await session.execute(
+                    delete(WalletTransaction).where(WalletTransaction.telegram_id == telegram_id)
+                )
+                await session.execute(delete(User).where(User.telegram_id == telegram_id))
+                await session.commit()
+            await engine.dispose()
+
+    asyncio.run(run())